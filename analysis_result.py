@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class AnalysisResult:
+    """单个币种的MACD分析结果（analyze_single_currency的返回值）
+
+    数据获取失败或数据量不足时four_hour_macd_bullish为None（analyzed为False）。
+    """
+
+    FIELDS = ('symbol', 'macd_status', 'is_golden_cross', 'four_hour_macd_value', 'macd_cross',
+              'four_hour_macd_bullish', 'is_buy_signal', 'is_sell_signal', 'cross_interval')
+
+    __slots__ = FIELDS
+
+    def __init__(self, symbol, macd_status=None, is_golden_cross=False, four_hour_macd_value=None, macd_cross=None,
+                 four_hour_macd_bullish=None, is_buy_signal=False, is_sell_signal=False, cross_interval=None):
+        self.symbol = symbol
+        # 4小时MACD状态："多头"/"空头"
+        self.macd_status = macd_status
+        self.is_golden_cross = is_golden_cross
+        # 4小时最新MACD值
+        self.four_hour_macd_value = four_hour_macd_value
+        # 15分钟MACD交叉：'golden_cross'、'death_cross'或None
+        self.macd_cross = macd_cross
+        self.four_hour_macd_bullish = four_hour_macd_bullish
+        self.is_buy_signal = is_buy_signal
+        self.is_sell_signal = is_sell_signal
+        # 检测交叉使用的周期
+        self.cross_interval = cross_interval
+
+    @classmethod
+    def failed(cls, symbol, cross_interval=None):
+        """无法分析（数据获取失败、数据量不足或出错）的结果"""
+        return cls(symbol, cross_interval=cross_interval)
+
+    @property
+    def analyzed(self):
+        """是否完成了分析"""
+        return self.four_hour_macd_bullish is not None
+
+    @property
+    def is_death_cross(self):
+        return self.macd_cross == 'death_cross'
+
+    def astuple(self):
+        """按FIELDS顺序的元组（即原来analyze_single_currency返回的9元组）"""
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, AnalysisResult):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __repr__(self):
+        return f"AnalysisResult({', '.join(f'{name}={getattr(self, name)!r}' for name in self.FIELDS)})"
+
+
+class AnalysisResults:
+    """一轮分析的全部结果，按列存放
+
+    每个字段一列numpy数组（symbol、analyzed、bullish、golden_cross、death_cross、buy、sell、macd_value，
+    以及原始的AnalysisResult对象results），筛选和排序只对数组做索引，不重建列表。
+    按币种查找为O(1)，可以当作{symbol: AnalysisResult}使用（in、[]、get、items）。
+    """
+
+    COLUMNS = ('results', 'symbol', 'analyzed', 'bullish', 'golden_cross', 'death_cross', 'buy', 'sell', 'macd_value')
+
+    def __init__(self, results=()):
+        results = list(results)
+        self.results = np.empty(len(results), dtype=object)
+        self.results[:] = results
+        self.symbol = np.array([result.symbol for result in results], dtype=object)
+        self.analyzed = np.array([result.analyzed for result in results], dtype=bool)
+        self.bullish = np.array([bool(result.four_hour_macd_bullish) for result in results], dtype=bool)
+        self.golden_cross = np.array([result.macd_cross == 'golden_cross' for result in results], dtype=bool)
+        self.death_cross = np.array([result.macd_cross == 'death_cross' for result in results], dtype=bool)
+        self.buy = np.array([bool(result.is_buy_signal) for result in results], dtype=bool)
+        self.sell = np.array([bool(result.is_sell_signal) for result in results], dtype=bool)
+        # 没有MACD值（未完成分析）的为NaN，排序时排在最后
+        self.macd_value = np.array([np.nan if result.four_hour_macd_value is None else float(result.four_hour_macd_value)
+                                    for result in results], dtype=np.float64)
+        self._index = None
+
+    def _take(self, indices):
+        taken = AnalysisResults.__new__(AnalysisResults)
+        for name in self.COLUMNS:
+            setattr(taken, name, getattr(self, name)[indices])
+        taken._index = None
+        return taken
+
+    def where(self, mask):
+        """按布尔掩码筛选，例如results.where(results.buy & results.bullish)"""
+        return self._take(np.flatnonzero(mask))
+
+    def sort_by(self, column='macd_value', reverse=False):
+        """按某一列排序（稳定排序，NaN始终排在最后）"""
+        keys = getattr(self, column)
+        if reverse:
+            keys = -keys.astype(np.float64)
+        return self._take(np.argsort(keys, kind='stable'))
+
+    def count(self, column):
+        """某个布尔列为True的个数"""
+        return int(np.count_nonzero(getattr(self, column)))
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def _lookup(self):
+        if self._index is None:
+            self._index = {symbol: i for i, symbol in enumerate(self.symbol)}
+        return self._index
+
+    def __contains__(self, symbol):
+        return symbol in self._lookup()
+
+    def __getitem__(self, symbol):
+        return self.results[self._lookup()[symbol]]
+
+    def get(self, symbol, default=None):
+        i = self._lookup().get(symbol)
+        return default if i is None else self.results[i]
+
+    def items(self):
+        return zip(self.symbol, self.results)
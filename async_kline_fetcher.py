@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖，未安装时只能使用线程池模式
+    aiohttp = None
+
+
+class AsyncKlineFetcher:
+    """基于asyncio的K线并发抓取引擎
+
+    一次性把所有(币种, 周期)请求放进事件循环，由信号量控制同时在途的请求数，
+    不再受线程池大小的限制。只负责取回原始K线数据（列表的列表），
+    解析和MACD计算仍交给CryptoAnalyzer现有逻辑。
+    传入rate_limiter时与线程模式共用同一份请求权重额度；
+    传入concurrency_controller（AdaptiveConcurrency）时，在途请求数由它按延迟、出错和权重动态调整，concurrency为上限。
+    """
+
+    def __init__(self, klines_url, concurrency=50, timeout=15, max_retries=3, verify=False, rate_limiter=None,
+                 concurrency_controller=None):
+        if aiohttp is None:
+            raise RuntimeError("异步抓取模式需要安装aiohttp: pip install aiohttp")
+        self.klines_url = klines_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.verify = verify
+        self.rate_limiter = rate_limiter
+        self.concurrency_controller = concurrency_controller
+
+    def fetch_all(self, jobs):
+        """并发抓取所有K线请求
+
+        Args:
+            jobs: [(key, params), ...]，params为klines接口的查询参数
+
+        Returns:
+            dict: {key: 原始K线列表}，抓取失败的key对应None
+        """
+        return asyncio.run(self._fetch_all(jobs))
+
+    async def _fetch_all(self, jobs):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=None if self.verify else False)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            tasks = [self._fetch_one(session, semaphore, key, params) for key, params in jobs]
+            results = await asyncio.gather(*tasks)
+        return dict(results)
+
+    async def _fetch_one(self, session, semaphore, key, params):
+        # aiohttp要求查询参数为字符串
+        query = {name: str(value) for name, value in params.items()}
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async(self.klines_url, params)
+                async with semaphore:
+                    controller = self.concurrency_controller
+                    if controller is not None:
+                        await controller.acquire_async()
+                    started = time.perf_counter()
+                    status = None
+                    try:
+                        async with session.get(self.klines_url, params=query) as response:
+                            status = response.status
+                            if self.rate_limiter is not None:
+                                self.rate_limiter.observe(self.klines_url, response.status, response.headers)
+                            if response.status in (429, 500, 502, 503, 504):
+                                raise aiohttp.ClientResponseError(
+                                    response.request_info, response.history,
+                                    status=response.status, message=response.reason
+                                )
+                            response.raise_for_status()
+                            return key, await response.json(content_type=None)
+                    finally:
+                        if controller is not None:
+                            weight_ratio = self.rate_limiter.weight_ratio(self.klines_url) if self.rate_limiter is not None else None
+                            controller.release(time.perf_counter() - started, status, weight_ratio)
+            except Exception as e:
+                print(f"异步获取{params.get('symbol')}的{params.get('interval')}合约数据出错 (尝试 {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.3 * 2 ** (attempt - 1))
+        return key, None
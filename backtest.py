@@ -0,0 +1,215 @@
+import numpy as np
+
+from batch_signals import macd_signal_conditions
+from indicators import ema, macd
+from kline_arrays import decode_klines
+from kline_resample import resample_kline_arrays
+from kline_store import INTERVAL_MS
+
+# 与analyze_single_currency相同的最少数据量：4小时至少20根、15分钟至少50根才开始产生信号
+MIN_FOUR_HOUR_BARS = 20
+MIN_QUARTER_HOUR_BARS = 50
+# 币安合约吃单手续费（单边）
+DEFAULT_FEE_RATE = 0.0004
+
+# 策略参数的默认值，与实时分析相同（MACD 12/26/9，潜在信号阈值0.5%）
+DEFAULT_STRATEGY_PARAMS = {'fast_period': 12, 'slow_period': 26, 'signal_period': 9, 'close_to_signal_pct': 0.5}
+
+TRADE_COLUMNS = ('symbol', 'entry_time', 'exit_time', 'entry_price', 'exit_price', 'return_pct', 'max_adverse_pct', 'bars')
+
+
+def four_hour_trend(quarter_hour, fast_period=12, slow_period=26, signal_period=9):
+    """每根15分钟K线收盘时的4小时MACD（把当前未收盘的4小时K线按这根15分钟的收盘价计入）
+
+    与实时分析看到的一致：4小时K线由15分钟合成，最后一根是正在形成的K线。
+    已收盘的4小时EMA整段算一次，每根15分钟K线只在上一根已收盘的值上再推进一步，不逐根重算。
+
+    Returns:
+        (macd_line, signal_line, group_index)：均与quarter_hour等长；
+        group_index为所在4小时K线的序号，不属于完整4小时分组的开头部分为-1，MACD为NaN
+    """
+    open_time = quarter_hour['open_time']
+    close = np.asarray(quarter_hour['close'], dtype=np.float64)
+    four_hour = resample_kline_arrays(quarter_hour, '15m', '4h')
+    macd_line = np.full(len(close), np.nan)
+    signal_line = np.full(len(close), np.nan)
+    group_index = np.full(len(close), -1, dtype=np.int64)
+    if len(four_hour) < 2:
+        return macd_line, signal_line, group_index
+
+    four_hour_close = np.asarray(four_hour['close'], dtype=np.float64)
+    fast = ema(four_hour_close, fast_period)
+    slow = ema(four_hour_close, slow_period)
+    signal = ema(fast - slow, signal_period)
+
+    group_open = open_time // INTERVAL_MS['4h'] * INTERVAL_MS['4h']
+    positions = np.searchsorted(four_hour['open_time'], group_open)
+    positions = np.minimum(positions, len(four_hour) - 1)
+    in_group = four_hour['open_time'][positions] == group_open
+    # 每个4小时分组的第一根之前没有已收盘的4小时K线，从第二组开始计算
+    usable = in_group & (positions >= 1)
+    group_index[in_group] = positions[in_group]
+
+    previous = positions[usable] - 1
+    provisional = close[usable]
+    fast_now = fast[previous] + 2 / (fast_period + 1) * (provisional - fast[previous])
+    slow_now = slow[previous] + 2 / (slow_period + 1) * (provisional - slow[previous])
+    macd_line[usable] = fast_now - slow_now
+    signal_line[usable] = signal[previous] + 2 / (signal_period + 1) * (macd_line[usable] - signal[previous])
+    return macd_line, signal_line, group_index
+
+
+def strategy_signals(quarter_hour, fast_period=12, slow_period=26, signal_period=9, close_to_signal_pct=0.5):
+    """每根15分钟K线收盘时的策略信号（4小时多头 + 15分钟金叉，以及对应的卖出信号）
+
+    默认参数下判断条件与analyze_single_currency/macd_signal_masks相同；4小时和15分钟使用同一组MACD周期。
+    注意EMA从整段历史开始计算，而实时分析只用最近50根4小时、200根15分钟K线，
+    两者的MACD值在起始阶段略有差异，处在临界值附近的信号可能不同。
+
+    Returns:
+        dict: bullish、golden_cross、death_cross、buy、sell，均为与quarter_hour等长的布尔数组；
+              数据量不足MIN_FOUR_HOUR_BARS/MIN_QUARTER_HOUR_BARS的开头部分全为False
+    """
+    close = np.asarray(quarter_hour['close'], dtype=np.float64)
+    four_hour_macd, four_hour_signal, group_index = four_hour_trend(quarter_hour, fast_period, slow_period, signal_period)
+    bullish = four_hour_macd > four_hour_signal
+    quarter_hour_macd, quarter_hour_signal, _ = macd(close, fast_period, slow_period, signal_period)
+    signals = macd_signal_conditions(bullish, quarter_hour_macd, quarter_hour_signal, close_to_signal_pct)
+
+    ready = (group_index + 1 >= MIN_FOUR_HOUR_BARS) & (np.arange(len(close)) + 1 >= MIN_QUARTER_HOUR_BARS)
+    signals['bullish'] = bullish
+    return {name: values & ready for name, values in signals.items()}
+
+
+def simulate_trades(quarter_hour, signals, side='long', fee_rate=DEFAULT_FEE_RATE):
+    """按信号模拟进出场，同一币种同时只持有一个仓位
+
+    多单：出现买入信号后以下一根K线开盘价进场，出现15分钟死叉或4小时转空（与持仓止盈止损检查的条件相同）后以下一根开盘价离场。
+    空单：卖出信号进场，15分钟金叉或4小时转多离场。
+    持仓期间的新信号忽略；到数据末尾仍未离场的仓位不计入。
+
+    Returns:
+        dict: TRADE_COLUMNS中除symbol外的各列（numpy数组），以及open_position（数据末尾是否仍有持仓）
+    """
+    if side == 'long':
+        entries = np.flatnonzero(signals['buy'])
+        exits = np.flatnonzero(signals['death_cross'] | ~signals['bullish'])
+    elif side == 'short':
+        entries = np.flatnonzero(signals['sell'])
+        exits = np.flatnonzero(signals['golden_cross'] | signals['bullish'])
+    else:
+        raise ValueError(f"不支持的方向: {side}")
+
+    # 每个进场信号之后的第一个离场信号；离场信号相同的进场信号属于同一个仓位，只保留第一个
+    exit_positions = np.searchsorted(exits, entries, side='right')
+    _, first = np.unique(exit_positions, return_index=True)
+    entries, exit_positions = entries[first], exit_positions[first]
+
+    count = len(quarter_hour)
+    exit_bars = np.full(len(entries), count, dtype=np.int64)
+    has_exit = exit_positions < len(exits)
+    exit_bars[has_exit] = exits[exit_positions[has_exit]]
+    # 下一根K线开盘时成交，离场那根之后没有K线的也算未完成
+    finished = exit_bars + 1 < count
+    open_position = bool(len(entries)) and not finished[-1]
+    entries, exit_bars = entries[finished] + 1, exit_bars[finished] + 1
+
+    open_price = np.asarray(quarter_hour['open'], dtype=np.float64)
+    entry_price = open_price[entries]
+    exit_price = open_price[exit_bars]
+    direction = 1 if side == 'long' else -1
+    return_pct = (direction * (exit_price / entry_price - 1) - 2 * fee_rate) * 100
+
+    # 持仓期间（进场K线到离场前一根）最不利的价格
+    if len(entries):
+        bounds = np.column_stack([entries, exit_bars]).ravel()
+        if side == 'long':
+            worst = np.minimum.reduceat(np.asarray(quarter_hour['low'], dtype=np.float64), bounds)[::2]
+            max_adverse_pct = (worst / entry_price - 1) * 100
+        else:
+            worst = np.maximum.reduceat(np.asarray(quarter_hour['high'], dtype=np.float64), bounds)[::2]
+            max_adverse_pct = (1 - worst / entry_price) * 100
+    else:
+        max_adverse_pct = np.empty(0)
+
+    open_time = quarter_hour['open_time']
+    return {
+        'entry_time': open_time[entries],
+        'exit_time': open_time[exit_bars],
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'return_pct': return_pct,
+        'max_adverse_pct': np.minimum(max_adverse_pct, 0),
+        'bars': exit_bars - entries,
+        'open_position': open_position
+    }
+
+
+def run_backtest(history, side='long', fee_rate=DEFAULT_FEE_RATE, params=None):
+    """对多个币种的15分钟历史K线回测
+
+    Args:
+        history: {symbol: 15分钟KlineArrays}（按开盘时间升序）
+        side: 'long'按买入信号做多，'short'按卖出信号做空
+        fee_rate: 单边手续费率
+        params: 可选，strategy_signals的参数（见DEFAULT_STRATEGY_PARAMS），默认与实时分析相同
+
+    Returns:
+        dict: 所有交易按TRADE_COLUMNS分列存放（按离场时间排序），以及open_positions（末尾仍持仓的币种数）
+    """
+    parts = {column: [] for column in TRADE_COLUMNS}
+    open_positions = 0
+    for symbol, quarter_hour in history.items():
+        if len(quarter_hour) < MIN_QUARTER_HOUR_BARS:
+            continue
+        trades = simulate_trades(quarter_hour, strategy_signals(quarter_hour, **(params or {})), side, fee_rate)
+        open_positions += trades.pop('open_position')
+        parts['symbol'].append(np.full(len(trades['bars']), symbol, dtype=object))
+        for column, values in trades.items():
+            parts[column].append(values)
+
+    result = {}
+    for column in TRADE_COLUMNS:
+        result[column] = np.concatenate(parts[column]) if parts[column] else np.empty(0, dtype=object if column == 'symbol' else np.float64)
+    order = np.argsort(result['exit_time'], kind='stable')
+    result = {column: values[order] for column, values in result.items()}
+    result['open_positions'] = open_positions
+    return result
+
+
+def summarize_trades(trades):
+    """回测统计：胜率、收益分布和回撤
+
+    回撤按每笔交易投入相同本金、收益累加（不复利）的资金曲线计算，单位为百分点。
+
+    Returns:
+        dict: trades、hit_rate、mean_pct、median_pct、percentiles({5,25,50,75,95}: 收益%)、
+              total_pct、max_drawdown_pct、worst_adverse_pct、avg_hours
+    """
+    returns = trades['return_pct']
+    if len(returns) == 0:
+        return {'trades': 0}
+    equity = np.cumsum(returns)
+    peaks = np.maximum.accumulate(np.r_[0.0, equity])[1:]
+    percentiles = (5, 25, 50, 75, 95)
+    return {
+        'trades': len(returns),
+        'hit_rate': float(np.mean(returns > 0) * 100),
+        'mean_pct': float(np.mean(returns)),
+        'median_pct': float(np.median(returns)),
+        'percentiles': dict(zip(percentiles, np.percentile(returns, percentiles).tolist())),
+        'total_pct': float(equity[-1]),
+        'max_drawdown_pct': float(np.max(peaks - equity)),
+        'worst_adverse_pct': float(np.min(trades['max_adverse_pct'])),
+        'avg_hours': float(np.mean(trades['bars']) * INTERVAL_MS['15m'] / 3_600_000)
+    }
+
+
+def load_history(store, symbols, start_ms=None, end_ms=None):
+    """从本地K线存储读取各币种的15分钟历史K线 {symbol: KlineArrays}，没有数据的币种不包含在内"""
+    history = {}
+    for symbol in symbols:
+        rows = store.load_range(symbol, '15m', start_ms, end_ms)
+        if rows:
+            history[symbol] = decode_klines(rows)
+    return history
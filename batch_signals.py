@@ -0,0 +1,83 @@
+import numpy as np
+
+from indicators import macd_matrix
+
+
+def stack_columns(series_list, length=None):
+    """把多个一维序列右对齐堆叠成二维数组（每行一个序列），较短的序列左侧补NaN
+
+    Args:
+        series_list: 序列列表，如各币种的收盘价
+        length: 每行保留最近的length个值，默认取最长序列的长度
+
+    Returns:
+        (matrix, lengths)，lengths为每行的有效长度
+    """
+    lengths = np.array([len(series) for series in series_list], dtype=np.int64)
+    if length is None:
+        length = int(lengths.max()) if len(lengths) else 0
+    lengths = np.minimum(lengths, length)
+    matrix = np.full((len(series_list), length), np.nan)
+    for row, (series, count) in enumerate(zip(series_list, lengths)):
+        if count:
+            matrix[row, length - count:] = np.asarray(series, dtype=np.float64)[-count:]
+    return matrix, lengths
+
+
+def macd_signal_masks(four_hour_close, quarter_hour_close):
+    """对所有币种一次性计算MACD，并按analyze_single_currency的条件得到布尔掩码
+
+    Args:
+        four_hour_close: 4小时收盘价矩阵，每行一个币种（stack_columns的结果）
+        quarter_hour_close: 15分钟收盘价矩阵，行顺序与four_hour_close相同
+
+    Returns:
+        dict: 各项均为长度为币种数的数组
+            four_hour_macd: 4小时最新MACD值
+            bullish: 4小时MACD多头（MACD线在信号线上方）
+            golden_cross / death_cross: 15分钟最近两根K线发生金叉/死叉
+            buy / sell: 买入/卖出信号
+    """
+    four_hour_macd_line, four_hour_macd_signal, _ = macd_matrix(four_hour_close)
+    quarter_hour_macd_line, quarter_hour_macd_signal, _ = macd_matrix(quarter_hour_close)
+
+    bullish = four_hour_macd_line[:, -1] > four_hour_macd_signal[:, -1]
+
+    # 15分钟只用到最近三个值，与detect_macd_cross、check_buy_signal的判断一致
+    conditions = macd_signal_conditions(bullish[:, None], quarter_hour_macd_line[:, -3:], quarter_hour_macd_signal[:, -3:])
+    masks = {'four_hour_macd': four_hour_macd_line[:, -1], 'bullish': bullish}
+    masks.update((name, values[:, -1]) for name, values in conditions.items())
+    return masks
+
+
+def macd_signal_conditions(bullish, macd_line, signal_line, close_to_signal_pct=0.5):
+    """沿最后一维逐个位置判断15分钟交叉和买卖信号（analyze_single_currency的条件）
+
+    Args:
+        bullish: 4小时MACD多头掩码，形状与macd_line相同或可以广播
+        macd_line / signal_line: 15分钟MACD线和信号线，最后一维为时间
+        close_to_signal_pct: 尚未交叉时MACD线与信号线相差小于该百分比算作潜在信号
+
+    Returns:
+        dict: golden_cross、death_cross、buy、sell，形状与macd_line相同；
+              每个位置只用到当前和前两个值，最前面两个位置为False
+    """
+    bullish = np.broadcast_to(bullish, np.shape(macd_line))[..., 2:]
+    prev_macd, curr_macd = macd_line[..., 1:-1], macd_line[..., 2:]
+    prev_signal, curr_signal = signal_line[..., 1:-1], signal_line[..., 2:]
+    golden_cross = (prev_macd < prev_signal) & (curr_macd > curr_signal)
+    death_cross = (prev_macd > prev_signal) & (curr_macd < curr_signal)
+
+    # 小周期还没交叉时，MACD线连续三根同向且与信号线足够接近也算潜在信号
+    rising = (curr_macd > prev_macd) & (prev_macd > macd_line[..., :-2])
+    falling = (curr_macd < prev_macd) & (prev_macd < macd_line[..., :-2])
+    close_to_signal = np.abs(curr_macd - curr_signal) / np.maximum(np.abs(curr_signal), 0.0001) * 100 < close_to_signal_pct
+
+    conditions = {
+        'golden_cross': golden_cross,
+        'death_cross': death_cross,
+        'buy': bullish & (golden_cross | (rising & close_to_signal)),
+        'sell': ~bullish & (death_cross | (falling & close_to_signal))
+    }
+    padding = np.zeros(np.shape(macd_line)[:-1] + (min(2, np.shape(macd_line)[-1]),), dtype=bool)
+    return {name: np.concatenate([padding, values], axis=-1) for name, values in conditions.items()}
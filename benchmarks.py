@@ -0,0 +1,856 @@
+"""性能对比脚本
+
+用法：
+    python benchmarks.py fetch [--symbols 100] [--latency 0.05] [--concurrency 50]
+    python benchmarks.py store [--symbols 100] [--latency 0.05]
+    python benchmarks.py stream [--symbols 10] [--seconds 10] [--candle-seconds 2]
+    python benchmarks.py decode [--symbols 50] [--repeat 5]
+    python benchmarks.py batch [--symbols 500] [--repeat 5]
+    python benchmarks.py crossrule [--candles 10000] [--repeat 3]
+    python benchmarks.py kernels [--candles 10000] [--repeat 5]
+    python benchmarks.py archive [--days 30] [--symbols 100] [--runs-per-day 96]
+    python benchmarks.py backtest [--symbols 100] [--years 2] [--sample 500]
+    python benchmarks.py sweep [--symbols 50] [--years 1] [--workers 4]
+    python benchmarks.py import [--symbols 10] [--months 12] [--workers 4]
+    python benchmarks.py scheduler [--seconds 12] [--skew 1.5]
+    python benchmarks.py priority [--symbols 100] [--holdings 5] [--latency 0.05]
+    python benchmarks.py shards [--symbols 200] [--workers 4] [--family AF_INET]
+    python benchmarks.py concurrency [--symbols 100] [--latency 0.05] [--capacity 3] [--rounds 3]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from analysis_result import AnalysisResult
+from backtest import run_backtest, strategy_signals, summarize_trades
+from concurrency_controller import AdaptiveConcurrency
+from crypto_multiperiod_analysis import CryptoAnalyzer
+from indicator_graph import IndicatorGraph
+from indicators import MacdCrossIndex, ema_matrix, macd
+from kline_arrays import KlineArrays
+from kline_store import INTERVAL_MS
+from candle_scheduler import CandleScheduler, ServerClock
+from kline_import import import_directory
+from rate_limiter import WEIGHT_LIMITS, BinanceRateLimiter
+from param_sweep import SharedHistory, parameter_grid, rank_results, run_sweep
+from shard_workers import LocalShardPool
+from mock_binance_server import MockBinanceServer, MockBinanceStreamServer
+from run_archive import DAY_MS, RunArchive
+
+
+def print_table(headers, rows):
+    """打印简单的对齐表格"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def run_quietly(func, *args, **kwargs):
+    """执行函数并屏蔽其打印输出，返回(结果, 耗时秒)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_fetch(args):
+    """对比线程池模式和异步模式下execute_filter的总耗时"""
+    rows = []
+    with MockBinanceServer(symbol_count=args.symbols, latency=args.latency) as mock:
+        for mode in ('thread', 'async'):
+            analyzer = mock.point_analyzer(CryptoAnalyzer())
+            analyzer.holdings_file = '__benchmark_no_holdings__.json'
+            analyzer.kline_store_file = None  # 只比较网络抓取，不使用本地K线存储
+            analyzer.run_archive_dir = None
+            analyzer.concurrency_log_file = None
+            analyzer.fetch_mode = mode
+            analyzer.async_concurrency = args.concurrency
+            requests_before = mock.request_count
+            _, elapsed = run_quietly(analyzer.execute_filter)
+            rows.append((mode, f"{elapsed:.2f}s", mock.request_count - requests_before))
+            analyzer.http.close()
+    print(f"execute_filter对比：{args.symbols}个币种，模拟延迟{args.latency * 1000:.0f}ms，异步并发{args.concurrency}")
+    print_table(["模式", "耗时", "请求数"], rows)
+
+
+def bench_store(args):
+    """对比首次运行（全量）和后续运行（尾部增量）的K线下载量"""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir, MockBinanceServer(symbol_count=args.symbols, latency=args.latency) as mock:
+        analyzer = mock.point_analyzer(CryptoAnalyzer())
+        analyzer.holdings_file = os.path.join(tmp_dir, 'holdings.json')
+        analyzer.kline_store_file = os.path.join(tmp_dir, 'klines.db')
+        analyzer.run_archive_dir = os.path.join(tmp_dir, 'run_archive')
+        analyzer.concurrency_log_file = os.path.join(tmp_dir, 'concurrency_log.jsonl')
+        for label in ('首次运行', '再次运行'):
+            requests_before = mock.request_count
+            _, elapsed = run_quietly(analyzer.execute_filter)
+            stats = analyzer.kline_store.stats()
+            rows.append((label, f"{elapsed:.2f}s", mock.request_count - requests_before,
+                         stats['rows_fetched'], stats['rows_served'], f"{stats['saved_pct']:.1f}%"))
+        analyzer.kline_store.close()
+        analyzer.http.close()
+    print(f"本地K线存储：{args.symbols}个币种，模拟延迟{args.latency * 1000:.0f}ms")
+    print_table(["运行", "耗时", "请求数", "下载K线", "使用K线", "节省"], rows)
+
+
+def bench_stream(args):
+    """离线运行推送模式：本地REST预热 + 本地WebSocket推送（时间加速）"""
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            MockBinanceServer(symbol_count=args.symbols) as mock, \
+            MockBinanceStreamServer(mock, candle_seconds=args.candle_seconds) as stream:
+        analyzer = mock.point_analyzer(CryptoAnalyzer())
+        analyzer.holdings_file = os.path.join(tmp_dir, 'holdings.json')
+        analyzer.kline_store_file = os.path.join(tmp_dir, 'klines.db')
+        analyzer.concurrency_log_file = os.path.join(tmp_dir, 'concurrency_log.jsonl')
+        analyzer.stream_url = stream.base_url
+        stats, elapsed = run_quietly(analyzer.run_stream, top_n=args.symbols, duration=args.seconds)
+        analyzer.http.close()
+    evaluations = stats['evaluations']
+    avg_latency = stats['eval_latency_total'] / evaluations * 1000 if evaluations else 0.0
+    print(f"推送模式：{args.symbols}个币种，每{args.candle_seconds}秒收盘一根15m K线，运行{args.seconds}秒（总耗时{elapsed:.1f}s）")
+    print_table(["收盘K线", "分析次数", "信号", "收盘到分析完成平均耗时", "推送消息数"],
+                [(stats['closed_candles'], evaluations, stats['signals'], f"{avg_latency:.1f}ms", stream.sent_count)])
+
+
+def bench_decode(args):
+    """对比每个币种K线解码（及解码+MACD）的耗时：DataFrame路径 vs numpy数组路径"""
+    with MockBinanceServer(symbol_count=args.symbols) as mock:
+        analyzer = CryptoAnalyzer()
+        limit = analyzer.analysis_kline_requests()['15m']
+        # 经过一次JSON编解码，与response.json()得到的数据完全一致（数值为字符串）
+        raw = [json.loads(json.dumps(mock.klines(symbol, '15m', limit, None, None))) for symbol in mock.symbols]
+
+    def decode_only():
+        for rows in raw:
+            analyzer.decode_analysis_klines(rows)
+
+    def decode_and_macd():
+        for rows in raw:
+            four_hour_data, quarter_hour_data = analyzer.build_analysis_klines({'15m': analyzer.decode_analysis_klines(rows)})
+            analyzer.calculate_macd(four_hour_data)
+            analyzer.calculate_macd(quarter_hour_data)
+
+    def per_symbol_us(func):
+        best = min(run_quietly(func)[1] for _ in range(args.repeat))
+        return best / len(raw) * 1e6
+
+    rows = []
+    for label, use_arrays in (("DataFrame", False), ("numpy数组", True)):
+        analyzer.use_kline_arrays = use_arrays
+        rows.append((label, per_symbol_us(decode_only), per_symbol_us(decode_and_macd)))
+    base_decode, base_total = rows[0][1], rows[0][2]
+    table = [(label, f"{decode:.0f}us", f"{base_decode / decode:.1f}x", f"{total:.0f}us", f"{base_total / total:.1f}x")
+             for label, decode, total in rows]
+    print(f"K线解码：{args.symbols}个币种，每个币种{limit}根15m K线，取{args.repeat}次最快")
+    print_table(["路径", "每币种解码", "加速", "解码+合成4h+MACD", "加速"], table)
+
+
+def end_at_cross(rows, limit, window, golden):
+    """从rows中截取limit根K线，使其中最后window根的MACD恰好在最后一根K线金叉（golden=True）或死叉，找不到时取最新的limit根"""
+    close = np.array([float(row[4]) for row in rows])
+    for end in range(len(rows), limit - 1, -1):
+        macd_line, signal_line, _ = macd(close[end - window:end])
+        before, after = macd_line[-2] - signal_line[-2], macd_line[-1] - signal_line[-1]
+        if (before < 0 < after) if golden else (before > 0 > after):
+            return rows[end - limit:end]
+    return rows[-limit:]
+
+
+def bench_batch(args):
+    """对比内存中已有K线时，逐个币种分析与矩阵化批量分析的耗时
+
+    每个币种的K线截取到15分钟MACD刚好金叉/死叉（交替）的位置，保证两种方式都走到完整的信号判断。
+    """
+    with MockBinanceServer(symbol_count=args.symbols) as mock:
+        analyzer = CryptoAnalyzer()
+        limit = analyzer.analysis_kline_requests()['15m']
+        klines_by_symbol = {}
+        for i, symbol in enumerate(mock.symbols):
+            rows = json.loads(json.dumps(mock.klines(symbol, '15m', limit + 500, None, None)))
+            rows = end_at_cross(rows, limit, analyzer.analysis_kline_limits['15m'], golden=i % 2 == 0)
+            klines_by_symbol[symbol] = analyzer.build_analysis_klines({'15m': analyzer.decode_analysis_klines(rows)})
+
+    def per_symbol():
+        # 每次都清空本轮的指标缓存，否则从第二次起逐个币种分析只是在读缓存
+        analyzer.indicator_cache.reset()
+        return {symbol: analyzer.analyze_single_currency(symbol, *klines)
+                for symbol, klines in klines_by_symbol.items()}
+
+    def best_of(func):
+        return min(run_quietly(func)[1] for _ in range(args.repeat))
+
+    single_time = best_of(per_symbol)
+    batch_time = best_of(lambda: analyzer.analyze_batch(klines_by_symbol))
+    single_results, _ = run_quietly(per_symbol)
+    batch_results, _ = run_quietly(analyzer.analyze_batch, klines_by_symbol)
+    # 逐项比较信号结果（4小时MACD值为浮点数，不参与比较）
+    def signal_fields(result):
+        fields = result.astuple()
+        return fields[:3] + fields[4:8]
+
+    mismatched = sum(1 for symbol in klines_by_symbol
+                     if signal_fields(single_results[symbol]) != signal_fields(batch_results[symbol]))
+    crosses = sum(1 for result in batch_results.values() if result.macd_cross is not None)
+    signals = sum(1 for result in batch_results.values() if result.is_buy_signal or result.is_sell_signal)
+    assert signals > 0, "测试数据没有产生买卖信号，无法比较信号判断的耗时"
+    print(f"MACD分析：{args.symbols}个币种（K线已在内存），取{args.repeat}次最快，"
+          f"15分钟金叉/死叉{crosses}个，信号{signals}个，结果不一致{mismatched}个")
+    print_table(["模式", "总耗时", "每币种", "加速"],
+                [("逐个币种", f"{single_time * 1000:.1f}ms", f"{single_time / args.symbols * 1e6:.0f}us", "1.0x"),
+                 ("矩阵批量", f"{batch_time * 1000:.1f}ms", f"{batch_time / args.symbols * 1e6:.0f}us", f"{single_time / batch_time:.1f}x")])
+
+
+def scan_golden_cross_rule(analyzer, macd_line, signal_line):
+    """check_macd_golden_cross_rule改用交叉索引之前的实现（逐根向前查找），作为对照"""
+    if len(macd_line) < 50:
+        return False
+    if analyzer.detect_macd_cross(macd_line, signal_line) != 'golden_cross':
+        return False
+    macd_value_a = macd_line[-2]
+    last_below_zero_golden_cross_idx = None
+    for i in range(len(macd_line) - 4, 0, -1):
+        cross_at_i = (macd_line[i-1] < signal_line[i-1] and
+                      macd_line[i] > signal_line[i])
+        if cross_at_i and macd_line[i] <= 0:
+            last_below_zero_golden_cross_idx = i
+            break
+    if last_below_zero_golden_cross_idx is None:
+        return False
+    macd_values_between = macd_line[last_below_zero_golden_cross_idx+1:-2]
+    if len(macd_values_between) == 0:
+        return False
+    return macd_value_a < (macd_values_between.max() / 5)
+
+
+def bench_crossrule(args):
+    """在长序列的每个金叉位置判断check_macd_golden_cross_rule：逐根向前查找 vs 交叉索引"""
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, args.candles)))
+    macd_line, signal_line, _ = macd(close)
+    analyzer = CryptoAnalyzer()
+    # 每个金叉的下一根K线作为“当前”位置，模拟回测时逐根判断
+    ends = [end for end in MacdCrossIndex(macd_line, signal_line).events('golden') + 1 if end >= 50]
+
+    def scan():
+        return [scan_golden_cross_rule(analyzer, macd_line[:end], signal_line[:end]) for end in ends]
+
+    def indexed():
+        # 索引对整条序列只构建一次，各个前缀共用
+        cross_index = MacdCrossIndex(macd_line, signal_line)
+        return [analyzer.check_macd_golden_cross_rule(macd_line[:end], signal_line[:end], cross_index) for end in ends]
+
+    def from_graph():
+        # 交叉索引取指标图中缓存的cross_index节点，只在第一次判断时构建
+        graph = IndicatorGraph({'close': close})
+        return [analyzer.check_macd_golden_cross_rule(macd_line[:end], signal_line[:end], indicators=graph) for end in ends]
+
+    scan_results, _ = run_quietly(scan)
+    indexed_results, _ = run_quietly(indexed)
+    graph_results, _ = run_quietly(from_graph)
+    build_time = min(run_quietly(MacdCrossIndex, macd_line, signal_line)[1] for _ in range(args.repeat))
+    scan_time = min(run_quietly(scan)[1] for _ in range(args.repeat))
+    indexed_time = min(run_quietly(indexed)[1] for _ in range(args.repeat))
+    graph_time = min(run_quietly(from_graph)[1] for _ in range(args.repeat))
+    mismatched = sum(a != b or a != c for a, b, c in zip(scan_results, indexed_results, graph_results))
+    print(f"金叉规则：{args.candles}根K线，{len(ends)}个金叉位置逐个判断，满足规则{sum(indexed_results)}个，"
+          f"结果不一致{mismatched}个，构建索引{build_time * 1000:.2f}ms")
+    print_table(["实现", "总耗时", "每次判断", "加速"],
+                [("逐根向前查找", f"{scan_time * 1000:.1f}ms", f"{scan_time / len(ends) * 1e6:.0f}us", "1.0x"),
+                 ("交叉索引", f"{indexed_time * 1000:.1f}ms", f"{indexed_time / len(ends) * 1e6:.0f}us", f"{scan_time / indexed_time:.1f}x"),
+                 ("指标图中的交叉索引", f"{graph_time * 1000:.1f}ms", f"{graph_time / len(ends) * 1e6:.0f}us", f"{scan_time / graph_time:.1f}x")])
+
+
+def bench_kernels(args):
+    """各指标计算后端的一致性检查和耗时对比（EMA、MACD、矩阵EMA、交叉检测）"""
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, args.candles)))
+    matrix = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, 200)), axis=1))
+    matrix[::7, :30] = np.nan  # 部分币种K线较少
+
+    # 参照：pandas ewm(adjust=False)
+    series = pd.Series(close)
+    reference_macd = (series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()).to_numpy()
+
+    def best_us(func):
+        return min(timed(func) for _ in range(args.repeat)) * 1e6
+
+    def timed(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    rows = [("pandas ewm", f"{best_us(lambda: series.ewm(span=12, adjust=False).mean()):.0f}us",
+             f"{best_us(lambda: (series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()).ewm(span=9, adjust=False).mean()):.0f}us",
+             "-", "-", "参照")]
+    original = indicators.get_backend()
+    baseline = None
+    try:
+        for backend in indicators.available_backends():
+            indicators.set_backend(backend)
+            # 先调用一次，numba后端在这里完成编译
+            macd_line, signal_line, _ = macd(close)
+            cross_index = MacdCrossIndex(macd_line, signal_line)
+            matrix_ema = ema_matrix(matrix, 12)
+            if baseline is None:
+                baseline = (macd_line, signal_line, matrix_ema, cross_index)
+            diff = max(np.max(np.abs(macd_line - reference_macd)),
+                       np.max(np.abs(signal_line - baseline[1])),
+                       np.nanmax(np.abs(matrix_ema - baseline[2])))
+            same_crosses = (np.array_equal(cross_index.positions, baseline[3].positions)
+                            and np.array_equal(cross_index.golden, baseline[3].golden)
+                            and np.array_equal(cross_index.below_zero, baseline[3].below_zero))
+            rows.append((backend,
+                         f"{best_us(lambda: indicators.ema(close, 12)):.0f}us",
+                         f"{best_us(lambda: macd(close)):.0f}us",
+                         f"{best_us(lambda: ema_matrix(matrix, 12)):.0f}us",
+                         f"{best_us(lambda: MacdCrossIndex(macd_line, signal_line)):.0f}us",
+                         f"最大误差{diff:.1e}, 交叉{'一致' if same_crosses else '不一致'}"))
+    finally:
+        indicators.set_backend(original)
+
+    # 未安装numba时也校验编译内核的循环逻辑（不编译，直接按Python执行）
+    if 'numba' not in indicators.available_backends():
+        kernels = indicators._compiled_kernels(lambda func: func)
+        short = close[:2000]
+        short_macd, short_signal, _ = macd(short)
+        positions, golden, below_zero = kernels['cross_events'](short_macd, short_signal)
+        expected = MacdCrossIndex(short_macd, short_signal)
+        diff = max(np.max(np.abs(kernels['ema'](short, 2 / 13) - indicators.ema(short, 12))),
+                   np.nanmax(np.abs(kernels['ema_matrix'](np.ascontiguousarray(matrix[:, :50].T), 2 / 13).T - ema_matrix(matrix[:, :50], 12))))
+        same_crosses = (np.array_equal(positions, expected.positions) and np.array_equal(golden, expected.golden)
+                        and np.array_equal(below_zero, expected.below_zero))
+        rows.append(("numba（未安装）", "-", "-", "-", "-",
+                     f"循环内核未编译校验：最大误差{diff:.1e}, 交叉{'一致' if same_crosses else '不一致'}"))
+
+    print(f"指标计算后端：{args.candles}根K线，矩阵500x200，取{args.repeat}次最快，当前后端{original}")
+    print_table(["后端", "EMA", "MACD", "矩阵EMA", "交叉检测", "一致性"], rows)
+
+
+def bench_archive(args):
+    """筛选结果归档：写入days天的模拟运行结果，对比列式查询与逐行读取JSON Lines的耗时"""
+    rng = np.random.default_rng(0)
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols - 1)] + ['SOLUSDT']
+    now = int(time.time() * 1000)
+    start_time = now - args.days * DAY_MS
+    step = DAY_MS // args.runs_per_day
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archive = RunArchive(os.path.join(tmp_dir, 'run_archive'))
+        jsonl_path = os.path.join(tmp_dir, 'runs.jsonl')
+        write_start = time.perf_counter()
+        with open(jsonl_path, 'w') as jsonl:
+            for run in range(args.days * args.runs_per_day):
+                run_time = start_time + run * step
+                bullish = rng.random(len(symbols)) < 0.5
+                cross = rng.choice([None, 'golden_cross', 'death_cross'], size=len(symbols), p=[0.9, 0.05, 0.05])
+                results = [AnalysisResult(symbol, "多头" if bull else "空头", c == 'golden_cross', float(value), c, bool(bull),
+                                          bool(bull and c == 'golden_cross'), bool(not bull and c == 'death_cross'), '15m')
+                           for symbol, bull, c, value in zip(symbols, bullish, cross, rng.normal(0, 1, len(symbols)))]
+                archive.append_run(results, run_time=run_time)
+                for result in results:
+                    jsonl.write(json.dumps({'run_time': run_time, 'symbol': result.symbol, 'buy': result.is_buy_signal}) + "\n")
+        write_time = time.perf_counter() - write_start
+
+        def scan_jsonl():
+            since = now - 30 * DAY_MS
+            with open(jsonl_path) as f:
+                return [row['run_time'] for row in map(json.loads, f)
+                        if row['symbol'] == 'SOLUSDT' and row['buy'] and row['run_time'] >= since]
+
+        columnar_start = time.perf_counter()
+        columnar = archive.signal_runs('SOLUSDT', 'buy', days=30, now=now)
+        columnar_time = time.perf_counter() - columnar_start
+        jsonl_start = time.perf_counter()
+        baseline = scan_jsonl()
+        jsonl_time = time.perf_counter() - jsonl_start
+        stats = archive.stats()
+
+    same = columnar.tolist() == sorted(baseline)
+    print(f"结果归档：{args.days}天 x {args.runs_per_day}轮 x {len(symbols)}个币种 = {stats['rows']}行，"
+          f"{stats['partitions']}个分区，{stats['bytes'] / 1024 / 1024:.1f}MB，写入耗时{write_time:.1f}s")
+    print("查询：SOLUSDT最近30天出现买入信号的所有运行")
+    print_table(["实现", "耗时", "结果", "一致性"],
+                [("逐行读取JSON Lines", f"{jsonl_time * 1000:.1f}ms", len(baseline), "参照"),
+                 ("列式归档", f"{columnar_time * 1000:.1f}ms", len(columnar), "一致" if same else "不一致")])
+
+
+def synthetic_history(symbols, candles, seed=0):
+    """随机游走生成的15分钟K线 {symbol: KlineArrays}，开盘时间与4小时对齐"""
+    rng = np.random.default_rng(seed)
+    start = (int(time.time() * 1000) - candles * INTERVAL_MS['15m']) // INTERVAL_MS['4h'] * INTERVAL_MS['4h']
+    open_time = start + np.arange(candles, dtype=np.int64) * INTERVAL_MS['15m']
+    history = {}
+    for i in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, candles)))
+        open_price = np.r_[close[0], close[:-1]]
+        wick = 1 + rng.random(candles) * 0.002
+        history[f"SYM{i:03d}USDT"] = KlineArrays({
+            'open_time': open_time, 'open': open_price, 'close': close,
+            'high': np.maximum(open_price, close) * wick, 'low': np.minimum(open_price, close) / wick,
+            'volume': np.ones(candles)
+        })
+    return history
+
+
+def bench_backtest(args):
+    """向量化回测的耗时，与逐根K线调用analyze_single_currency的估算耗时对比"""
+    candles = int(args.years * 365 * 96)
+    history = synthetic_history(args.symbols, candles)
+
+    start = time.perf_counter()
+    trades = run_backtest(history)
+    summary = summarize_trades(trades)
+    vectorized_time = time.perf_counter() - start
+
+    # 逐根回放：每根K线用最近的K线调用一次analyze_single_currency，只测一个币种的一部分再按比例估算
+    analyzer = CryptoAnalyzer()
+    limit = analyzer.analysis_kline_requests()['15m']
+    symbol, klines = next(iter(history.items()))
+    sample = range(limit, limit + args.sample)
+
+    def replay():
+        return [analyzer.analyze_single_currency(symbol, *analyzer.build_analysis_klines({'15m': klines.head(t + 1).tail(limit)}))
+                for t in sample]
+
+    replayed, replay_time = run_quietly(replay)
+    signals = strategy_signals(klines)
+    same = sum(result.is_buy_signal == signals['buy'][t] and result.is_sell_signal == signals['sell'][t]
+               for result, t in zip(replayed, sample))
+    estimated = replay_time / len(sample) * candles * args.symbols
+
+    print(f"回测：{args.symbols}个币种 x {candles}根15分钟K线（约{args.years}年），交易{summary['trades']}笔，胜率{summary.get('hit_rate', 0):.1f}%")
+    print_table(["实现", "耗时", "加速"],
+                [(f"逐根调用analyze_single_currency（按{len(sample)}根估算）", f"{estimated:.0f}s", "1.0x"),
+                 ("向量化回测", f"{vectorized_time:.2f}s", f"{estimated / vectorized_time:.0f}x")])
+    print(f"抽样{len(sample)}根K线的信号与逐根分析一致{same}根（不一致来自实时分析只用最近50根4小时K线起算EMA）")
+
+
+def bench_sweep(args):
+    """参数扫描：单进程逐组回测 vs 进程池+共享内存，以及中断后续跑"""
+    import pickle
+
+    candles = int(args.years * 365 * 96)
+    history = synthetic_history(args.symbols, candles)
+    grid = {'fast_period': [8, 12, 16], 'slow_period': [26, 34], 'signal_period': [9], 'close_to_signal_pct': [0.3, 0.5]}
+    combos = parameter_grid(grid)
+
+    start = time.perf_counter()
+    serial = {json.dumps(params, sort_keys=True): summarize_trades(run_backtest(history, params=params)) for params in combos}
+    serial_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results_file = os.path.join(tmp_dir, 'sweep.jsonl')
+        start = time.perf_counter()
+        records = run_sweep(history, grid, results_file, workers=args.workers)
+        pool_time = time.perf_counter() - start
+
+        # 模拟中断：只保留前一半结果，再次运行只补算剩下的
+        with open(results_file) as f:
+            lines = f.readlines()
+        with open(results_file, 'w') as f:
+            f.writelines(lines[:len(lines) // 2])
+        start = time.perf_counter()
+        resumed = run_sweep(history, grid, results_file, workers=args.workers)
+        resume_time = time.perf_counter() - start
+
+    same = all(abs(record['summary']['total_pct'] - serial[json.dumps(record['params'], sort_keys=True)]['total_pct']) < 1e-9
+               for record in records + resumed)
+    shared = SharedHistory(history)
+    handle_bytes = len(pickle.dumps(shared.handle()))
+    shared.close()
+    history_bytes = len(pickle.dumps({symbol: klines.columns for symbol, klines in history.items()}))
+    best = rank_results(records)[0]
+
+    print(f"参数扫描：{args.symbols}个币种 x {candles}根15分钟K线，{len(combos)}组参数，结果与单进程{'一致' if same else '不一致'}")
+    print(f"传给每个工作进程的数据：{handle_bytes / 1024:.1f}KB（共享内存），pickle整份历史需要{history_bytes / 1024 / 1024:.1f}MB")
+    print_table(["方式", "耗时", "加速"],
+                [("单进程逐组回测", f"{serial_time:.2f}s", "1.0x"),
+                 (f"进程池（{args.workers}进程）", f"{pool_time:.2f}s", f"{serial_time / pool_time:.1f}x"),
+                 (f"中断后续跑（补算{len(combos) - len(lines) // 2}组）", f"{resume_time:.2f}s", "-")])
+    print(f"累计收益最高：{best['params']}，{best['summary']['total_pct']:.1f}%")
+
+
+def write_kline_archive(path, rows, header=True):
+    """按Binance公开数据的格式写一个K线ZIP（压缩包内为同名csv）"""
+    lines = []
+    if header:
+        lines.append("open_time,open,high,low,close,volume,close_time,quote_volume,count,taker_buy_volume,taker_buy_quote_volume,ignore")
+    lines.extend(",".join(str(value) for value in row) for row in rows)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(os.path.basename(path).replace('.zip', '.csv'), "\n".join(lines) + "\n")
+
+
+def synthetic_archives(directory, symbols, months):
+    """生成symbols个币种、最近months个月的15分钟月度压缩包，外加与最后一个月重叠的日度压缩包
+
+    第一个币种的第二个月去掉一天的K线，用来检查缺口检测。
+
+    Returns:
+        int: 所有文件中的K线总行数
+    """
+    step = INTERVAL_MS['15m']
+    today = datetime.now(timezone.utc)
+    total = 0
+    for i in range(symbols):
+        symbol = f"SYM{i:03d}USDT"
+        year, month = today.year, today.month
+        for m in range(months, 0, -1):
+            y, mo = year, month - m
+            while mo <= 0:
+                y, mo = y - 1, mo + 12
+            start = int(datetime(y, mo, 1, tzinfo=timezone.utc).timestamp() * 1000)
+            ny, nmo = (y, mo + 1) if mo < 12 else (y + 1, 1)
+            end = int(datetime(ny, nmo, 1, tzinfo=timezone.utc).timestamp() * 1000)
+            open_times = list(range(start, end, step))
+            if i == 0 and m == months - 1:
+                open_times = open_times[:96 * 10] + open_times[96 * 11:]
+            rows = [(t, 100.0, 101.0, 99.0, 100.5, 10.0, t + step - 1, 1000.0, 5, 5.0, 500.0, 0) for t in open_times]
+            # 2022年以前的文件没有表头，两种格式都生成
+            write_kline_archive(os.path.join(directory, f"{symbol}-15m-{y}-{mo:02d}.zip"), rows, header=m % 2 == 0)
+            total += len(rows)
+            if m == 1:
+                for day in range(3):
+                    daily = rows[day * 96:(day + 1) * 96]
+                    write_kline_archive(os.path.join(directory, f"{symbol}-15m-{y}-{mo:02d}-{day + 1:02d}.zip"), daily)
+                    total += len(daily)
+    return total
+
+
+def bench_import(args):
+    """历史数据导入：单进程 vs 进程池，重复导入跳过，以及去重和缺口检测"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archive_dir = os.path.join(tmp_dir, 'archives')
+        os.makedirs(archive_dir)
+        total = synthetic_archives(archive_dir, args.symbols, args.months)
+        rows = []
+        for workers in (1, args.workers):
+            db_path = os.path.join(tmp_dir, f'klines_{workers}.db')
+            start = time.perf_counter()
+            summary = import_directory(archive_dir, db_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            files = summary['files']
+            rows.append((f"{workers}进程", len(files), f"{elapsed:.2f}s", f"{total / elapsed:,.0f}",
+                         sum(result['new'] for result in files), sum(result['duplicates'] for result in files)))
+        start = time.perf_counter()
+        again = import_directory(archive_dir, db_path, workers=args.workers)
+        rows.append(("再次导入", len(again['files']), f"{time.perf_counter() - start:.2f}s", "-",
+                     f"跳过{sum(result['skipped'] for result in again['files'])}个文件", "-"))
+        gaps = {key: value for key, value in summary['gaps'].items() if value}
+        errors = [result for result in files if result['error']]
+
+    print(f"历史数据导入：{args.symbols}个币种 x {args.months}个月15分钟K线，共{total}行，"
+          f"分页请求需要{total // 500}次（每次500根）")
+    print_table(["方式", "文件数", "耗时", "行/秒", "新增", "重复"], rows)
+    print(f"缺口检测：{', '.join(f'{symbol} {interval} 缺{sum(c for _, _, c in found)}根' for (symbol, interval), found in gaps.items()) or '无'}；"
+          f"导入失败{len(errors)}个")
+
+
+def bench_scheduler(args):
+    """收盘对齐调度 vs schedule库轮询：快任务每1秒、慢任务每3秒（每次执行2.5秒）
+
+    本地时钟比模拟服务器快skew秒。触发延迟按服务器时间计算（距离上一个周期边界的毫秒数）。
+    """
+    import requests
+    import schedule
+
+    def skewed_get(url):
+        # 模拟本地时钟偏快：服务器返回的时间比本地时间慢skew秒
+        response = requests.get(url, timeout=5)
+        payload = response.json()
+        payload['serverTime'] -= int(args.skew * 1000)
+        response.json = lambda: payload
+        return response
+
+    def make_jobs(clock):
+        lags = {'fast': [], 'slow': []}
+
+        def fast():
+            lags['fast'].append(clock.now_ms() % 1000)
+
+        def slow():
+            lags['slow'].append(clock.now_ms() % 3000)
+            time.sleep(2.5)
+
+        return lags, fast, slow
+
+    rows = []
+    with MockBinanceServer(symbol_count=1) as mock:
+        clock = ServerClock(skewed_get, url=f"{mock.base_url}/fapi/v1/time")
+        clock.sync()
+
+    lags, fast, slow = make_jobs(clock)
+    scheduler = CandleScheduler(clock)
+    scheduler.every(1, fast, name='fast')
+    scheduler.every(3, slow, name='slow')
+    scheduler.run(duration=args.seconds)
+    rows.append(("收盘对齐调度", len(lags['fast']), f"{max(lags['fast']):.0f}ms", len(lags['slow']),
+                 f"{max(lags['slow']):.0f}ms"))
+
+    # schedule库：按本地时间、单线程轮询，慢任务执行期间快任务只能等待
+    lags, fast, slow = make_jobs(clock)
+    schedule.clear()
+    schedule.every(1).seconds.do(fast)
+    schedule.every(3).seconds.do(slow)
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        schedule.run_pending()
+        time.sleep(0.5)
+    schedule.clear()
+    rows.append(("schedule轮询（每0.5秒）", len(lags['fast']), f"{max(lags['fast']):.0f}ms", len(lags['slow']),
+                 f"{max(lags['slow']):.0f}ms"))
+
+    print(f"调度对比：运行{args.seconds}秒，本地时钟偏快{args.skew}秒，测得偏差{clock.offset_ms:+.0f}ms（往返{clock.round_trip_ms:.1f}ms）")
+    print_table(["调度方式", "快任务次数", "快任务最大延迟", "慢任务次数", "慢任务最大延迟"], rows)
+
+
+def bench_priority(args):
+    """持仓币种优先分析：从开始筛选到发出止盈止损提醒的耗时
+
+    持仓放在成交额最低的几个币种上（按成交额顺序分析时排在最后）。
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir, MockBinanceServer(symbol_count=args.symbols, latency=args.latency) as mock:
+        holdings_file = os.path.join(tmp_dir, 'holdings.json')
+        with open(holdings_file, 'w', encoding='utf-8') as f:
+            json.dump({symbol: {'entry_price': 1.0, 'position_type': 'long' if i % 2 else 'short'}
+                       for i, symbol in enumerate(mock.symbols[-args.holdings:])}, f)
+
+        for label, prioritized in (("按成交额顺序", False), ("持仓优先", True)):
+            analyzer = mock.point_analyzer(CryptoAnalyzer())
+            analyzer.holdings_file = holdings_file
+            analyzer.kline_store_file = None
+            analyzer.run_archive_dir = None
+            analyzer.concurrency_log_file = None
+            analyzer.focus_list = []
+            if not prioritized:
+                analyzer.analysis_order = lambda top_currencies, holdings: [symbol for symbol, _ in top_currencies]
+            start = time.perf_counter()
+            alerts = []
+            analyzer.send_dingtalk_notification = lambda message, title=None: alerts.append((title, time.perf_counter() - start))
+            analyzer.send_telegram_notification = lambda message, title=None: True
+            _, elapsed = run_quietly(analyzer.execute_filter)
+            stop_alerts = [at for title, at in alerts if title == "持仓止盈止损提醒"]
+            # 没有提前推送时，止盈止损信号包含在整轮结束后的汇总消息中
+            alert_at = stop_alerts[0] if stop_alerts else elapsed
+            rows.append((label, f"{alert_at:.2f}s", f"{elapsed:.2f}s"))
+            analyzer.http.close()
+    print(f"止盈止损提醒耗时：{args.symbols}个币种，{args.holdings}个持仓（成交额最低），模拟延迟{args.latency * 1000:.0f}ms")
+    print_table(["分析顺序", "发出提醒", "整轮耗时"], rows)
+
+
+def unlimited_rate_limiter():
+    """放宽客户端权重额度的限速器：基准测试连续多轮运行时不因每分钟权重用完而等待"""
+    return BinanceRateLimiter({prefix: 1000000 for prefix in WEIGHT_LIMITS})
+
+
+def quiet_analyzer():
+    """分片工作进程使用的分析器，屏蔽工作进程的打印输出"""
+    sys.stdout = open(os.devnull, 'w')
+    analyzer = CryptoAnalyzer()
+    analyzer.rate_limiter = analyzer.http.rate_limiter = unlimited_rate_limiter()
+    return analyzer
+
+
+def bench_shards(args):
+    """单进程线程池 vs 按币种哈希分片到多个工作进程：完整execute_filter的耗时、请求数和结果
+
+    模拟服务无延迟，耗时主要是MACD和DataFrame计算（受GIL限制，单进程内多线程无法并行）。
+    包含持仓止盈止损检查、波段筛选和结果归档（7天涨幅），分片模式下这些都不应在协调进程重新请求K线。
+    每种方式使用各自的模拟服务（权重额度互不影响），模拟服务的时间固定，两种方式分析完全相同的K线。
+    """
+    rows = []
+    outputs = {}
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        holdings_file = os.path.join(tmp_dir, 'holdings.json')
+
+        def run_rounds(label, shard_workers, pool=None):
+            with MockBinanceServer(symbol_count=args.symbols, clock=lambda: now) as mock:
+                with open(holdings_file, 'w', encoding='utf-8') as f:
+                    json.dump({symbol: {'entry_price': 1.0, 'position_type': 'long' if i % 2 else 'short'}
+                               for i, symbol in enumerate(mock.symbols[:4])}, f)
+                analyzer = mock.point_analyzer(CryptoAnalyzer())
+                analyzer.rate_limiter = analyzer.http.rate_limiter = unlimited_rate_limiter()
+                analyzer.holdings_file = holdings_file
+                analyzer.kline_store_file = None
+                analyzer.run_archive_dir = os.path.join(tmp_dir, label)
+                analyzer.concurrency_log_file = None
+                analyzer.focus_list = []
+                analyzer.shard_workers = shard_workers
+                if pool is not None:
+                    analyzer.shard_authkey = pool.authkey
+                messages = []
+                analyzer.send_dingtalk_notification = lambda message, title=None: messages.append(message.split("\n", 1)[1])
+                analyzer.send_telegram_notification = lambda message, title=None: True
+                # 取第二轮（第一轮建立HTTP连接池）
+                run_quietly(analyzer.execute_filter)
+                messages.clear()
+                requests_before = mock.request_count
+                _, elapsed = run_quietly(analyzer.execute_filter)
+                requests = mock.request_count - requests_before
+                analyzer.http.close()
+                data = analyzer.run_archive.scan(['run_time', 'symbol', 'buy', 'sell', 'growth_7d'])
+                last = data['run_time'] == data['run_time'].max()
+                archived = sorted(zip(data['symbol'][last], data['buy'][last], data['sell'][last],
+                                      np.round(data['growth_7d'][last], 6)))
+                # 止盈止损提醒中的币种顺序取决于完成顺序，按行排序后比较
+                outputs[label] = (archived, [sorted(message.splitlines()) for message in messages])
+                return elapsed, requests
+
+        elapsed, requests = run_rounds('single', [])
+        rows.append(("单进程线程池", f"{elapsed:.2f}s", requests, "-"))
+        with LocalShardPool(args.workers, quiet_analyzer, family=args.family) as pool:
+            elapsed, requests = run_rounds('sharded', pool.addresses, pool)
+        mismatches = "一致" if outputs['sharded'] == outputs['single'] else "不一致"
+        rows.append((f"{args.workers}个工作进程（{args.family}）", f"{elapsed:.2f}s", requests, mismatches))
+    print(f"分片分析：{args.symbols}个币种，本机{os.cpu_count()}个CPU核，请求数为本轮模拟服务收到的全部请求（含工作进程）")
+    print_table(["方式", "耗时", "请求数", "归档结果和推送"], rows)
+
+
+def bench_concurrency(args):
+    """固定并发 vs AIMD自适应并发：正常和服务端拥塞（同时处理超过capacity个请求时延迟成倍增加）两种情况
+
+    每种组合先预热一轮，再连续运行rounds轮execute_filter，自适应并发在各轮之间保留学到的并发数。
+    """
+    rows = []
+    for scenario, capacity in (("正常", None), (f"拥塞（容量{args.capacity}）", args.capacity)):
+        for label, adaptive in (("固定并发", False), ("自适应并发", True)):
+            with MockBinanceServer(symbol_count=args.symbols, latency=args.latency, capacity=capacity) as mock:
+                analyzer = mock.point_analyzer(CryptoAnalyzer())
+                analyzer.holdings_file = '__benchmark_no_holdings__.json'
+                analyzer.kline_store_file = None
+                analyzer.run_archive_dir = None
+                analyzer.concurrency_log_file = None
+                # 只比较延迟拥塞下的表现：放宽客户端权重额度，多轮连续运行时不因每分钟权重用完而暂停
+                analyzer.rate_limiter = analyzer.http.rate_limiter = unlimited_rate_limiter()
+                # 预热一轮（建立连接、首次计算），不计入结果；之后换成新的控制器，从初始并发开始学习
+                run_quietly(analyzer.execute_filter)
+                if adaptive:
+                    analyzer.fetch_concurrency = AdaptiveConcurrency(max_limit=analyzer.max_workers)
+                else:
+                    # 原来的行为：始终按线程池大小并发
+                    analyzer.fetch_concurrency = AdaptiveConcurrency(initial=analyzer.max_workers, min_limit=analyzer.max_workers,
+                                                                     max_limit=analyzer.max_workers)
+                elapsed, latencies, limits, decreases = [], [], [], 0
+                for _ in range(args.rounds):
+                    _, seconds = run_quietly(analyzer.execute_filter)
+                    summary = analyzer.fetch_concurrency.summary()
+                    elapsed.append(seconds)
+                    latencies.append(summary['avg_latency_ms'])
+                    limits.append(summary['final_limit'])
+                    decreases += summary['decreases']
+                analyzer.http.close()
+            rows.append((scenario, label, " / ".join(f"{seconds:.2f}s" for seconds in elapsed),
+                         f"{np.mean(latencies):.0f}ms", " → ".join(map(str, limits)), decreases))
+    print(f"K线并发控制：{args.symbols}个币种，模拟延迟{args.latency * 1000:.0f}ms，每种组合{args.rounds}轮")
+    print_table(["情况", "并发方式", "各轮耗时", "平均请求延迟", "各轮结束时并发", "降低次数"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dogWatcher性能对比")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser("fetch", help="线程池 vs asyncio K线抓取")
+    fetch_parser.add_argument("--symbols", type=int, default=100)
+    fetch_parser.add_argument("--latency", type=float, default=0.05)
+    fetch_parser.add_argument("--concurrency", type=int, default=50)
+    fetch_parser.set_defaults(func=bench_fetch)
+
+    store_parser = subparsers.add_parser("store", help="本地K线存储的尾部增量刷新")
+    store_parser.add_argument("--symbols", type=int, default=100)
+    store_parser.add_argument("--latency", type=float, default=0.05)
+    store_parser.set_defaults(func=bench_store)
+
+    stream_parser = subparsers.add_parser("stream", help="推送模式离线运行（本地WebSocket模拟）")
+    stream_parser.add_argument("--symbols", type=int, default=10)
+    stream_parser.add_argument("--seconds", type=float, default=10)
+    stream_parser.add_argument("--candle-seconds", type=float, default=2.0)
+    stream_parser.set_defaults(func=bench_stream)
+
+    decode_parser = subparsers.add_parser("decode", help="K线解码微基准")
+    decode_parser.add_argument("--symbols", type=int, default=50)
+    decode_parser.add_argument("--repeat", type=int, default=5)
+    decode_parser.set_defaults(func=bench_decode)
+
+    batch_parser = subparsers.add_parser("batch", help="逐个币种 vs 矩阵批量MACD分析")
+    batch_parser.add_argument("--symbols", type=int, default=500)
+    batch_parser.add_argument("--repeat", type=int, default=5)
+    batch_parser.set_defaults(func=bench_batch)
+
+    crossrule_parser = subparsers.add_parser("crossrule", help="金叉规则：逐根查找 vs 交叉索引")
+    crossrule_parser.add_argument("--candles", type=int, default=10000)
+    crossrule_parser.add_argument("--repeat", type=int, default=3)
+    crossrule_parser.set_defaults(func=bench_crossrule)
+
+    kernels_parser = subparsers.add_parser("kernels", help="指标计算后端（numpy/pandas/numba）对比")
+    kernels_parser.add_argument("--candles", type=int, default=10000)
+    kernels_parser.add_argument("--repeat", type=int, default=5)
+    kernels_parser.set_defaults(func=bench_kernels)
+
+    archive_parser = subparsers.add_parser("archive", help="筛选结果列式归档的写入和查询")
+    archive_parser.add_argument("--days", type=int, default=30)
+    archive_parser.add_argument("--symbols", type=int, default=100)
+    archive_parser.add_argument("--runs-per-day", type=int, default=96)
+    archive_parser.set_defaults(func=bench_archive)
+
+    backtest_parser = subparsers.add_parser("backtest", help="向量化回测 vs 逐根K线分析")
+    backtest_parser.add_argument("--symbols", type=int, default=100)
+    backtest_parser.add_argument("--years", type=float, default=2)
+    backtest_parser.add_argument("--sample", type=int, default=500)
+    backtest_parser.set_defaults(func=bench_backtest)
+
+    sweep_parser = subparsers.add_parser("sweep", help="参数扫描：单进程 vs 进程池+共享内存")
+    sweep_parser.add_argument("--symbols", type=int, default=50)
+    sweep_parser.add_argument("--years", type=float, default=1)
+    sweep_parser.add_argument("--workers", type=int, default=4)
+    sweep_parser.set_defaults(func=bench_sweep)
+
+    import_parser = subparsers.add_parser("import", help="Binance公开数据K线压缩包导入")
+    import_parser.add_argument("--symbols", type=int, default=10)
+    import_parser.add_argument("--months", type=int, default=12)
+    import_parser.add_argument("--workers", type=int, default=4)
+    import_parser.set_defaults(func=bench_import)
+
+    scheduler_parser = subparsers.add_parser("scheduler", help="K线收盘对齐调度 vs schedule轮询")
+    scheduler_parser.add_argument("--seconds", type=float, default=12)
+    scheduler_parser.add_argument("--skew", type=float, default=1.5)
+    scheduler_parser.set_defaults(func=bench_scheduler)
+
+    priority_parser = subparsers.add_parser("priority", help="持仓币种优先分析的止盈止损提醒耗时")
+    priority_parser.add_argument("--symbols", type=int, default=100)
+    priority_parser.add_argument("--holdings", type=int, default=5)
+    priority_parser.add_argument("--latency", type=float, default=0.05)
+    priority_parser.set_defaults(func=bench_priority)
+
+    shards_parser = subparsers.add_parser("shards", help="单进程 vs 多进程分片分析")
+    shards_parser.add_argument("--symbols", type=int, default=200)
+    shards_parser.add_argument("--workers", type=int, default=4)
+    shards_parser.add_argument("--family", choices=["AF_INET", "AF_UNIX"], default="AF_INET")
+    shards_parser.set_defaults(func=bench_shards)
+
+    concurrency_parser = subparsers.add_parser("concurrency", help="固定并发 vs AIMD自适应K线并发")
+    concurrency_parser.add_argument("--symbols", type=int, default=100)
+    concurrency_parser.add_argument("--latency", type=float, default=0.05)
+    concurrency_parser.add_argument("--capacity", type=int, default=3)
+    concurrency_parser.add_argument("--rounds", type=int, default=3)
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kline_store import INTERVAL_MS
+
+SERVER_TIME_URL = 'https://fapi.binance.com/fapi/v1/time'
+
+
+class ServerClock:
+    """交易所服务器时间：本地时间加上用/fapi/v1/time测得的偏差
+
+    每次同步请求若干次，取往返时间最短的一次，偏差 = 服务器时间 - 请求发出和收到响应的中点。
+    同步失败时沿用上次的偏差（首次失败则为0，即本地时间）。
+    """
+
+    def __init__(self, http_get, url=SERVER_TIME_URL, samples=5):
+        """
+        Args:
+            http_get: 发送GET请求的函数，签名为http_get(url)，返回requests风格的响应
+            samples: 每次同步的请求次数
+        """
+        self.http_get = http_get
+        self.url = url
+        self.samples = samples
+        self.offset_ms = 0.0
+        self.round_trip_ms = None
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """测量本地与服务器的时间偏差，返回是否成功"""
+        best = None
+        for _ in range(self.samples):
+            try:
+                sent = time.time() * 1000
+                response = self.http_get(self.url)
+                received = time.time() * 1000
+                response.raise_for_status()
+                server_time = response.json()['serverTime']
+            except Exception as e:
+                print(f"同步服务器时间失败: {e}")
+                continue
+            round_trip = received - sent
+            if best is None or round_trip < best[0]:
+                best = (round_trip, server_time - (sent + received) / 2)
+        if best is None:
+            return False
+        with self._lock:
+            self.round_trip_ms, self.offset_ms = best
+            self.synced_at = time.time()
+        return True
+
+    def now_ms(self):
+        """当前服务器时间（毫秒）"""
+        with self._lock:
+            offset = self.offset_ms
+        return time.time() * 1000 + offset
+
+
+class _Job:
+    __slots__ = ('name', 'interval', 'func', 'delay_ms', 'next_run_ms', 'running', 'runs', 'skipped',
+                 'errors', 'last_lag_ms', 'max_lag_ms')
+
+    def __init__(self, name, interval, func, delay_ms):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.delay_ms = delay_ms
+        self.next_run_ms = None
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_lag_ms = None
+        self.max_lag_ms = 0.0
+
+
+class CandleScheduler:
+    """按K线收盘时刻（服务器时间）触发任务的调度器
+
+    每个任务在其周期的每个收盘边界（如15m为每个整15分钟）加上delay秒后触发，
+    主线程睡到最近一个触发时刻为止，不轮询。任务在线程池中执行，不同任务互不阻塞；
+    同一个任务上一次还没执行完时，本次触发跳过（不排队）。
+    """
+
+    def __init__(self, clock=None, max_workers=4):
+        """
+        Args:
+            clock: ServerClock，None则使用本地时间
+            max_workers: 同时执行的任务数上限
+        """
+        self.clock = clock
+        self.max_workers = max_workers
+        self.jobs = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def now_ms(self):
+        return self.clock.now_ms() if self.clock is not None else time.time() * 1000
+
+    @staticmethod
+    def interval_ms(interval):
+        """周期的毫秒数：K线周期（如'15m'）或秒数"""
+        if isinstance(interval, str):
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"不支持的周期: {interval}")
+            return INTERVAL_MS[interval]
+        return int(interval * 1000)
+
+    @classmethod
+    def next_boundary(cls, now_ms, interval, delay_ms=0):
+        """now_ms之后（不含）的第一个interval收盘时刻加delay_ms"""
+        interval_ms = cls.interval_ms(interval)
+        boundary = (now_ms - delay_ms) // interval_ms * interval_ms + interval_ms + delay_ms
+        return int(boundary)
+
+    def every(self, interval, func, delay=0.0, name=None):
+        """登记一个任务：每个interval周期收盘后delay秒执行func()
+
+        interval为K线周期（如'5m'、'15m'、'1h'、'4h'），也可以直接传秒数（从UTC零点起对齐）。
+        """
+        self.interval_ms(interval)
+        job = _Job(name or getattr(func, '__name__', repr(func)), interval, func, int(delay * 1000))
+        self.jobs.append(job)
+        return job
+
+    def _execute(self, job, scheduled_ms):
+        lag = self.now_ms() - scheduled_ms
+        with self._lock:
+            job.last_lag_ms = lag
+            job.max_lag_ms = max(job.max_lag_ms, lag)
+        try:
+            job.func()
+        except Exception as e:
+            with self._lock:
+                job.errors += 1
+            print(f"定时任务{job.name}执行出错: {e}")
+        finally:
+            with self._lock:
+                job.running = False
+                job.runs += 1
+
+    def run(self, duration=None):
+        """阻塞运行，直到stop()被调用、duration秒后或按Ctrl+C"""
+        self._stop.clear()
+        deadline = None if duration is None else time.monotonic() + duration
+        now = self.now_ms()
+        # (触发时刻, 登记顺序, 任务)
+        queue = []
+        for order, job in enumerate(self.jobs):
+            job.next_run_ms = self.next_boundary(now, job.interval, job.delay_ms)
+            heapq.heappush(queue, (job.next_run_ms, order, job))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='candle-job')
+        try:
+            while queue and not self._stop.is_set():
+                run_at, order, job = queue[0]
+                wait = (run_at - self.now_ms()) / 1000
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                if wait > 0:
+                    # 等到触发时刻；时钟偏差在等待期间被重新同步时，醒来后按新的时间重新计算
+                    if self._stop.wait(min(wait, 60)):
+                        break
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    continue
+
+                heapq.heappop(queue)
+                with self._lock:
+                    busy = job.running
+                    if busy:
+                        job.skipped += 1
+                    else:
+                        job.running = True
+                if busy:
+                    print(f"定时任务{job.name}上一次尚未完成，跳过本次（{job.interval}）")
+                else:
+                    executor.submit(self._execute, job, run_at)
+                job.next_run_ms = self.next_boundary(max(self.now_ms(), run_at), job.interval, job.delay_ms)
+                heapq.heappush(queue, (job.next_run_ms, order, job))
+        except KeyboardInterrupt:
+            print("\n程序已手动停止")
+        finally:
+            self._stop.set()
+            executor.shutdown(wait=True)
+
+    def stop(self):
+        """停止调度（正在执行的任务会执行完）"""
+        self._stop.set()
+
+    def stats(self):
+        """各任务的执行次数、跳过次数、出错次数和触发延迟（毫秒）"""
+        with self._lock:
+            return {
+                job.name: {
+                    'interval': job.interval,
+                    'runs': job.runs,
+                    'skipped': job.skipped,
+                    'errors': job.errors,
+                    'last_lag_ms': job.last_lag_ms,
+                    'max_lag_ms': job.max_lag_ms
+                }
+                for job in self.jobs
+            }
@@ -0,0 +1,228 @@
+import asyncio
+import statistics
+import threading
+import time
+
+# 视为出错的HTTP状态（None表示请求异常，如超时、连接失败）
+ERROR_STATUSES = (None, 418, 429, 500, 502, 503, 504)
+
+# 并发调整依据的中文名称
+CONCURRENCY_SIGNAL_NAMES = {
+    'errors': '出错',
+    'weight': '权重',
+    'latency': '延迟',
+    'saturated': '并发用满',
+    'idle': '并发未用满'
+}
+
+
+class AdaptiveConcurrency:
+    """按AIMD调整同时在途的K线请求数
+
+    每完成"当前并发数"个请求（约一个往返）做一次决定：
+    - 出错比例超过error_threshold、本分钟已用权重超过weight_high、或延迟中位数超过基准的latency_tolerance倍时，
+      并发数乘以decrease_factor（乘性减）；
+    - 否则在这段时间内并发数被用满时加1（加性增），没用满则保持不变；
+      第一次降低之前处于慢启动阶段，用满时翻倍，尽快接近合适的并发数。
+    降低之后，在降低之前就已发出的请求不计入下一个窗口，避免同一次拥塞被连续降低多次。
+    基准延迟为见过的单个请求延迟的最小值（近似没有排队时的往返时间），跨轮次保留。
+    不用窗口中位数：慢启动很快把并发加到拥塞点，低并发的窗口太少，中位数的最小值本身就已包含排队，拥塞时也不会超出容忍倍数。
+    并发已经降到下限仍判为拥塞时，说明是网络本身变慢而不是请求太多，改用当前延迟作为新的基准。
+    每次决定都记录下来（decisions），start_run()开始新的一轮记录。
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=10, latency_tolerance=2.0, error_threshold=0.1,
+                 weight_high=0.8, decrease_factor=0.5, min_samples=4, latency_floor=0.02):
+        """
+        Args:
+            initial: 初始并发数
+            min_limit / max_limit: 并发数的下限/上限
+            latency_tolerance: 延迟中位数超过基准延迟的多少倍视为拥塞
+            error_threshold: 窗口内出错比例的上限
+            weight_high: 本分钟已用权重占上限的比例超过这个值时降低并发
+            decrease_factor: 乘性减的系数
+            min_samples: 每个窗口至少的请求数
+            latency_floor: 基准延迟低于这个值（秒）时按这个值判断拥塞，避免本机/内网的毫秒级抖动被当成拥塞
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.weight_high = weight_high
+        self.decrease_factor = decrease_factor
+        self.min_samples = min_samples
+        self.latency_floor = latency_floor
+        self.baseline_latency = None
+        self.in_flight = 0
+        self._peak_in_flight = 0
+        self._samples = []
+        self._decreased_at = 0.0
+        self.slow_start = True
+        self._condition = threading.Condition()
+        # 等待名额的协程：[(事件循环, asyncio.Event)]，名额可能空出时从释放名额的线程唤醒
+        self._async_waiters = []
+        self.run_started = time.monotonic()
+        self.run_initial_limit = self.limit
+        self.decisions = []
+        self.requests = 0
+        self.errors = 0
+        self.latency_total = 0.0
+
+    def start_run(self, max_limit=None):
+        """开始新的一轮：清空决定记录和未满一个窗口的样本，可以同时改变并发上限（如切换抓取模式）"""
+        with self._condition:
+            if max_limit is not None:
+                self.max_limit = max(max_limit, self.min_limit)
+                self.limit = max(self.min_limit, min(self.limit, self.max_limit))
+            self._samples = []
+            self._peak_in_flight = self.in_flight
+            self.run_started = time.monotonic()
+            self.run_initial_limit = self.limit
+            self.decisions = []
+            self.requests = 0
+            self.errors = 0
+            self.latency_total = 0.0
+            self._notify_waiters()
+
+    def _notify_waiters(self):
+        """唤醒所有等待名额的线程和协程（调用方持有self._condition），被唤醒后各自重新检查名额"""
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def try_acquire(self):
+        """有空闲名额时占用一个并返回True，否则返回False"""
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+            return True
+
+    def acquire(self):
+        """占用一个名额，在途请求数达到当前并发数时阻塞等待"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+
+    async def acquire_async(self):
+        """acquire的协程版本（与线程共用同一份名额），没有名额时等待release/start_run唤醒，不轮询"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+                    return
+                # 在锁内登记，检查名额和登记之间释放的名额不会漏掉唤醒
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1].wait()
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, latency, status, weight_ratio=None):
+        """请求完成后释放名额并记录结果
+
+        Args:
+            latency: 请求耗时（秒）
+            status: HTTP状态码，请求异常时为None
+            weight_ratio: 可选，本分钟已用权重占上限的比例
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            self.latency_total += latency
+            error = status in ERROR_STATUSES
+            self.errors += error
+            if time.monotonic() - latency >= self._decreased_at:
+                self._samples.append((latency, error, weight_ratio))
+                if len(self._samples) >= max(self.limit, self.min_samples):
+                    self._decide()
+            self._notify_waiters()
+
+    def _decide(self):
+        samples, self._samples = self._samples, []
+        latencies = [latency for latency, error, _ in samples if not error]
+        error_rate = sum(error for _, error, _ in samples) / len(samples)
+        ratios = [ratio for _, _, ratio in samples if ratio is not None]
+        weight_ratio = max(ratios) if ratios else None
+        latency = statistics.median(latencies) if latencies else None
+        if latencies and (self.baseline_latency is None or min(latencies) < self.baseline_latency):
+            self.baseline_latency = min(latencies)
+        baseline = self.baseline_latency
+
+        before = self.limit
+        if error_rate > self.error_threshold:
+            action, signal, reason = 'decrease', 'errors', f"出错比例{error_rate * 100:.0f}%"
+        elif weight_ratio is not None and weight_ratio >= self.weight_high:
+            action, signal, reason = 'decrease', 'weight', f"已用权重{weight_ratio * 100:.0f}%"
+        elif latency is not None and latency > max(baseline, self.latency_floor) * self.latency_tolerance:
+            if self.limit > self.min_limit:
+                action, signal, reason = 'decrease', 'latency', f"延迟{latency * 1000:.0f}ms，超过基准{baseline * 1000:.0f}ms的{self.latency_tolerance:g}倍"
+            else:
+                self.baseline_latency = latency
+                action, signal, reason = 'hold', 'latency', f"并发已是下限，延迟{latency * 1000:.0f}ms作为新的基准"
+        elif self._peak_in_flight >= self.limit:
+            if self.limit < self.max_limit:
+                action, signal, reason = 'increase', 'saturated', "慢启动：并发已用满且无拥塞" if self.slow_start else "并发已用满且无拥塞"
+            else:
+                action, signal, reason = 'hold', 'saturated', "并发已达上限"
+        else:
+            action, signal, reason = 'hold', 'idle', "并发未用满"
+
+        if action == 'decrease':
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+            self._decreased_at = time.monotonic()
+            self.slow_start = False
+        elif action == 'increase':
+            self.limit = min(self.max_limit, self.limit * 2 if self.slow_start else self.limit + 1)
+        self._peak_in_flight = self.in_flight
+        self.decisions.append({
+            'at': round(time.monotonic() - self.run_started, 3),
+            'action': action,
+            'signal': signal,
+            'reason': reason,
+            'limit_before': before,
+            'limit': self.limit,
+            'samples': len(samples),
+            'latency_ms': None if latency is None else round(latency * 1000, 1),
+            'baseline_ms': None if self.baseline_latency is None else round(self.baseline_latency * 1000, 1),
+            'error_rate': round(error_rate, 3),
+            'weight_ratio': None if weight_ratio is None else round(weight_ratio, 3)
+        })
+
+    def summary(self):
+        """本轮的统计：耗时、请求数、出错数、平均延迟、初始/最终/最高/最低并发数、增减次数和各降低原因（errors/weight/latency）的次数"""
+        with self._condition:
+            decisions = list(self.decisions)
+            limits = [self.run_initial_limit] + [decision['limit'] for decision in decisions]
+            decrease_reasons = {}
+            for decision in decisions:
+                if decision['action'] == 'decrease':
+                    decrease_reasons[decision['signal']] = decrease_reasons.get(decision['signal'], 0) + 1
+            return {
+                'seconds': round(time.monotonic() - self.run_started, 3),
+                'requests': self.requests,
+                'errors': self.errors,
+                'avg_latency_ms': round(self.latency_total / self.requests * 1000, 1) if self.requests else None,
+                'initial_limit': self.run_initial_limit,
+                'final_limit': self.limit,
+                'max_limit_reached': max(limits),
+                'min_limit_reached': min(limits),
+                'increases': sum(decision['action'] == 'increase' for decision in decisions),
+                'decreases': sum(decision['action'] == 'decrease' for decision in decisions),
+                'decrease_reasons': decrease_reasons,
+                'baseline_ms': None if self.baseline_latency is None else round(self.baseline_latency * 1000, 1)
+            }
@@ -1,5 +1,4 @@
 import requests
-from requests.adapters import HTTPAdapter, Retry
 import urllib3
 # 抑制urllib3的不安全请求警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -9,12 +8,35 @@ import time
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import heapq
-import schedule
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 import json
 import os
 
+from analysis_result import AnalysisResult, AnalysisResults
+from async_kline_fetcher import AsyncKlineFetcher
+from backtest import load_history, run_backtest, summarize_trades
+from batch_signals import macd_signal_masks, stack_columns
+from candle_scheduler import CandleScheduler, ServerClock
+from concurrency_controller import CONCURRENCY_SIGNAL_NAMES, AdaptiveConcurrency
+from param_sweep import DEFAULT_SWEEP_GRID, parameter_grid, rank_results, run_sweep
+from http_client import PooledHttpClient
+from indicator_graph import IndicatorCache, IndicatorGraph
+from indicators import MacdCrossIndex, macd
+from kline_arrays import KlineArrays, decode_klines
+from kline_buffer import KlineBuffer
+from kline_import import import_directory
+from kline_resample import compare_klines, resample_kline_arrays, resample_klines
+from kline_store import INTERVAL_MS, KlineStore
+from kline_stream import FUTURES_STREAM_URL
+from price_snapshot import PriceSnapshot
+from rate_limiter import BinanceRateLimiter
+from run_archive import DAY_MS, RunArchive, format_run_time
+from shard_workers import SHARD_SETTINGS, ShardCoordinator, shard_authkey
+from single_flight import SingleFlight
+from stream_runner import StreamRunner
+from swing_points import DEFAULT_SWING_WINDOW, swing_summary
+
 # 设置中文显示
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
 plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
@@ -48,6 +70,64 @@ class CryptoAnalyzer:
         self.previous_total_pnl = 0
         # 用于跟踪正在进行的疯狂推送任务，避免重复推送
         self.active_mad_pushes = set()
+        # 并发分析的最大线程数，连接池大小与之保持一致
+        self.max_workers = 10
+        # 按请求权重限速，线程池、5分钟盈亏检查和疯狂推送线程共用同一份额度
+        self.rate_limiter = BinanceRateLimiter()
+        # 所有Binance和webhook请求共用的长连接客户端
+        self.http = PooledHttpClient(pool_size=self.max_workers, rate_limiter=self.rate_limiter)
+        # 同时在途的K线请求数按延迟、出错比例和已用权重自动增减（线程池大小/异步并发数为上限），每轮的调整记录追加到日志文件
+        self.fetch_concurrency = AdaptiveConcurrency(initial=4, max_limit=self.max_workers)
+        self.concurrency_log_file = 'concurrency_log.jsonl'
+        # 全市场价格快照，一次请求获取所有币种价格，短时间内的查询直接读内存
+        # 价格和服务器时间请求验证SSL证书（K线和推送请求保持原来的不验证）
+        self.price_snapshot = PriceSnapshot(lambda url: self.http.get(url, timeout=10, verify=True))
+        # 定时任务按交易所服务器时间在K线收盘时触发：筛选分析跟随15分钟K线，持仓盈亏每5分钟检查一次
+        self.server_clock = ServerClock(lambda url: self.http.get(url, timeout=10, verify=True))
+        self.filter_interval = '15m'
+        self.pnl_check_interval = '5m'
+        # K线收盘后等待的秒数，让交易所完成收盘K线的数据更新
+        self.candle_close_delay = 1.0
+        # K线抓取模式：'thread'为线程池逐个请求，'async'为asyncio并发抓取
+        self.fetch_mode = 'thread'
+        # 异步模式下同时在途的最大请求数
+        self.async_concurrency = 50
+        # MACD分析模式：'thread'为线程池逐个币种分析，'batch'为所有币种K线到齐后矩阵化一次算完
+        self.analysis_mode = 'thread'
+        # 分片工作进程地址（'host:port'或Unix socket路径），非空时币种按哈希分给这些进程分析
+        self.shard_workers = []
+        # 工作进程的认证密钥（SHARD_AUTHKEY环境变量）；未设置时只能连接本机的工作进程
+        self.shard_authkey = shard_authkey()
+        # 本轮分片工作进程随结果发回的 {symbol: symbol_extras()}，非分片模式为空
+        self.shard_extras = {}
+        # 每个币种分析所需的K线周期和数量（大周期4h，小周期15m）
+        self.analysis_kline_limits = {'4h': 50, '15m': 200}
+        # 4小时K线由15分钟K线在本地合成，每个币种每轮只需请求一次
+        self.derive_4h_from_15m = True
+        # 分析路径把K线直接解码为numpy数组，不构造DataFrame
+        self.use_kline_arrays = True
+        # 各(币种, 周期)的K线环形缓冲区，跨轮次保留，每轮只合并新增的尾部K线
+        self.kline_buffers = {}
+        # 同一轮内相同(币种, 周期, 数量)的K线请求只发一次，并发和重复调用共享结果
+        self.kline_flight = SingleFlight()
+        # 同一轮内相同(币种, 周期, K线)的MACD、交叉等指标只算一次，分析、止盈止损检查和画图共用
+        self.indicator_cache = IndicatorCache()
+        # 波段低点抬高筛选：用本轮已获取的15分钟K线合成1小时K线，前后16根中的最低/最高为波段点
+        self.swing_screen_enabled = True
+        self.swing_interval = '1h'
+        self.swing_window = DEFAULT_SWING_WINDOW
+        # 推送模式使用的合约组合流地址
+        self.stream_url = FUTURES_STREAM_URL
+        # 本地K线存储文件，设为None则每次都全量请求
+        self.kline_store_file = 'klines.db'
+        self._kline_store = None
+        self._kline_store_lock = threading.Lock()
+        # 每轮筛选结果的列式归档目录，设为None则不归档
+        self.run_archive_dir = 'run_archive'
+        # 参数扫描结果文件（每完成一组参数追加一行，中断后再次运行从断点继续）
+        self.sweep_results_file = 'sweep_results.jsonl'
+        self._run_archive = None
+        self._run_archive_lock = threading.Lock()
     
     def load_focus_list(self):
         """加载重点关注列表"""
@@ -69,91 +149,108 @@ class CryptoAnalyzer:
         except Exception as e:
             print(f"保存重点关注列表出错: {e}")
         
+    @property
+    def kline_store(self):
+        """本地K线存储，首次使用时打开"""
+        if self.kline_store_file is None:
+            return None
+        with self._kline_store_lock:
+            if self._kline_store is None:
+                self._kline_store = KlineStore(self.kline_store_file)
+            return self._kline_store
+    
+    @property
+    def run_archive(self):
+        """筛选结果归档，首次使用时打开"""
+        if self.run_archive_dir is None:
+            return None
+        with self._run_archive_lock:
+            if self._run_archive is None:
+                self._run_archive = RunArchive(self.run_archive_dir)
+            return self._run_archive
+    
     def get_futures_klines(self, symbol, interval, limit=500, max_retries=3):
-        """从Binance合约API获取K线数据，带重试机制和SSL错误处理"""
-        params = {
-            'symbol': symbol,
-            'interval': interval,
-            'limit': limit
-        }
+        """从Binance合约API获取K线数据，带重试机制和SSL错误处理
         
-        # 设置超时和重试
-        session = requests.Session()
+        启用本地K线存储时只请求最后一根已存K线之后的数据，合并后返回最近limit根。
+        """
+        data = self.get_futures_klines_raw(symbol, interval, limit, max_retries)
+        if data is None:
+            return None
+        return self.klines_to_dataframe(data)
+    
+    def get_futures_klines_raw(self, symbol, interval, limit=500, max_retries=3):
+        """与get_futures_klines相同，但返回Binance原始格式（列表的列表）
         
-        # 处理Retry参数兼容性问题
-        retry_kwargs = {
-            'total': max_retries,
-            'backoff_factor': 0.3,  # 减少重试间隔
-            'status_forcelist': [429, 500, 502, 503, 504]  # 指定需要重试的HTTP状态码
-        }
+        同一轮内的重复请求复用同一份结果，调用方不要修改返回的列表。
+        """
+        def fetch():
+            params = self.kline_request_params(symbol, interval, limit)
+            data = self.fetch_klines_raw(symbol, interval, params, max_retries)
+            if data is None:
+                return None
+            return self.merge_klines(symbol, interval, limit, data)
         
-        # 尝试使用allowed_methods（新版本），如果失败则回退
+        return self.kline_flight.do(('raw', symbol, interval, limit), fetch)
+    
+    def print_rate_limit_status(self):
+        """输出当前请求权重使用情况"""
+        for prefix, usage in self.rate_limiter.utilization().items():
+            if not usage['requests']:
+                continue
+            print(f"请求权重({prefix}): 已用{usage['used_weight']:.0f}/{usage['limit']} ({usage['utilization_pct']:.1f}%), "
+                  f"累计{usage['requests']}次请求共{usage['weight_total']}权重, "
+                  f"限速等待{usage['waits']}次共{usage['wait_seconds']:.1f}秒, 429/418 {usage['throttled']}次")
+    
+    def kline_request_params(self, symbol, interval, limit):
+        """生成klines接口的请求参数，有本地存储时只请求尾部"""
+        store = self.kline_store
+        if store is None:
+            return {'symbol': symbol, 'interval': interval, 'limit': limit}
+        params = store.refresh_params(symbol, interval, limit)
+        store.record_refresh(params)
+        return params
+    
+    def merge_klines(self, symbol, interval, limit, data):
+        """把新获取的K线合并进本地存储，返回最近limit根（Binance原始格式）"""
+        store = self.kline_store
+        if store is None:
+            return data
+        store.upsert(symbol, interval, data)
+        return store.load(symbol, interval, limit)
+    
+    def get_klines_response(self, params):
+        """发送一次K线请求，由fetch_concurrency控制在途数量，并把耗时、状态和已用权重反馈给它
+
+        先按权重排队再占用并发名额，反馈的耗时只包含HTTP往返，不包含限速器的等待（与异步抓取一致）。
+        """
+        self.rate_limiter.acquire(self.binance_futures_url, params)
+        self.fetch_concurrency.acquire()
+        started = time.perf_counter()
+        status = None
         try:
-            # 测试Retry是否接受allowed_methods参数
-            test_retry = Retry(**retry_kwargs, allowed_methods=["GET"])
-            retry_kwargs['allowed_methods'] = ["GET"]
-        except TypeError:
-            # 旧版本使用method_whitelist
-            retry_kwargs['method_whitelist'] = ["GET"]
-        
-        retry = Retry(**retry_kwargs)
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('https://', adapter)
-        session.mount('http://', adapter)
-        # 添加请求头和超时优化
-        headers = {'Accept-Encoding': 'gzip, deflate'}
-        
+            response = self.http.get(self.binance_futures_url, params=params, timeout=15, acquired=True)
+            status = response.status_code
+            return response
+        finally:
+            self.fetch_concurrency.release(time.perf_counter() - started, status,
+                                           self.rate_limiter.weight_ratio(self.binance_futures_url))
+    
+    def fetch_klines_raw(self, symbol, interval, params, max_retries=3):
+        """请求K线接口，返回原始数据（列表的列表），失败返回None"""
         try:
             # 添加SSL验证设置和延长超时
-            response = session.get(
-                self.binance_futures_url, 
-                params=params, 
-                timeout=15,
-                headers=headers,
-                verify=False  # 禁用SSL验证以解决证书问题
-            )
+            response = self.get_klines_response(params)
             response.raise_for_status()
-            data = response.json()
-            
-            # 格式化数据为DataFrame
-            df = pd.DataFrame(data, columns=[
-                'open_time', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
-            ])
-            
-            # 转换数据类型
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol']
-            df[numeric_columns] = df[numeric_columns].astype(float)
-            
-            return df
+            return response.json()
             
         except requests.exceptions.SSLError:
             print(f"获取{symbol}的{interval}合约数据时遇到SSL错误，已禁用SSL验证")
             # SSL错误时再次尝试，确保verify=False生效
             try:
-                response = session.get(
-                    self.binance_futures_url, 
-                    params=params, 
-                    timeout=15,
-                    headers=headers,
-                    verify=False
-                )
+                response = self.get_klines_response(params)
                 response.raise_for_status()
-                data = response.json()
-                
-                df = pd.DataFrame(data, columns=[
-                    'open_time', 'open', 'high', 'low', 'close', 'volume',
-                    'close_time', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
-                ])
-                
-                df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-                df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-                numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol']
-                df[numeric_columns] = df[numeric_columns].astype(float)
-                
-                return df
+                return response.json()
                 
             except Exception as inner_e:
                 print(f"SSL错误重试后仍获取失败: {inner_e}")
@@ -166,69 +263,187 @@ class CryptoAnalyzer:
                 try:
                     print(f"正在重试... (尝试 {attempt+1}/{max_retries})")
                     time.sleep(1)
-                    response = session.get(
-                        self.binance_futures_url, 
-                        params=params, 
-                        timeout=15,
-                        headers=headers,
-                        verify=False
-                    )
+                    response = self.get_klines_response(params)
                     response.raise_for_status()
-                    data = response.json()
-                    
-                    df = pd.DataFrame(data, columns=[
-                        'open_time', 'open', 'high', 'low', 'close', 'volume',
-                        'close_time', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
-                    ])
-                    
-                    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-                    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-                    numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol']
-                    df[numeric_columns] = df[numeric_columns].astype(float)
-                    
-                    return df
+                    return response.json()
                     
                 except Exception as retry_e:
                     print(f"重试失败 (尝试 {attempt+1}/{max_retries}): {retry_e}")
                     
         print(f"获取{symbol}的{interval}合约数据失败，已达到最大重试次数")
         return None
+    
+    def klines_to_dataframe(self, data):
+        """把原始K线数据格式化为DataFrame"""
+        df = pd.DataFrame(data, columns=[
+            'open_time', 'open', 'high', 'low', 'close', 'volume',
+            'close_time', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
+        ])
+        
+        # 转换数据类型
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+        numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol']
+        df[numeric_columns] = df[numeric_columns].astype(float)
+        
+        return df
+    
+    def load_analysis_klines(self, symbol, interval, limit, params, data):
+        """把本次请求到的原始K线合并后转换为分析用的数据
+        
+        数组模式下合并进该币种的KlineBuffer：本次是紧接缓冲区末尾的尾部增量时
+        只写入新K线，否则从本地存储（或本次全量数据）重建缓冲区。
+        """
+        if not self.use_kline_arrays:
+            return self.klines_to_dataframe(self.merge_klines(symbol, interval, limit, data))
+        
+        key = (symbol, interval)
+        buffer = self.kline_buffers.get(key)
+        store = self.kline_store
+        tail_start = params.get('startTime')
+        if (buffer is not None and store is not None and tail_start is not None
+                and buffer.capacity == limit and buffer.last_open_time() == tail_start):
+            store.upsert(symbol, interval, data)
+            buffer.extend(data)
+            store.record_served(len(buffer))
+        else:
+            buffer = KlineBuffer(limit)
+            buffer.extend(self.merge_klines(symbol, interval, limit, data))
+            self.kline_buffers[key] = buffer
+        return buffer.view()
+    
+    def kline_buffer_stats(self):
+        """K线缓冲区数量和占用内存（字节）"""
+        buffers = list(self.kline_buffers.values())
+        return len(buffers), sum(buffer.nbytes for buffer in buffers)
+    
+    def decode_analysis_klines(self, data):
+        """把原始K线解码为分析用的数据（KlineArrays或DataFrame）"""
+        if self.use_kline_arrays:
+            return decode_klines(data)
+        return self.klines_to_dataframe(data)
+    
+    def analysis_kline_requests(self):
+        """每个币种分析时需要请求的K线 {周期: 数量}"""
+        if self.derive_4h_from_15m:
+            # 多取一组15m K线，用于丢弃开头未与4小时对齐的部分
+            bars_per_group = INTERVAL_MS['4h'] // INTERVAL_MS['15m']
+            quarter_hour_limit = max(self.analysis_kline_limits['15m'], (self.analysis_kline_limits['4h'] + 1) * bars_per_group)
+            return {'15m': quarter_hour_limit}
+        return dict(self.analysis_kline_limits)
+    
+    def build_analysis_klines(self, frames):
+        """由请求到的K线构造分析用的(4小时, 15分钟)数据
         
-        # 确保在函数结束时关闭session
-        session.close()
+        Args:
+            frames: {周期: KlineArrays或DataFrame}，周期与analysis_kline_requests一致
+        """
+        quarter_hour_data = frames['15m']
+        use_arrays = isinstance(quarter_hour_data, KlineArrays)
+        if not self.derive_4h_from_15m:
+            four_hour_data = frames['4h']
+        elif use_arrays:
+            four_hour_data = resample_kline_arrays(quarter_hour_data, '15m', '4h')
+        else:
+            four_hour_data = resample_klines(quarter_hour_data, '15m', '4h')
+        four_hour_data = four_hour_data.tail(self.analysis_kline_limits['4h'])
+        quarter_hour_data = quarter_hour_data.tail(self.analysis_kline_limits['15m'])
+        if not use_arrays:
+            four_hour_data = four_hour_data.reset_index(drop=True)
+            quarter_hour_data = quarter_hour_data.reset_index(drop=True)
+        return four_hour_data, quarter_hour_data
     
-    def get_top_usdt_futures(self, top_n=50, max_retries=3):
-        """获取成交额前N名的USDT合约币种及其成交额，添加SSL错误处理"""
-        # 设置超时和重试
-        session = requests.Session()
-        
-        # 处理Retry参数兼容性问题
-        retry_kwargs = {
-            'total': max_retries,
-            'backoff_factor': 0.5,
-            'status_forcelist': [429, 500, 502, 503, 504]
-        }
+    def get_analysis_klines(self, symbol):
+        """获取单个币种分析所需的(4小时, 15分钟)K线，任一周期失败返回(None, None)"""
+        frames = self.get_analysis_frames(symbol)
+        if frames is None:
+            return None, None
+        return self.build_analysis_klines(frames)
+    
+    def get_analysis_frames(self, symbol):
+        """获取单个币种请求到的完整K线 {周期: K线}（未截取到分析长度），任一周期失败返回None
         
-        # 尝试使用allowed_methods（新版本），如果失败则回退
-        try:
-            # 测试Retry是否接受allowed_methods参数
-            test_retry = Retry(**retry_kwargs, allowed_methods=["GET"])
-            retry_kwargs['allowed_methods'] = ["GET"]
-        except TypeError:
-            # 旧版本使用method_whitelist
-            retry_kwargs['method_whitelist'] = ["GET"]
-        
-        retry = Retry(**retry_kwargs)
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('https://', adapter)
-        session.mount('http://', adapter)
+        经过请求合并层，本轮已获取过的直接复用。
+        """
+        frames = {}
+        for interval, limit in self.analysis_kline_requests().items():
+            def fetch(interval=interval, limit=limit):
+                print(f"正在获取{symbol}的{interval}K线数据...")
+                params = self.kline_request_params(symbol, interval, limit)
+                data = self.fetch_klines_raw(symbol, interval, params)
+                if data is None:
+                    return None
+                return self.load_analysis_klines(symbol, interval, limit, params, data)
+            
+            frames[interval] = self.kline_flight.do(('analysis', symbol, interval, limit), fetch)
+            if frames[interval] is None:
+                return None
+        return frames
+    
+    def prefetch_klines_async(self, symbols):
+        """异步模式：并发抓取所有币种分析所需的K线
+        
+        Returns:
+            dict: {symbol: (4小时K线, 15分钟K线)}，任一周期失败的币种不包含在内
+        """
+        kline_requests = self.analysis_kline_requests()
+        jobs = []
+        for symbol in symbols:
+            for interval, limit in kline_requests.items():
+                params = self.kline_request_params(symbol, interval, limit)
+                jobs.append(((symbol, interval), params))
+        params_by_key = dict(jobs)
+        
+        fetcher = AsyncKlineFetcher(self.binance_futures_url, concurrency=self.async_concurrency,
+                                    rate_limiter=self.rate_limiter, concurrency_controller=self.fetch_concurrency)
+        raw_results = fetcher.fetch_all(jobs)
+        
+        prefetched = {}
+        for symbol in symbols:
+            frames = {}
+            for interval, limit in kline_requests.items():
+                raw = raw_results.get((symbol, interval))
+                if raw is None:
+                    break
+                frames[interval] = self.load_analysis_klines(symbol, interval, limit, params_by_key[(symbol, interval)], raw)
+                # 登记到请求合并层，本轮之后（如持仓止盈止损检查）再用到时不必重新请求
+                self.kline_flight.prime(('analysis', symbol, interval, limit), frames[interval])
+            else:
+                prefetched[symbol] = self.build_analysis_klines(frames)
+        return prefetched
+    
+    def check_resample_consistency(self, symbol, limit=50):
+        """对比本地由15m合成的4小时K线与交易所返回的4小时K线
+        
+        Returns:
+            bool: 已收盘的K线是否全部一致
+        """
+        bars_per_group = INTERVAL_MS['4h'] // INTERVAL_MS['15m']
+        quarter_hour_data = self.get_futures_klines(symbol, '15m', limit=(limit + 1) * bars_per_group)
+        exchange_data = self.get_futures_klines(symbol, '4h', limit=limit)
+        if quarter_hour_data is None or exchange_data is None:
+            print(f"无法获取{symbol}的K线数据，跳过一致性检查")
+            return False
         
+        derived_data = resample_klines(quarter_hour_data, '15m', '4h')
+        # 最后一根4小时K线尚未收盘，两次请求之间可能有新成交，单独提示不计入结果
+        compared, mismatches = compare_klines(derived_data.iloc[:-1], exchange_data.iloc[:-1])
+        print(f"{symbol} 4小时K线一致性检查：比较{compared}根已收盘K线，不一致{len(mismatches)}处")
+        for open_time, column, derived_value, exchange_value in mismatches[:20]:
+            print(f"   • {open_time} {column}: 合成值={derived_value}, 交易所={exchange_value}")
+        _, forming_mismatches = compare_klines(derived_data.tail(1), exchange_data.tail(1))
+        if forming_mismatches:
+            print(f"   未收盘K线存在{len(forming_mismatches)}处差异（两次请求之间有新成交，属正常现象）")
+        return compared > 0 and not mismatches
+    
+    
+    def get_top_usdt_futures(self, top_n=50, max_retries=3):
+        """获取成交额前N名的USDT合约币种及其成交额，添加SSL错误处理"""
         try:
             # 添加SSL验证设置和超时控制
-            response = session.get(
+            response = self.http.get(
                 self.binance_ticker_url, 
-                timeout=15,
-                verify=False  # 禁用SSL验证以解决证书问题
+                timeout=15
             )
             response.raise_for_status()
             tickers = response.json()
@@ -252,10 +467,9 @@ class CryptoAnalyzer:
             print("获取合约币种数据时遇到SSL错误，已禁用SSL验证")
             # SSL错误时再次尝试
             try:
-                response = session.get(
+                response = self.http.get(
                     self.binance_ticker_url, 
-                    timeout=15,
-                    verify=False
+                    timeout=15
                 )
                 response.raise_for_status()
                 tickers = response.json()
@@ -283,10 +497,9 @@ class CryptoAnalyzer:
                 try:
                     print(f"正在重试... (尝试 {attempt+1}/{max_retries})")
                     time.sleep(2)
-                    response = session.get(
+                    response = self.http.get(
                         self.binance_ticker_url, 
-                        timeout=15,
-                        verify=False
+                        timeout=15
                     )
                     response.raise_for_status()
                     tickers = response.json()
@@ -308,26 +521,29 @@ class CryptoAnalyzer:
                     
         print("获取合约币种数据失败，已达到最大重试次数")
         return []
-        
-        # 确保在函数结束时关闭session
-        session.close()
     
     def calculate_macd(self, data, fast_period=12, slow_period=26, signal_period=9):
-        """计算MACD指标"""
-        # 计算指数移动平均线
-        ema_fast = data['close'].ewm(span=fast_period, adjust=False).mean()
-        ema_slow = data['close'].ewm(span=slow_period, adjust=False).mean()
-        
-        # 计算MACD线
-        macd_line = ema_fast - ema_slow
+        """计算MACD指标
         
-        # 计算信号线
-        signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+        data为KlineArrays时直接返回数组，为DataFrame时返回Series（画图用）。
+        EMA递推使用indicators的计算后端（安装numba时为编译内核），结果与ewm(adjust=False)一致。
+        """
+        macd_line, signal_line, histogram = macd(data['close'], fast_period, slow_period, signal_period)
+        if isinstance(data, KlineArrays):
+            return macd_line, signal_line, histogram
         
-        # 计算柱状图
-        histogram = macd_line - signal_line
+        index = data.index
+        return pd.Series(macd_line, index=index), pd.Series(signal_line, index=index), pd.Series(histogram, index=index)
+    
+    def indicator_graph(self, data, symbol=None, interval=None):
+        """K线数据的指标图（IndicatorGraph），指标按需计算并缓存
         
-        return macd_line, signal_line, histogram
+        传入symbol和interval时从本轮的指标缓存中取，同一组K线的所有使用者共享计算结果；
+        不传时新建一张只在调用方内部复用的图。
+        """
+        if symbol is None or interval is None:
+            return IndicatorGraph(data)
+        return self.indicator_cache.graph(symbol, interval, data)
     
     # 删除KDJ相关函数，使用MACD交叉替代
     
@@ -350,9 +566,11 @@ class CryptoAnalyzer:
             print("MACD交叉检测失败：数据点不足")
             return None
         
-        # 使用最近两个数据点检测交叉，更加宽松
-        prev_macd, curr_macd = macd_line.iloc[-2], macd_line.iloc[-1]
-        prev_signal, curr_signal = signal_line.iloc[-2], signal_line.iloc[-1]
+        # 使用最近两个数据点检测交叉，更加宽松（Series和numpy数组统一按位置取值）
+        macd_line = np.asarray(macd_line)
+        signal_line = np.asarray(signal_line)
+        prev_macd, curr_macd = macd_line[-2], macd_line[-1]
+        prev_signal, curr_signal = signal_line[-2], signal_line[-1]
         
         # 计算差异百分比
         prev_diff_pct = abs(prev_macd - prev_signal) / max(abs(prev_signal), 0.0001) * 100
@@ -377,20 +595,22 @@ class CryptoAnalyzer:
         
         return None
         
-    def check_buy_signal(self, macd_line, signal_line, price_data=None):
+    def check_buy_signal(self, macd_line, signal_line, price_data=None, macd_cross=None):
         """检查买入信号（简化版本）
         
         Args:
             macd_line: MACD线数据
             signal_line: 信号线数据
             price_data: 价格数据，包含收盘价信息
+            macd_cross: 可选，已检测过的交叉结果，传入时不再重复检测
             
         Returns:
             bool: 是否满足买入信号条件
         """
         try:
             # 检测MACD交叉
-            macd_cross = self.detect_macd_cross(macd_line, signal_line)
+            if macd_cross is None:
+                macd_cross = self.detect_macd_cross(macd_line, signal_line)
             
             # 检查是否为金叉
             is_golden_cross = macd_cross == 'golden_cross'
@@ -406,8 +626,10 @@ class CryptoAnalyzer:
             # 额外检查：即使没有严格金叉，如果MACD线正在上穿信号线且两者非常接近，也考虑为潜在买入信号
             if not is_golden_cross and len(macd_line) > 2:
                 # 检查最近几个数据点MACD线是否在上升且接近信号线
-                recent_macd_trend = (macd_line.iloc[-1] > macd_line.iloc[-2] > macd_line.iloc[-3])
-                close_to_signal = abs(macd_line.iloc[-1] - signal_line.iloc[-1]) / max(abs(signal_line.iloc[-1]), 0.0001) * 100 < 0.3
+                macd_line = np.asarray(macd_line)
+                signal_line = np.asarray(signal_line)
+                recent_macd_trend = (macd_line[-1] > macd_line[-2] > macd_line[-3])
+                close_to_signal = abs(macd_line[-1] - signal_line[-1]) / max(abs(signal_line[-1]), 0.0001) * 100 < 0.3
                 
                 if recent_macd_trend and close_to_signal:
                     print(f"检测到潜在买入信号：MACD线上升趋势且接近信号线")
@@ -420,20 +642,22 @@ class CryptoAnalyzer:
             traceback.print_exc()
             return False
     
-    def check_sell_signal(self, macd_line, signal_line, price_data=None):
+    def check_sell_signal(self, macd_line, signal_line, price_data=None, macd_cross=None):
         """检查卖出信号（简化版本）
         
         Args:
             macd_line: MACD线数据
             signal_line: 信号线数据
             price_data: 价格数据，包含收盘价信息
+            macd_cross: 可选，已检测过的交叉结果，传入时不再重复检测
             
         Returns:
             bool: 是否满足卖出信号条件
         """
         try:
             # 检测MACD交叉
-            macd_cross = self.detect_macd_cross(macd_line, signal_line)
+            if macd_cross is None:
+                macd_cross = self.detect_macd_cross(macd_line, signal_line)
             
             # 检查是否为死叉
             is_death_cross = macd_cross == 'death_cross'
@@ -449,8 +673,10 @@ class CryptoAnalyzer:
             # 额外检查：即使没有严格死叉，如果MACD线正在下穿信号线且两者非常接近，也考虑为潜在卖出信号
             if not is_death_cross and len(macd_line) > 2:
                 # 检查最近几个数据点MACD线是否在下降且接近信号线
-                recent_macd_trend = (macd_line.iloc[-1] < macd_line.iloc[-2] < macd_line.iloc[-3])
-                close_to_signal = abs(macd_line.iloc[-1] - signal_line.iloc[-1]) / max(abs(signal_line.iloc[-1]), 0.0001) * 100 < 0.3
+                macd_line = np.asarray(macd_line)
+                signal_line = np.asarray(signal_line)
+                recent_macd_trend = (macd_line[-1] < macd_line[-2] < macd_line[-3])
+                close_to_signal = abs(macd_line[-1] - signal_line[-1]) / max(abs(signal_line[-1]), 0.0001) * 100 < 0.3
                 
                 if recent_macd_trend and close_to_signal:
                     print(f"检测到潜在卖出信号：MACD线下降趋势且接近信号线")
@@ -463,7 +689,7 @@ class CryptoAnalyzer:
             traceback.print_exc()
             return False
     
-    def check_macd_golden_cross_rule(self, macd_line, signal_line):
+    def check_macd_golden_cross_rule(self, macd_line=None, signal_line=None, cross_index=None, indicators=None):
         """
         检查MACD金叉是否符合新规则：
         1. 寻找上一个0轴以下的金叉B
@@ -471,44 +697,52 @@ class CryptoAnalyzer:
         3. 如果A的值小于C的五分之一，则符合条件
         
         Args:
-            macd_line: MACD线数据
-            signal_line: 信号线数据
+            macd_line: MACD线数据（传入indicators时可省略，使用图中的整条序列）
+            signal_line: 信号线数据（同上）
+            cross_index: 可选，该序列（或同一起点的更长序列）已构建的MacdCrossIndex
+            indicators: 可选，这组K线（或同一起点的更长K线）的指标图（indicator_graph），
+                交叉索引取图中缓存的cross_index，同一组K线只构建一次；cross_index和indicators都不传时现场构建
             
         Returns:
             bool: 是否符合新规则
         """
+        # 省略MACD线时使用指标图中的整条序列，此时最近交叉也直接取图中的结果
+        from_graph = indicators is not None and macd_line is None
+        if from_graph:
+            macd_line, signal_line = indicators.get('macd_line'), indicators.get('signal_line')
+        if indicators is not None and cross_index is None:
+            cross_index = indicators.get('cross_index')
+        
         # 确保有足够的数据点
         if len(macd_line) < 50:
             return False
         
         # 检查是否刚发生金叉
-        current_cross = self.detect_macd_cross(macd_line, signal_line)
+        if from_graph:
+            current_cross = indicators.get('macd_cross')
+        else:
+            current_cross = self.detect_macd_cross(macd_line, signal_line)
         if current_cross != 'golden_cross':
             return False
         
+        macd_line = np.asarray(macd_line)
+        signal_line = np.asarray(signal_line)
+        
         # 金叉A的值
-        macd_value_a = macd_line.iloc[-2]  # 使用交叉发生位置的值
+        macd_value_a = macd_line[-2]  # 使用交叉发生位置的值
         
-        # 寻找上一个0轴以下的金叉B
-        last_below_zero_golden_cross_idx = None
+        if cross_index is None:
+            cross_index = MacdCrossIndex(macd_line, signal_line)
         
-        # 从当前位置向前查找
-        for i in range(len(macd_line) - 4, 0, -1):
-            # 检查是否在i位置发生金叉（使用与detect_macd_cross相同的逻辑）
-            cross_at_i = (macd_line.iloc[i-1] < signal_line.iloc[i-1] and 
-                         macd_line.iloc[i] > signal_line.iloc[i])
-            
-            # 检查金叉时MACD值是否在0轴以下
-            if cross_at_i and macd_line.iloc[i] <= 0:
-                last_below_zero_golden_cross_idx = i
-                break
+        # 寻找上一个0轴以下的金叉B：从当前位置往前，位置不超过len-4
+        last_below_zero_golden_cross_idx = cross_index.previous(len(macd_line) - 3, 'golden', below_zero=True)
         
         # 如果没有找到上一个0轴以下的金叉，返回False
         if last_below_zero_golden_cross_idx is None:
             return False
         
         # 计算A和B之间MACD线的最大值C
-        macd_values_between = macd_line.iloc[last_below_zero_golden_cross_idx+1:-2]
+        macd_values_between = macd_line[last_below_zero_golden_cross_idx+1:-2]
         if len(macd_values_between) == 0:
             return False
         
@@ -519,17 +753,23 @@ class CryptoAnalyzer:
     
     # KDJ交叉检测函数已删除
     
-    def analyze_signal(self, main_period_data, four_x_period_data):
-        """分析交易信号"""
+    def analyze_signal(self, main_period_data, four_x_period_data, symbol=None, main_interval=None):
+        """分析交易信号
+        
+        传入symbol和main_interval时指标从本轮的指标缓存中取，之后plot_chart画同一组K线时直接复用
+        """
         # 计算指标
-        main_macd, main_signal, main_hist = self.calculate_macd(main_period_data)
-        four_x_macd, four_x_signal, four_x_hist = self.calculate_macd(four_x_period_data)
+        four_x_interval = self.interval_map[main_interval]['four_x'] if main_interval else None
+        main_indicators = self.indicator_graph(main_period_data, symbol, main_interval)
+        four_x_indicators = self.indicator_graph(four_x_period_data, symbol, four_x_interval)
+        four_x_macd = four_x_indicators.get('macd_line')
+        four_x_signal = four_x_indicators.get('signal_line')
         
         # 判断大周期MACD方向（多头：dif > dea，空头：dif < dea）
-        four_x_macd_direction = 'bullish' if four_x_macd.iloc[-1] > four_x_signal.iloc[-1] else 'bearish'
+        four_x_macd_direction = 'bullish' if four_x_macd[-1] > four_x_signal[-1] else 'bearish'
         
         # 检测MACD交叉
-        macd_cross = self.detect_macd_cross(main_macd, main_signal)
+        macd_cross = main_indicators.get('macd_cross')
         
         # 生成信号
         signal = None
@@ -540,7 +780,7 @@ class CryptoAnalyzer:
         
         return {
             'four_x_macd_direction': four_x_macd_direction,
-            'four_x_macd_value': four_x_macd.iloc[-1],
+            'four_x_macd_value': four_x_macd[-1],
             'macd_cross': macd_cross,
             'signal': signal
         }
@@ -564,49 +804,337 @@ class CryptoAnalyzer:
             print(f"计算{symbol}7天涨幅时出错: {e}")
             return 0.0
     
-    def analyze_single_currency(self, symbol):
-        """分析单个币种，返回分析结果"""
+    def archive_growth_7d(self, symbols):
+        """用本轮分析已获取的K线计算7天涨幅(%)，不额外请求日线
+        
+        Returns:
+            dict: {symbol: 涨幅}，K线不足7天的币种不包含在内
+        """
+        growth = {}
+        for symbol in symbols:
+            if symbol in self.shard_extras:
+                # 分片模式：工作进程已随分析结果发回
+                value = (self.shard_extras[symbol] or {}).get('growth_7d')
+            else:
+                value = self.growth_7d_from_frames(self.get_analysis_frames(symbol))
+            if value is not None:
+                growth[symbol] = value
+        return growth
+    
+    def growth_7d_from_frames(self, frames):
+        """由分析用的K线计算7天涨幅(%)，K线不足7天返回None"""
+        if frames is None:
+            return None
+        # 优先用15分钟K线，不足7天时再看4小时K线
+        for interval in ('15m', '4h'):
+            klines = frames.get(interval)
+            bars = 7 * DAY_MS // INTERVAL_MS[interval]
+            if klines is None or len(klines) <= bars:
+                continue
+            close = np.asarray(klines['close'], dtype=np.float64)
+            return float((close[-1] - close[-1 - bars]) / close[-1 - bars] * 100)
+        return None
+    
+    def symbol_extras(self, symbol):
+        """分析结果之外，本轮筛选还要用到的单币种数据：7天涨幅、波段分析、4小时DIF/DEA
+        
+        用本轮已获取的K线计算（请求合并层和指标缓存直接命中）。分片工作进程把它随分析结果一起发回，
+        协调进程不必为这些再请求一遍K线。
+        """
+        frames = self.get_analysis_frames(symbol)
+        if frames is None:
+            return None
+        four_hour_data, _ = self.build_analysis_klines(frames)
+        indicators = self.indicator_graph(four_hour_data, symbol, '4h')
+        macd_line, signal_line = indicators.get('macd_line'), indicators.get('signal_line')
+        four_hour_macd = None
+        if len(macd_line) > 0:
+            four_hour_macd = (float(macd_line[-1]), float(signal_line[-1]))
+        return {
+            'growth_7d': self.growth_7d_from_frames(frames),
+            'swing': self.analyze_swing_points(symbol) if self.swing_screen_enabled else None,
+            'four_hour_macd': four_hour_macd
+        }
+    
+    def shard_four_hour_macd(self, symbol):
+        """分片模式下工作进程发回的4小时(DIF, DEA)，格式同check_holdings_signals的four_hour_macd；没有则返回None"""
+        four_hour_macd = (self.shard_extras.get(symbol) or {}).get('four_hour_macd')
+        return {symbol: four_hour_macd} if four_hour_macd is not None else None
+    
+    def archive_run(self, results):
+        """把本轮所有币种的结果追加到归档"""
+        if self.run_archive is None:
+            return
+        try:
+            growth = self.archive_growth_7d(results.symbol[results.analyzed])
+            rows = self.run_archive.append_run(results, growth_7d=growth)
+            archive_stats = self.run_archive.stats()
+            print(f"结果归档: 写入{rows}行, 共{archive_stats['partitions']}个分区{archive_stats['rows']}行, 占用{archive_stats['bytes'] / 1024:.1f}KB")
+        except Exception as e:
+            print(f"归档筛选结果出错: {e}")
+    
+    def start_fetch_round(self):
+        """新一轮开始时，按当前抓取模式设置K线并发上限，并开始记录本轮的并发调整"""
+        max_limit = self.async_concurrency if self.fetch_mode == 'async' else self.max_workers
+        self.fetch_concurrency.start_run(max_limit=max_limit)
+    
+    def record_concurrency_run(self, symbol_count):
+        """打印本轮K线并发调整的摘要，并把本轮的所有调整追加到concurrency_log_file
+        
+        Returns:
+            dict: 本轮的记录 {run_time, mode, symbols, summary, decisions}
+        """
+        controller = self.fetch_concurrency
+        summary = controller.summary()
+        record = {
+            'run_time': int(time.time() * 1000),
+            'mode': self.fetch_mode,
+            'symbols': symbol_count,
+            'summary': summary,
+            'decisions': list(controller.decisions)
+        }
+        reasons = "，".join(f"{CONCURRENCY_SIGNAL_NAMES.get(signal, signal)}{count}次"
+                           for signal, count in summary['decrease_reasons'].items())
+        print(f"K线并发：{summary['initial_limit']} → {summary['final_limit']}（最高{summary['max_limit_reached']}，"
+              f"最低{summary['min_limit_reached']}），增加{summary['increases']}次、降低{summary['decreases']}次"
+              f"{'（' + reasons + '）' if reasons else ''}，请求{summary['requests']}次、出错{summary['errors']}次")
+        if self.concurrency_log_file:
+            try:
+                with open(self.concurrency_log_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except Exception as e:
+                print(f"写入并发调整日志出错: {e}")
+        return record
+    
+    def print_concurrency_log(self, runs=1):
+        """打印最近runs轮的K线并发调整过程"""
+        if not self.concurrency_log_file or not os.path.exists(self.concurrency_log_file):
+            print("没有并发调整日志")
+            return
+        records = []
+        with open(self.concurrency_log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        for record in records[-runs:]:
+            summary = record['summary']
+            print(f"\n[{format_run_time(record['run_time'])}] {record['mode']}模式，{record['symbols']}个币种，"
+                  f"K线请求{summary['requests']}次（出错{summary['errors']}次），耗时{summary['seconds']:.2f}秒，"
+                  f"并发{summary['initial_limit']} → {summary['final_limit']}")
+            for decision in record['decisions']:
+                if decision['action'] == 'hold':
+                    continue
+                arrow = "↑" if decision['action'] == 'increase' else "↓"
+                latency = "N/A" if decision['latency_ms'] is None else f"{decision['latency_ms']:.0f}ms"
+                print(f"   {decision['at']:>7.2f}s  {decision['limit_before']:>3} {arrow} {decision['limit']:<3}  "
+                      f"延迟中位数{latency}  {decision['reason']}")
+    
+    def print_signal_runs(self, symbol, days=30, signal='buy'):
+        """打印最近days天内该币种出现买入/卖出信号的运行时间"""
+        if self.run_archive is None:
+            print("未启用结果归档")
+            return
+        start = time.perf_counter()
+        run_times = self.run_archive.signal_runs(symbol, signal=signal, days=days)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        signal_name = "买入" if signal == 'buy' else "卖出"
+        print(f"{symbol}最近{days}天出现{signal_name}信号{len(run_times)}次（查询耗时{elapsed_ms:.1f}ms）")
+        for run_time in run_times:
+            print(f"   • {format_run_time(run_time)}")
+    
+    def run_backtest(self, days=None, side='long', symbols=None):
+        """用本地K线存储中的15分钟历史回测买入（或卖出）信号，打印胜率、收益分布和回撤
+        
+        Args:
+            days: 只用最近days天的历史，默认全部
+            side: 'long'按买入信号做多，'short'按卖出信号做空
+            symbols: 回测的币种，默认为存储中所有有15分钟K线的币种
+        """
+        store = self.kline_store
+        if store is None:
+            print("未启用本地K线存储，没有可回测的历史数据")
+            return None
+        if symbols is None:
+            symbols = store.symbols('15m')
+        start_ms = None
+        if days is not None:
+            start_ms = int(time.time() * 1000) - days * DAY_MS
+        
+        load_start = time.perf_counter()
+        history = load_history(store, symbols, start_ms)
+        load_time = time.perf_counter() - load_start
+        if not history:
+            print("本地K线存储中没有15分钟历史数据")
+            return None
+        candles = sum(len(klines) for klines in history.values())
+        
+        backtest_start = time.perf_counter()
+        trades = run_backtest(history, side=side)
+        summary = summarize_trades(trades)
+        backtest_time = time.perf_counter() - backtest_start
+        
+        side_name = "做多（4小时多头+15分钟金叉）" if side == 'long' else "做空（4小时空头+15分钟死叉）"
+        print(f"回测{side_name}：{len(history)}个币种，{candles}根15分钟K线，读取{load_time:.2f}秒，回测{backtest_time:.2f}秒")
+        if summary['trades'] == 0:
+            print("没有完成的交易")
+            return summary
+        percentiles = summary['percentiles']
+        print(f"交易{summary['trades']}笔（末尾仍持仓{trades['open_positions']}笔未计入），胜率{summary['hit_rate']:.1f}%，平均持仓{summary['avg_hours']:.1f}小时")
+        print(f"单笔收益: 平均{summary['mean_pct']:.2f}%, 中位数{summary['median_pct']:.2f}%, "
+              f"5%/25%/75%/95%分位 {percentiles[5]:.2f}% / {percentiles[25]:.2f}% / {percentiles[75]:.2f}% / {percentiles[95]:.2f}%")
+        print(f"累计收益{summary['total_pct']:.1f}%（每笔等额、不复利），最大回撤{summary['max_drawdown_pct']:.1f}%，单笔持仓中最大浮亏{summary['worst_adverse_pct']:.2f}%")
+        return summary
+    
+    def run_parameter_sweep(self, days=None, workers=None, metric='total_pct', grid=None, side='long', top=20):
+        """在本地K线存储的历史上用进程池扫描MACD周期和潜在信号阈值，打印排名
+        
+        Args:
+            days: 只用最近days天的历史，默认全部
+            workers: 进程数，默认为CPU核数
+            metric: 排序指标（total_pct、mean_pct、median_pct、hit_rate、max_drawdown_pct）
+            grid: 参数网格，默认DEFAULT_SWEEP_GRID
+            side: 'long'或'short'
+            top: 打印前几名
+        """
+        store = self.kline_store
+        if store is None:
+            print("未启用本地K线存储，没有可回测的历史数据")
+            return []
+        start_ms = None
+        if days is not None:
+            start_ms = int(time.time() * 1000) - days * DAY_MS
+        history = load_history(store, store.symbols('15m'), start_ms)
+        if not history:
+            print("本地K线存储中没有15分钟历史数据")
+            return []
+        
+        grid = grid or DEFAULT_SWEEP_GRID
+        total = len(parameter_grid(grid))
+        print(f"参数扫描：{len(history)}个币种，{sum(len(klines) for klines in history.values())}根15分钟K线，{total}组参数")
+        
+        def progress(completed, total, record):
+            print(f"扫描进度: {completed}/{total}", end='\r')
+        
+        start = time.perf_counter()
+        records = run_sweep(history, grid, self.sweep_results_file, workers=workers, side=side, progress=progress)
+        print(f"扫描完成，耗时{time.perf_counter() - start:.1f}秒（结果保存在{self.sweep_results_file}）")
+        
+        ranked = rank_results(records, metric)
+        print(f"按{metric}排名前{min(top, len(ranked))}组：")
+        print(f"{'排名':<6}{'快线':<6}{'慢线':<6}{'信号线':<8}{'阈值%':<8}{'交易数':<8}{'胜率%':<9}{'平均%':<9}{'累计%':<10}{'最大回撤%':<10}")
+        for rank, record in enumerate(ranked[:top], 1):
+            params, summary = record['params'], record['summary']
+            print(f"{rank:<6}{params['fast_period']:<6}{params['slow_period']:<6}{params['signal_period']:<8}"
+                  f"{params['close_to_signal_pct']:<8}{summary['trades']:<8}{summary['hit_rate']:<9.1f}"
+                  f"{summary['mean_pct']:<9.2f}{summary['total_pct']:<10.1f}{summary['max_drawdown_pct']:<10.1f}")
+        return ranked
+    
+    def import_kline_archives(self, directory, workers=None, symbols=None, intervals=None):
+        """把Binance公开数据的K线压缩包（月度/日度ZIP）批量导入本地K线存储，供回测和参数扫描使用"""
+        if self.kline_store_file is None:
+            print("未启用本地K线存储，无法导入")
+            return None
+        
+        def progress(completed, total, result):
+            print(f"导入进度: {completed}/{total} {result['file']}", end='\r')
+        
+        start = time.perf_counter()
+        summary = import_directory(directory, self.kline_store_file, symbols=symbols, intervals=intervals,
+                                   workers=workers, progress=progress)
+        elapsed = time.perf_counter() - start
+        files = summary['files']
+        imported = [result for result in files if not result['skipped'] and not result['error']]
+        print(f"\n导入完成：{len(files)}个文件，导入{len(imported)}个，跳过已导入{sum(result['skipped'] for result in files)}个，耗时{elapsed:.1f}秒")
+        print(f"K线{sum(result['rows'] for result in imported)}根，新增{sum(result['new'] for result in imported)}根，"
+              f"已存在{sum(result['duplicates'] for result in imported)}根")
+        for result in files:
+            if result['error']:
+                print(f"   • {result['file']} 导入失败: {result['error']}")
+        for (symbol, interval), gaps in summary['gaps'].items():
+            if gaps:
+                missing = sum(count for _, _, count in gaps)
+                print(f"   • {symbol} {interval} 有{len(gaps)}处缺口，共缺{missing}根K线")
+                for previous, current, count in gaps[:5]:
+                    print(f"       {format_run_time(previous)} 之后到 {format_run_time(current)} 之前缺{count}根")
+        return summary
+    
+    def analyze_single_currency(self, symbol, four_hour_data=None, quarter_hour_data=None):
+        """分析单个币种，返回AnalysisResult
+        
+        Args:
+            symbol: 币种
+            four_hour_data: 已获取的4小时K线（可选，异步模式下预先抓取）
+            quarter_hour_data: 已获取的15分钟K线（可选，异步模式下预先抓取）
+        """
         try:
             print(f"开始分析币种: {symbol}")
             
             # 大周期是4h，小周期是15m
-            four_hour_interval = '4h'  # 大周期
             quarter_hour_interval = '15m'  # 小周期
             
-            # 获取4小时周期数据（大周期）
-            print(f"正在获取{symbol}的4小时K线数据...")
-            four_hour_data = self.get_futures_klines(symbol, four_hour_interval, limit=50)
-            # 获取15分钟周期数据（小周期）
-            print(f"正在获取{symbol}的15分钟K线数据...")
-            quarter_hour_data = self.get_futures_klines(symbol, quarter_hour_interval, limit=200)
+            if four_hour_data is None or quarter_hour_data is None:
+                # 获取4小时（大周期）和15分钟（小周期）数据，4小时可由15分钟本地合成
+                four_hour_data, quarter_hour_data = self.get_analysis_klines(symbol)
             
             if four_hour_data is None or quarter_hour_data is None:
                 print(f"无法获取{symbol}的完整数据，跳过")
-                return symbol, None, False, None, None, None, False, False, quarter_hour_interval
+                return AnalysisResult.failed(symbol, quarter_hour_interval)
             
             # 降低数据量要求
             if len(four_hour_data) < 20 or len(quarter_hour_data) < 50:
                 print(f"{symbol}数据量不足，跳过")
-                return symbol, None, False, None, None, None, False, False, quarter_hour_interval
-            
-            # 计算大周期4小时MACD
-            four_hour_macd_line, four_hour_macd_signal, _ = self.calculate_macd(four_hour_data)
-            # 计算小周期15分钟MACD
-            quarter_hour_macd_line, quarter_hour_macd_signal, _ = self.calculate_macd(quarter_hour_data)
+                return AnalysisResult.failed(symbol, quarter_hour_interval)
+            
+            # 计算大周期4小时MACD（本轮的指标缓存，止盈止损检查时复用）
+            four_hour_indicators = self.indicator_graph(four_hour_data, symbol, '4h')
+            four_hour_macd_line = four_hour_indicators.get('macd_line')
+            four_hour_macd_signal = four_hour_indicators.get('signal_line')
+            # 计算小周期15分钟MACD和交叉
+            quarter_hour_indicators = self.indicator_graph(quarter_hour_data, symbol, quarter_hour_interval)
+            quarter_hour_macd_line = quarter_hour_indicators.get('macd_line')
+            quarter_hour_macd_signal = quarter_hour_indicators.get('signal_line')
+            quarter_hour_macd_cross = quarter_hour_indicators.get('macd_cross')
+        except Exception as e:
+            print(f"分析{symbol}时出错: {e}")
+            import traceback
+            traceback.print_exc()
+            return AnalysisResult.failed(symbol)
+        
+        return self.evaluate_macd_signals(symbol, four_hour_macd_line, four_hour_macd_signal,
+                                          quarter_hour_macd_line, quarter_hour_macd_signal, quarter_hour_macd_cross)
+    
+    def evaluate_macd_signals(self, symbol, four_hour_macd_line, four_hour_macd_signal,
+                              quarter_hour_macd_line, quarter_hour_macd_signal, quarter_hour_macd_cross=None):
+        """根据已算好的4小时和15分钟MACD线/信号线判断信号，返回AnalysisResult（与analyze_single_currency相同）
+        
+        只用到各序列最后几个值，推送模式下可直接传入增量MACD（MacdState.lines()）的结果。
+        quarter_hour_macd_cross为已检测的15分钟交叉（如指标缓存中的macd_cross），不传则现场检测。
+        """
+        quarter_hour_interval = '15m'  # 小周期
+        try:
+            # 统一按位置取值，兼容Series和numpy数组
+            four_hour_macd_line = np.asarray(four_hour_macd_line)
+            four_hour_macd_signal = np.asarray(four_hour_macd_signal)
+            quarter_hour_macd_line = np.asarray(quarter_hour_macd_line)
+            quarter_hour_macd_signal = np.asarray(quarter_hour_macd_signal)
             
             # 判断大周期MACD方向
-            four_hour_macd_bullish = four_hour_macd_line.iloc[-1] > four_hour_macd_signal.iloc[-1]
+            four_hour_macd_bullish = four_hour_macd_line[-1] > four_hour_macd_signal[-1]
             macd_status = "多头" if four_hour_macd_bullish else "空头"
             
             # 获取大周期最新的MACD值
-            four_hour_macd_value = four_hour_macd_line.iloc[-1]
+            four_hour_macd_value = four_hour_macd_line[-1]
             
             # 添加详细日志
             print(f"{symbol} 4小时MACD值: {four_hour_macd_value:.6f}, 状态: {macd_status}")
-            print(f"{symbol} 4小时MACD线: {four_hour_macd_line.iloc[-1]:.6f}, 信号线: {four_hour_macd_signal.iloc[-1]:.6f}")
+            print(f"{symbol} 4小时MACD线: {four_hour_macd_line[-1]:.6f}, 信号线: {four_hour_macd_signal[-1]:.6f}")
             
             # 检测小周期15分钟MACD交叉
-            macd_cross = self.detect_macd_cross(quarter_hour_macd_line, quarter_hour_macd_signal)
+            macd_cross = quarter_hour_macd_cross
+            if macd_cross is None:
+                macd_cross = self.detect_macd_cross(quarter_hour_macd_line, quarter_hour_macd_signal)
             is_golden_cross = macd_cross == 'golden_cross'
             is_death_cross = macd_cross == 'death_cross'
             
@@ -617,11 +1145,11 @@ class CryptoAnalyzer:
             # 买入信号：大周期多头 + 小周期金叉（放宽0轴要求）
             if four_hour_macd_bullish:
                 if is_golden_cross:
-                    is_buy_signal = self.check_buy_signal(quarter_hour_macd_line, quarter_hour_macd_signal, quarter_hour_data)
+                    is_buy_signal = self.check_buy_signal(quarter_hour_macd_line, quarter_hour_macd_signal, macd_cross=macd_cross)
                 else:
                     # 额外检查：如果大周期很强，但小周期还没形成金叉，可以考虑作为潜在买入信号
-                    recent_macd_trend = (quarter_hour_macd_line.iloc[-1] > quarter_hour_macd_line.iloc[-2] > quarter_hour_macd_line.iloc[-3])
-                    close_to_signal = abs(quarter_hour_macd_line.iloc[-1] - quarter_hour_macd_signal.iloc[-1]) / max(abs(quarter_hour_macd_signal.iloc[-1]), 0.0001) * 100 < 0.5
+                    recent_macd_trend = (quarter_hour_macd_line[-1] > quarter_hour_macd_line[-2] > quarter_hour_macd_line[-3])
+                    close_to_signal = abs(quarter_hour_macd_line[-1] - quarter_hour_macd_signal[-1]) / max(abs(quarter_hour_macd_signal[-1]), 0.0001) * 100 < 0.5
                     
                     if recent_macd_trend and close_to_signal:
                         print(f"{symbol} 检测到潜在买入信号：大周期多头，小周期MACD接近交叉")
@@ -630,11 +1158,11 @@ class CryptoAnalyzer:
             # 卖出信号：大周期空头 + 小周期死叉（放宽0轴要求）
             if not four_hour_macd_bullish:
                 if is_death_cross:
-                    is_sell_signal = self.check_sell_signal(quarter_hour_macd_line, quarter_hour_macd_signal, quarter_hour_data)
+                    is_sell_signal = self.check_sell_signal(quarter_hour_macd_line, quarter_hour_macd_signal, macd_cross=macd_cross)
                 else:
                     # 额外检查：如果大周期很弱，但小周期还没形成死叉，可以考虑作为潜在卖出信号
-                    recent_macd_trend = (quarter_hour_macd_line.iloc[-1] < quarter_hour_macd_line.iloc[-2] < quarter_hour_macd_line.iloc[-3])
-                    close_to_signal = abs(quarter_hour_macd_line.iloc[-1] - quarter_hour_macd_signal.iloc[-1]) / max(abs(quarter_hour_macd_signal.iloc[-1]), 0.0001) * 100 < 0.5
+                    recent_macd_trend = (quarter_hour_macd_line[-1] < quarter_hour_macd_line[-2] < quarter_hour_macd_line[-3])
+                    close_to_signal = abs(quarter_hour_macd_line[-1] - quarter_hour_macd_signal[-1]) / max(abs(quarter_hour_macd_signal[-1]), 0.0001) * 100 < 0.5
                     
                     if recent_macd_trend and close_to_signal:
                         print(f"{symbol} 检测到潜在卖出信号：大周期空头，小周期MACD接近交叉")
@@ -644,17 +1172,168 @@ class CryptoAnalyzer:
             print(f"{symbol} 信号检查结果 - 买入信号: {is_buy_signal}, 卖出信号: {is_sell_signal}")
             
             # 分析完成，返回结果
-            return symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish, is_buy_signal, is_sell_signal, quarter_hour_interval
+            return AnalysisResult(symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross,
+                                  four_hour_macd_bullish, is_buy_signal, is_sell_signal, quarter_hour_interval)
         except Exception as e:
             print(f"分析{symbol}时出错: {e}")
             import traceback
             traceback.print_exc()
-            return symbol, None, False, None, None, None, False, False, None
+            return AnalysisResult.failed(symbol)
+    
+    def analyze_swing_points(self, symbol):
+        """波段分析：找出最近两个波段低点和高点，返回swing_summary的结果，获取K线失败返回None
+        
+        使用分析时已获取的15分钟K线（请求合并层中的同一份数据）合成swing_interval周期，不额外请求。
+        """
+        if symbol in self.shard_extras:
+            # 分片模式：工作进程已随分析结果发回
+            return (self.shard_extras[symbol] or {}).get('swing')
+        frames = self.get_analysis_frames(symbol)
+        if frames is None:
+            return None
+        klines = frames['15m']
+        if self.swing_interval != '15m':
+            if isinstance(klines, KlineArrays):
+                klines = resample_kline_arrays(klines, '15m', self.swing_interval)
+            else:
+                klines = resample_klines(klines, '15m', self.swing_interval)
+        if isinstance(klines, KlineArrays):
+            open_time = klines['open_time']
+        else:
+            open_time = klines['open_time'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        return swing_summary(open_time, klines['low'], klines['high'], self.swing_window)
+    
+    def screen_higher_lows(self, symbols):
+        """低点抬高筛选：最近两个波段低点抬高的币种，按低点涨幅从高到低排序
+        
+        Returns:
+            list: [(symbol, swing_summary的结果), ...]
+        """
+        results = []
+        for symbol in symbols:
+            try:
+                summary = self.analyze_swing_points(symbol)
+            except Exception as e:
+                print(f"{symbol}波段分析出错: {e}")
+                continue
+            if summary is not None and summary['higher_low']:
+                results.append((symbol, summary))
+        results.sort(key=lambda item: item[1]['lows']['change_pct'], reverse=True)
+        return results
+    
+    def analyze_batch(self, klines_by_symbol):
+        """批量分析：把所有币种的收盘价堆叠成矩阵，一次向量化计算MACD和买卖信号
+        
+        Args:
+            klines_by_symbol: {symbol: (4小时K线, 15分钟K线)}，K线为KlineArrays或DataFrame，获取失败为(None, None)
+            
+        Returns:
+            dict: {symbol: AnalysisResult}
+        """
+        quarter_hour_interval = '15m'
+        results = {}
+        symbols = []
+        for symbol, (four_hour_data, quarter_hour_data) in klines_by_symbol.items():
+            if four_hour_data is None or quarter_hour_data is None:
+                print(f"无法获取{symbol}的完整数据，跳过")
+                results[symbol] = AnalysisResult.failed(symbol, quarter_hour_interval)
+            elif len(four_hour_data) < 20 or len(quarter_hour_data) < 50:
+                print(f"{symbol}数据量不足，跳过")
+                results[symbol] = AnalysisResult.failed(symbol, quarter_hour_interval)
+            else:
+                symbols.append(symbol)
+        if not symbols:
+            return results
+        
+        four_hour_close, _ = stack_columns([np.asarray(klines_by_symbol[symbol][0]['close']) for symbol in symbols])
+        quarter_hour_close, _ = stack_columns([np.asarray(klines_by_symbol[symbol][1]['close']) for symbol in symbols])
+        masks = macd_signal_masks(four_hour_close, quarter_hour_close)
+        
+        for i, symbol in enumerate(symbols):
+            four_hour_macd_bullish = bool(masks['bullish'][i])
+            macd_status = "多头" if four_hour_macd_bullish else "空头"
+            is_golden_cross = bool(masks['golden_cross'][i])
+            macd_cross = 'golden_cross' if is_golden_cross else 'death_cross' if masks['death_cross'][i] else None
+            results[symbol] = AnalysisResult(symbol, macd_status, is_golden_cross, masks['four_hour_macd'][i], macd_cross,
+                                             four_hour_macd_bullish, bool(masks['buy'][i]), bool(masks['sell'][i]), quarter_hour_interval)
+        return results
+    
+    def iter_analysis_results(self, symbols, prefetched, local_only=False):
+        """按analysis_mode分析所有币种，逐个产出(symbol, 分析结果)
+        
+        Args:
+            symbols: 币种列表
+            prefetched: 异步模式下预先抓取的{symbol: (4小时K线, 15分钟K线)}，没有的币种在线程池中获取
+            local_only: 设置了shard_workers也在本进程分析（分片不可用时的回退）
+        """
+        if self.shard_workers and not local_only:
+            yield from self.iter_sharded_results(symbols)
+            return
+        
+        max_workers = min(self.max_workers, len(symbols))  # 限制最大线程数
+        print(f"使用{max_workers}个线程并发{'获取K线' if self.analysis_mode == 'batch' else '分析'}...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if self.analysis_mode == 'batch':
+                missing = [symbol for symbol in symbols if symbol not in prefetched]
+                klines_by_symbol = dict(prefetched)
+                klines_by_symbol.update(zip(missing, executor.map(self.get_analysis_klines, missing)))
+                analyze_start = time.perf_counter()
+                results = self.analyze_batch({symbol: klines_by_symbol[symbol] for symbol in symbols})
+                print(f"批量MACD分析完成：{len(symbols)}个币种，耗时{(time.perf_counter() - analyze_start) * 1000:.1f}ms")
+                for symbol in symbols:
+                    yield symbol, results[symbol]
+                return
+            
+            # 提交所有任务
+            # 异步抓取失败的币种回退为线程内同步获取
+            future_to_symbol = {executor.submit(self.analyze_single_currency, symbol, *prefetched.get(symbol, (None, None))): symbol for symbol in symbols}
+            
+            # 处理完成的任务
+            for future in as_completed(future_to_symbol):
+                symbol = future_to_symbol[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"处理{symbol}时出错: {e}")
+                    continue
+                yield symbol, result
+    
+    def iter_sharded_results(self, symbols):
+        """把币种按哈希分给shard_workers中的工作进程分析，逐个产出(symbol, 分析结果)
+        
+        工作进程使用与本进程相同的抓取/分析设置（SHARD_SETTINGS），K线在各工作进程中获取。
+        工作进程不可用时，它负责的币种回退到本进程分析。
+        """
+        try:
+            coordinator = ShardCoordinator(self.shard_workers, self.shard_authkey)
+        except ValueError as e:
+            print(f"无法使用分片工作进程: {e}")
+            print("本轮在本进程分析")
+            yield from self.iter_analysis_results(symbols, {}, local_only=True)
+            return
+        # 工作进程随结果发回的7天涨幅、波段分析和4小时DIF/DEA，报告部分直接使用，不在本进程重新请求K线
+        self.shard_extras = coordinator.extras
+        print(f"使用{len(coordinator.addresses)}个分片工作进程分析...")
+        settings = {name: getattr(self, name) for name in SHARD_SETTINGS}
+        
+        def analyze_locally(missing):
+            # 由各分片的收发线程并发调用，不修改shard_workers等实例状态
+            prefetched = self.prefetch_klines_async(missing) if self.fetch_mode == 'async' else {}
+            yield from self.iter_analysis_results(missing, prefetched, local_only=True)
+        
+        yield from coordinator.iter_results(symbols, settings, fallback=analyze_locally)
+        for index, stats in enumerate(coordinator.last_stats):
+            line = f"分片{index}（{stats['address']}）：{stats['received']}/{stats['symbols']}个币种，耗时{stats['seconds']:.2f}秒"
+            if stats['concurrency']:
+                line += f"，K线并发{stats['concurrency']['initial_limit']} → {stats['concurrency']['final_limit']}"
+            if stats['error']:
+                line += f"，连接失败（{stats['error']}），{stats['fallback']}个币种在本地分析"
+            print(line)
     
     def check_4h_bullish_1h_goldencross(self, symbol):
         """检查特定信号：大周期MACD状态和小周期MACD交叉"""
-        symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish = self.analyze_single_currency(symbol)
-        return macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish
+        result = self.analyze_single_currency(symbol)
+        return result.macd_status, result.is_golden_cross, result.four_hour_macd_value, result.macd_cross, result.four_hour_macd_bullish
     
     def plot_chart(self, symbol, main_interval, main_data, four_x_data, analysis_result):
         """绘制图表"""
@@ -662,9 +1341,10 @@ class CryptoAnalyzer:
             # 设置图表大小
             plt.figure(figsize=(15, 12))
             
-            # 计算指标
-            main_macd, main_signal, main_hist = self.calculate_macd(main_data)
-            four_x_macd, four_x_signal, four_x_hist = self.calculate_macd(four_x_data)
+            # 计算指标（与analyze_signal传入相同币种和周期时直接复用缓存）
+            four_x_interval = self.interval_map[main_interval]['four_x']
+            main_macd, main_signal, main_hist = self.indicator_graph(main_data, symbol, main_interval).macd()
+            four_x_macd, four_x_signal, four_x_hist = self.indicator_graph(four_x_data, symbol, four_x_interval).macd()
             
             # 绘制价格图
             plt.subplot(3, 1, 1)
@@ -684,7 +1364,6 @@ class CryptoAnalyzer:
             plt.legend()
             
             # 绘制4倍周期MACD
-            four_x_interval = self.interval_map[main_interval]['four_x']
             plt.subplot(3, 1, 3)
             plt.plot(four_x_data['open_time'], four_x_macd, label='MACD')
             plt.plot(four_x_data['open_time'], four_x_signal, label='信号线')
@@ -724,9 +1403,9 @@ class CryptoAnalyzer:
         print("="*100)
         
         for symbol, result in analysis_results.items():
-            # 检查result的类型，如果是元组则转换为字典格式
-            if isinstance(result, tuple) and len(result) >= 9:
-                symbol, macd_status, is_golden_cross, macd_value, macd_cross, macd_bullish, _, _, cross_interval = result
+            # AnalysisResult转换为字典格式
+            if isinstance(result, AnalysisResult):
+                is_golden_cross, macd_cross, macd_bullish, cross_interval = result.is_golden_cross, result.macd_cross, result.four_hour_macd_bullish, result.cross_interval
                 # 构建字典格式
                 result_dict = {
                     'signal': '买入信号' if is_golden_cross and macd_bullish else '卖出信号' if not is_golden_cross and not macd_bullish else None,
@@ -746,30 +1425,6 @@ class CryptoAnalyzer:
             print("未配置钉钉webhook，跳过通知发送")
             return False
             
-        # 创建会话并配置重试机制
-        session = requests.Session()
-        
-        # 处理Retry参数兼容性问题
-        retry_kwargs = {
-            'total': 3,  # 总重试次数
-            'status_forcelist': [429, 500, 502, 503, 504],  # 需要重试的HTTP状态码
-            'backoff_factor': 1  # 重试间隔时间因子
-        }
-        
-        # 尝试使用allowed_methods（新版本），如果失败则回退
-        try:
-            # 测试Retry是否接受allowed_methods参数
-            test_retry = Retry(**retry_kwargs, allowed_methods=["POST"])
-            retry_kwargs['allowed_methods'] = ["POST"]
-        except TypeError:
-            # 旧版本使用method_whitelist
-            retry_kwargs['method_whitelist'] = ["POST"]
-        
-        retry_strategy = Retry(**retry_kwargs)
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        
         try:
             headers = {'Content-Type': 'application/json;charset=utf-8'}
             data = {
@@ -780,12 +1435,11 @@ class CryptoAnalyzer:
                 }
             }
             # 添加超时设置和SSL验证选项
-            response = session.post(
+            response = self.http.post(
                 self.dingtalk_webhook, 
                 headers=headers, 
                 json=data,
-                timeout=10,  # 设置超时时间为10秒
-                verify=False  # 禁用SSL验证以解决证书问题
+                timeout=10  # 设置超时时间为10秒
             )
             response.raise_for_status()  # 抛出HTTP错误
             
@@ -799,12 +1453,11 @@ class CryptoAnalyzer:
             print("SSL连接错误，已禁用SSL验证")
             # SSL错误时再次尝试，确保verify=False生效
             try:
-                response = session.post(
+                response = self.http.post(
                     self.dingtalk_webhook, 
                     headers=headers, 
                     json=data,
-                    timeout=10,
-                    verify=False
+                    timeout=10  # 设置超时时间为10秒
                 )
                 if response.status_code == 200 and response.json().get('errcode') == 0:
                     print("禁用SSL验证后钉钉通知发送成功")
@@ -818,8 +1471,6 @@ class CryptoAnalyzer:
         except Exception as e:
             print(f"发送钉钉通知时出错: {e}")
             return False
-        finally:
-            session.close()
             
     def send_telegram_notification(self, message, title="加密货币分析提醒"):
         """发送电报通知，添加重试机制和SSL错误处理"""
@@ -827,30 +1478,6 @@ class CryptoAnalyzer:
             print("未配置电报机器人token或chat_id，跳过通知发送")
             return False
             
-        # 创建会话并配置重试机制
-        session = requests.Session()
-        
-        # 处理Retry参数兼容性问题
-        retry_kwargs = {
-            'total': 3,  # 总重试次数
-            'status_forcelist': [429, 500, 502, 503, 504],  # 需要重试的HTTP状态码
-            'backoff_factor': 1  # 重试间隔时间因子
-        }
-        
-        # 尝试使用allowed_methods（新版本），如果失败则回退
-        try:
-            # 测试Retry是否接受allowed_methods参数
-            test_retry = Retry(**retry_kwargs, allowed_methods=["GET"])
-            retry_kwargs['allowed_methods'] = ["GET"]
-        except TypeError:
-            # 旧版本使用method_whitelist
-            retry_kwargs['method_whitelist'] = ["GET"]
-        
-        retry_strategy = Retry(**retry_kwargs)
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-            
         try:
             # 为电报格式化消息，将markdown转换为电报支持的格式
             telegram_message = f"*{title}*\n\n{message.replace('# ', '').replace('## ', '')}"
@@ -861,11 +1488,10 @@ class CryptoAnalyzer:
                 "parse_mode": "Markdown"
             }
             # 添加超时设置和SSL验证选项
-            response = session.get(
+            response = self.http.get(
                 url, 
                 params=params,
-                timeout=10,  # 设置超时时间为10秒
-                verify=False  # 禁用SSL验证以解决证书问题
+                timeout=10  # 设置超时时间为10秒
             )
             response.raise_for_status()  # 抛出HTTP错误
             
@@ -879,11 +1505,10 @@ class CryptoAnalyzer:
             print("SSL连接错误，已禁用SSL验证")
             # SSL错误时再次尝试，确保verify=False生效
             try:
-                response = session.get(
+                response = self.http.get(
                     url, 
                     params=params,
-                    timeout=10,
-                    verify=False
+                    timeout=10  # 设置超时时间为10秒
                 )
                 if response.status_code == 200 and response.json().get('ok'):
                     print("禁用SSL验证后电报通知发送成功")
@@ -897,33 +1522,52 @@ class CryptoAnalyzer:
         except Exception as e:
             print(f"发送电报通知时出错: {e}")
             return False
-        finally:
-            session.close()
     
     def run(self):
         """运行主程序"""
         print("欢迎使用币安合约币种筛选工具")
         print("功能：筛选USDT合约成交额前100名币种，按成交额排序，检测4小时MACD状态（多头左侧/右侧、空头左侧/右侧）和15分钟MACD交叉信号")
-        print("每小时整点自动运行一次，并将结果推送到电报")
-        print("每5分钟检查一次持仓盈亏率")
+        print(f"每根{self.filter_interval} K线收盘时自动运行一次，并将结果推送到电报")
+        print(f"每{self.pnl_check_interval}检查一次持仓盈亏率")
         
         # 首次运行一次
         self.execute_filter()
         
-        # 设置定时任务，每小时整点运行
-        print("\n定时任务已设置，将在每小时整点自动运行...")
-        schedule.every().hour.at(":00").do(self.execute_filter)
+        # 按服务器时间对齐K线收盘时刻，本地时钟偏差不影响触发时间
+        if self.server_clock.sync():
+            print(f"服务器时间偏差: {self.server_clock.offset_ms:+.0f}ms（往返{self.server_clock.round_trip_ms:.0f}ms）")
+        else:
+            print("无法获取服务器时间，使用本地时间")
+        
+        # 筛选分析和持仓盈亏检查在不同线程执行，盈亏检查不会等待耗时较长的筛选分析
+        scheduler = CandleScheduler(self.server_clock)
+        print(f"\n定时任务已设置，将在每根{self.filter_interval} K线收盘后{self.candle_close_delay:g}秒自动运行...")
+        scheduler.every(self.filter_interval, self.execute_filter, delay=self.candle_close_delay)
+        print(f"定时任务已设置，将每{self.pnl_check_interval}检查一次持仓盈亏...")
+        scheduler.every(self.pnl_check_interval, self.check_holdings_pnl_every_5min, delay=self.candle_close_delay)
+        # 每小时（错开整点）重新同步一次服务器时间
+        scheduler.every('1h', self.server_clock.sync, delay=30 * 60, name='sync_server_time')
+        scheduler.run()
+    
+    def run_stream(self, top_n=100, duration=None):
+        """推送模式运行：订阅成交额前N名和持仓币种的K线与标记价格推送
         
-        # 设置每5分钟检查一次持仓盈亏
-        print("定时任务已设置，将每5分钟检查一次持仓盈亏...")
-        schedule.every(5).minutes.do(self.check_holdings_pnl_every_5min)
+        每根15分钟K线收盘立即分析MACD信号，持仓币种价格异动实时提醒。
         
-        try:
-            while True:
-                schedule.run_pending()
-                time.sleep(10)  # 每10秒检查一次，提高响应速度
-        except KeyboardInterrupt:
-            print("\n程序已手动停止")
+        Args:
+            top_n: 订阅成交额前N名的币种
+            duration: 运行秒数，None表示一直运行
+        """
+        print("欢迎使用币安合约币种筛选工具（推送模式）")
+        top_currencies = self.get_top_usdt_futures(top_n=top_n)
+        holdings = self.load_holdings()
+        # 持仓币种排在前面，去重并保持顺序
+        symbols = list(dict.fromkeys(list(holdings.keys()) + [symbol for symbol, _ in top_currencies]))
+        if not symbols:
+            print("错误：没有可订阅的币种")
+            return None
+        runner = StreamRunner(self, stream_url=self.stream_url)
+        return runner.run(symbols, duration=duration)
     
     def load_holdings(self):
         """加载持仓数据"""
@@ -952,6 +1596,9 @@ class CryptoAnalyzer:
             print("当前没有持仓数据，跳过检测")
             return
         
+        # 一次请求拿到所有币种价格，后续逐个币种查询都从快照读取
+        self.price_snapshot.refresh(force=True)
+        
         # 初始化统计变量
         total_investment = 0
         total_value = 0
@@ -1063,11 +1710,14 @@ class CryptoAnalyzer:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 5分钟持仓盈亏检测完成")
     
     def get_crypto_price(self, symbol):
-        """获取加密货币当前价格"""
+        """获取加密货币当前价格，优先从全市场价格快照读取"""
+        price = self.price_snapshot.get(symbol)
+        if price is not None:
+            return price
         try:
             # 使用与telegram_commands_bot相同的API获取价格
             url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
-            response = requests.get(url, timeout=10)
+            response = self.http.get(url, timeout=10, verify=True)
             if response.status_code == 200:
                 data = response.json()
                 return float(data.get('price', 0))
@@ -1267,9 +1917,16 @@ class CryptoAnalyzer:
             # 恢复原始方法
             self.mad_push_to_dingtalk = original_mad_push
             
-    def check_holdings_signals(self, analysis_results):
-        """根据持仓情况检查止盈止损信号"""
-        holdings = self.load_holdings()
+    def check_holdings_signals(self, analysis_results, four_hour_macd=None, holdings=None):
+        """根据持仓情况检查止盈止损信号
+        
+        Args:
+            analysis_results: AnalysisResults或{symbol: AnalysisResult}
+            four_hour_macd: 可选，{symbol: (DIF, DEA)}，已算好4小时MACD时直接使用（如推送模式的增量MACD）
+            holdings: 可选，已加载的持仓数据，不传则从文件读取
+        """
+        if holdings is None:
+            holdings = self.load_holdings()
         
         if not holdings:
             print("当前没有持仓数据")
@@ -1282,8 +1939,11 @@ class CryptoAnalyzer:
                 # 检查该币种是否在分析结果中
                 if symbol in analysis_results:
                     result = analysis_results[symbol]
-                    if result is not None and len(result) >= 9:
-                        _, macd_status, is_golden_cross, _, macd_cross, macd_bullish, _, _, cross_interval = result
+                    if result is not None:
+                        macd_bullish = result.four_hour_macd_bullish
+                        macd_cross = result.macd_cross
+                        is_golden_cross = result.is_golden_cross
+                        cross_interval = result.cross_interval
                         
                         # 获取持仓类型
                         position_type = position_info.get('position_type', 'long')
@@ -1298,13 +1958,20 @@ class CryptoAnalyzer:
                         # 统一使用4小时MACD判断和15分钟MACD交叉
                         macd_interval = '4h'  # MACD判断周期
                         
-                        # 获取相应周期的MACD数据
-                        macd_data = self.get_futures_klines(symbol, macd_interval, limit=50)
-                        if macd_data is not None:
-                            macd_line, macd_signal, _ = self.calculate_macd(macd_data)
-                            current_dif = macd_line.iloc[-1] if macd_line is not None and len(macd_line) > 0 else 0
-                            current_dea = macd_signal.iloc[-1] if macd_signal is not None and len(macd_signal) > 0 else 0
+                        # 获取相应周期的MACD数据：与分析时使用的4小时K线相同，本轮已获取过的直接复用
+                        macd_data = None
+                        if four_hour_macd is not None and symbol in four_hour_macd:
+                            current_dif, current_dea = four_hour_macd[symbol]
                         else:
+                            macd_data, _ = self.get_analysis_klines(symbol)
+                        if macd_data is not None:
+                            # 与analyze_single_currency使用同一组4小时K线，指标缓存直接命中
+                            macd_indicators = self.indicator_graph(macd_data, symbol, macd_interval)
+                            macd_line = macd_indicators.get('macd_line')
+                            macd_signal = macd_indicators.get('signal_line')
+                            current_dif = macd_line[-1] if len(macd_line) > 0 else 0
+                            current_dea = macd_signal[-1] if len(macd_signal) > 0 else 0
+                        elif four_hour_macd is None or symbol not in four_hour_macd:
                             current_dif = 0
                             current_dea = 0
                         
@@ -1344,6 +2011,38 @@ class CryptoAnalyzer:
     
 
     
+    def analysis_order(self, top_currencies, holdings):
+        """本轮的分析顺序：持仓币种、重点关注币种（focus_list和default_focus_coins）、其余按成交额从高到低
+        
+        线程池按提交顺序开始执行，持仓币种最先分析完，止盈止损提醒不必等全部币种分析结束。
+        持仓和重点关注的币种即使不在成交额前列也会分析。
+        
+        Returns:
+            list: 去重后的币种列表
+        """
+        focus = [symbol for symbol in list(self.focus_list) + self.default_focus_coins if isinstance(symbol, str)]
+        return list(dict.fromkeys(list(holdings) + focus + [symbol for symbol, _ in top_currencies]))
+    
+    def format_stop_signals(self, stop_signals):
+        """止盈止损信号的通知内容"""
+        content = ""
+        for signal in stop_signals:
+            position_text = "多单" if signal['position_type'] == 'long' else "空单"
+            content += f"- **{signal['symbol']}** ({position_text}) - {signal['signal_type']} - {signal['trigger_condition']}\n"
+        return content
+    
+    def send_stop_signal_alert(self, stop_signals):
+        """持仓币种分析完后立即推送止盈止损提醒（不等其余币种）"""
+        content = f"### ⚠️ 持仓止盈止损提醒 - {datetime.now().strftime('%Y-%m-%d %H:%M')}\n" + self.format_stop_signals(stop_signals)
+        try:
+            self.send_dingtalk_notification(content, "持仓止盈止损提醒")
+        except Exception as e:
+            print(f"钉钉通知发送失败: {e}")
+        try:
+            self.send_telegram_notification(content, "持仓止盈止损提醒")
+        except Exception as e:
+            print(f"电报通知发送失败: {e}")
+    
     def execute_filter(self):
         """执行筛选分析"""
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始筛选分析...")
@@ -1351,8 +2050,14 @@ class CryptoAnalyzer:
         
         # 初始化止盈止损信号列表
         stop_signals = []
-        # 初始化分析结果字典
-        analysis_results = {}
+        
+        if self.kline_store is not None:
+            self.kline_store.reset_stats()
+        # 新一轮开始，上一轮的K线请求结果和指标不再复用
+        self.kline_flight.reset()
+        self.indicator_cache.reset()
+        self.shard_extras = {}
+        self.start_fetch_round()
         
         # 获取成交额前100名的USDT合约币种及其成交额
         top_currencies = self.get_top_usdt_futures(top_n=100)
@@ -1366,184 +2071,135 @@ class CryptoAnalyzer:
         for i, (symbol, volume) in enumerate(top_currencies[:10], 1):
             print(f"   {i}. {symbol}: {volume:.2f} USDT")
         
+        # 持仓和重点关注的币种排在最前面
+        holdings = self.load_holdings()
+        symbols = self.analysis_order(top_currencies, holdings)
+        
         print("\n2. 开始分析每个币种的MACD信号...")
         print("   统一使用15分钟MACD交叉和4小时MACD进行分析")
+        if holdings:
+            print(f"   优先分析{len(holdings)}个持仓币种，完成后立即检查止盈止损")
         # 打印表头
         print("="*110)
         print(f"{'币种':<15} {'MACD状态':<15} {'MACD值':<12} {'MACD交叉状态':<15} {'信号':<25}")
         print("="*110)
         
-        # 统计变量
-        total_analyzed = 0
-        bullish_count = 0  # 多头计数
-        bearish_count = 0  # 空头计数
-        golden_cross_count = 0
-        death_cross_count = 0
-        buy_signal_count = 0
-        sell_signal_count = 0
-        buy_signal_symbols = []
-        sell_signal_symbols = []
-        
-        # 使用线程池并发分析多个币种
-        max_workers = min(10, len(top_currencies))  # 限制最大线程数
-        print(f"使用{max_workers}个线程并发分析...")
-        
-        # 创建线程安全的计数器
-        lock = threading.Lock()
-        
-        # 使用线程池处理
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任务
-            future_to_symbol = {executor.submit(self.analyze_single_currency, symbol): symbol for symbol, _ in top_currencies}
-            
-            # 处理完成的任务
-            for i, future in enumerate(as_completed(future_to_symbol), 1):
-                symbol = future_to_symbol[future]
-                print(f"分析进度: {i}/{len(top_currencies)}", end='\r')
-                
-                try:
-                    # 接收分析结果，包含是否满足买入/卖出信号
-                    symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish, is_buy_signal, is_sell_signal, cross_interval = future.result()
-                    
-                    if four_hour_macd_bullish is None:
-                        # 无法获取数据
-                        print(f"{symbol:<15} {'数据获取失败':<15} {'N/A':<12} {'N/A':<15} {'跳过':<25}")
-                        continue
-                    
-                    with lock:
-                        total_analyzed += 1
-                        
-                        is_death_cross = macd_cross == 'death_cross'
-                        if is_golden_cross:
-                            golden_cross_count += 1
-                        elif is_death_cross:
-                            death_cross_count += 1
-                        
-                        # 判断信号类型
-                        signal = "不满足"
-                        
-                        # 使用analyze_single_currency中计算好的信号
-                        if is_buy_signal:
-                            signal = "买入信号：大周期多头+小周期金叉"
-                            buy_signal_count += 1
-                            buy_signal_symbols.append((symbol, macd_status, "MACD金叉", four_hour_macd_value))
-                        elif is_sell_signal:
-                            signal = "卖出信号：大周期空头+小周期死叉"
-                            sell_signal_count += 1
-                            sell_signal_symbols.append((symbol, macd_status, "MACD死叉", four_hour_macd_value))
-                        
-                        # 更新统计计数
-                        if macd_status == "多头":
-                            bullish_count += 1
-                        else:  # 空头
-                            bearish_count += 1
-                    
-                    # 格式化输出
-                    macd_cross_status = "金叉" if macd_cross == 'golden_cross' else "死叉" if macd_cross == 'death_cross' else "无交叉"
-                    
-                    # 存储分析结果，包含MACD交叉周期信息
-                    analysis_results[symbol] = (symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish, is_buy_signal, is_sell_signal, cross_interval)
-                    
-                    # 打印详细信息 - 只有在满足买入/卖出信号时才显示交叉信息
-                    if signal == "买入信号" or signal == "卖出信号":
-                        print(f"{symbol:<15} {macd_status:<15} {four_hour_macd_value:<12.4f} {macd_cross_status:<15} {signal:<25}")
-                    else:
-                        # 不满足信号条件时，不显示交叉状态
-                        print(f"{symbol:<15} {macd_status:<15} {four_hour_macd_value:<12.4f} {'-':<15} {signal:<25}")
-                    
-                except Exception as e:
-                    print(f"处理{symbol}时出错: {e}")
+        # 异步模式下先并发抓取所有币种的K线，再交给线程池计算MACD
+        prefetched = {}
+        # 分片模式下K线由各工作进程自己抓取
+        if self.fetch_mode == 'async' and not self.shard_workers:
+            fetch_start = time.time()
+            prefetched = self.prefetch_klines_async(symbols)
+            print(f"异步抓取完成：{len(prefetched)}/{len(symbols)}个币种，耗时{time.time() - fetch_start:.2f}秒")
+        
+        collected = []
+        analysis_start = time.time()
+        pending_holdings = set(holdings)
+        stop_alert_sent = False
+        analysis_iter = self.iter_analysis_results(symbols, prefetched)
+        for i, (symbol, result) in enumerate(analysis_iter, 1):
+            print(f"分析进度: {i}/{len(symbols)}", end='\r')
+            collected.append(result)
+            
+            # 持仓币种一分析完就检查止盈止损，全部持仓检查完立即推送
+            if symbol in pending_holdings:
+                pending_holdings.discard(symbol)
+                if result.analyzed:
+                    stop_signals.extend(self.check_holdings_signals({symbol: result}, four_hour_macd=self.shard_four_hour_macd(symbol),
+                                                                    holdings=holdings))
+                if not pending_holdings:
+                    print(f"持仓币种分析完成，用时{time.time() - analysis_start:.2f}秒（已完成{i}/{len(symbols)}个币种）")
+                    if stop_signals:
+                        self.send_stop_signal_alert(stop_signals)
+                        stop_alert_sent = True
+            
+            if not result.analyzed:
+                # 无法获取数据
+                print(f"{symbol:<15} {'数据获取失败':<15} {'N/A':<12} {'N/A':<15} {'跳过':<25}")
+                continue
+            
+            # 使用analyze_single_currency中计算好的信号
+            signal = "不满足"
+            if result.is_buy_signal:
+                signal = "买入信号：大周期多头+小周期金叉"
+            elif result.is_sell_signal:
+                signal = "卖出信号：大周期空头+小周期死叉"
+            
+            # 不满足信号条件时，不显示交叉状态
+            print(f"{symbol:<15} {result.macd_status:<15} {result.four_hour_macd_value:<12.4f} {'-':<15} {signal:<25}")
+        
+        # 本轮所有完成分析的结果（按列存放，下面的统计、筛选和排序都直接在数组上进行）
+        all_results = AnalysisResults(collected)
+        analysis_results = all_results.where(all_results.analyzed)
+        self.archive_run(all_results)
+        self.record_concurrency_run(len(symbols))
         
         print("="*140)
-        print(f"\n分析完成！总共分析了{total_analyzed}个币种")
-        print(f"15分钟MACD多头币种: {bullish_count}个")
-        print(f"15分钟MACD空头币种: {bearish_count}个")
-        print(f"MACD金叉币种: {golden_cross_count}个")
-        print(f"MACD死叉币种: {death_cross_count}个")
-        print(f"买入信号币种: {buy_signal_count}个")
-        print(f"卖出信号币种: {sell_signal_count}个")
-        
-        # 按MACD交叉周期分类信号列表
-        # 多头信号分类
-        buy_signal_1h = []  # 15分钟MACD交叉的买入信号
-        
-        sell_signal_1h = [] # 15分钟MACD交叉的卖出信号
-        
-        # 重新构建包含MACD交叉周期的信号列表
-        for symbol, _, _, _ in buy_signal_symbols:
-            if symbol in analysis_results:
-                result = analysis_results[symbol]
-                if len(result) >= 9:
-                    cross_interval = result[8]
-                    for i, (s, status, macd, m_val) in enumerate(buy_signal_symbols):
-                        if s == symbol:
-                            # 统一使用15分钟MACD交叉
-                            buy_signal_1h.append((symbol, status, macd, m_val, cross_interval))
-                            break
-
-        for symbol, _, _, _ in sell_signal_symbols:
-            if symbol in analysis_results:
-                result = analysis_results[symbol]
-                if len(result) >= 9:
-                    cross_interval = result[8]
-                    for i, (s, status, macd, m_val) in enumerate(sell_signal_symbols):
-                        if s == symbol:
-                            # 统一使用15分钟MACD交叉
-                            sell_signal_1h.append((symbol, status, macd, m_val, cross_interval))
-                            break
-        
-        # 对分类后的信号列表进行排序
-        buy_signal_1h.sort(key=lambda x: x[3] if x[3] is not None else float('inf'))
-        sell_signal_1h.sort(key=lambda x: x[3] if x[3] is not None else float('-inf'), reverse=True)
+        print(f"\n分析完成！总共分析了{len(analysis_results)}个币种")
+        print(f"15分钟MACD多头币种: {analysis_results.count('bullish')}个")
+        print(f"15分钟MACD空头币种: {len(analysis_results) - analysis_results.count('bullish')}个")
+        print(f"MACD金叉币种: {analysis_results.count('golden_cross')}个")
+        print(f"MACD死叉币种: {analysis_results.count('death_cross')}个")
+        print(f"买入信号币种: {analysis_results.count('buy')}个")
+        print(f"卖出信号币种: {analysis_results.count('sell')}个")
+        
+        # 15分钟MACD交叉的买入信号按4小时MACD值从低到高，卖出信号从高到低
+        buy_signals = analysis_results.where(analysis_results.buy).sort_by('macd_value')
+        sell_signals = analysis_results.where(analysis_results.sell & ~analysis_results.buy).sort_by('macd_value', reverse=True)
         
         # 生成钉钉通知内容
         dingtalk_content = f"### 加密货币信号提醒 - {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
         
-        # 输出1小时MACD交叉的买入信号
-        if buy_signal_1h:
+        # 输出15分钟MACD交叉的买入信号
+        if len(buy_signals):
             print("\n⚠️  满足条件的买入信号币种：")
             print("\n15分钟MACD买入信号：")
-            for symbol, status, macd, _, _ in buy_signal_1h:
-                print(f"   • {symbol} ({status}) - {macd}")
+            for result in buy_signals:
+                print(f"   • {result.symbol} ({result.macd_status}) - MACD金叉")
             
             # 添加到钉钉通知
             dingtalk_content += "#### 🟢 15分钟MACD多头信号：\n"
-            for symbol, macd_status, macd, _, _ in buy_signal_1h:
-                dingtalk_content += f"- {symbol} ({macd_status}) - MACD: {macd}\n"
+            for result in buy_signals:
+                dingtalk_content += f"- {result.symbol} ({result.macd_status}) - MACD: MACD金叉\n"
         
-        # 输出1小时MACD交叉的卖出信号
-        if sell_signal_1h:
+        # 输出15分钟MACD交叉的卖出信号
+        if len(sell_signals):
             print("\n⚠️  满足条件的卖出信号币种：")
             print("\n15分钟MACD卖出信号：")
-            for symbol, status, macd, _, _ in sell_signal_1h:
-                print(f"   • {symbol} ({status}) - {macd}")
+            for result in sell_signals:
+                print(f"   • {result.symbol} ({result.macd_status}) - MACD死叉")
             
             # 添加到钉钉通知
             dingtalk_content += "\n#### 🔴 15分钟MACD空头信号：\n"
-            for symbol, macd_status, macd, _, _ in sell_signal_1h:
-                dingtalk_content += f"- {symbol} ({macd_status}) - MACD: {macd}\n"
-        
-        if buy_signal_symbols or sell_signal_symbols:
-            pass
-        
-        # 检查持仓币种的止盈止损信号
-        stop_signals = self.check_holdings_signals(analysis_results)
-        
-        # 如果有止盈止损信号，添加到通知内容
+            for result in sell_signals:
+                dingtalk_content += f"- {result.symbol} ({result.macd_status}) - MACD: MACD死叉\n"
+        
+        # 波段低点抬高筛选（复用本轮已获取的K线，只附加在通知中，不单独触发通知）
+        if self.swing_screen_enabled:
+            higher_lows = self.screen_higher_lows([symbol for symbol, _ in top_currencies])
+            print(f"\n📈 {self.swing_interval}波段低点抬高币种: {len(higher_lows)}个")
+            if higher_lows:
+                dingtalk_content += f"\n#### 📈 {self.swing_interval}波段低点抬高：\n"
+            for symbol, summary in higher_lows[:10]:
+                lows = summary['lows']
+                line = f"{symbol} - 低点 {lows['previous_price']:.4f} → {lows['last_price']:.4f}, 抬高{lows['change_pct']:.2f}%, 间隔{lows['gap_hours']:.0f}小时"
+                print(f"   • {line}")
+                dingtalk_content += f"- {line}\n"
+        
+        # 持仓币种的止盈止损信号（分析过程中已检查，并已单独推送）
         if stop_signals:
             dingtalk_content += "\n\n#### ⚠️  持仓止盈止损提醒：\n"
             print("\n⚠️  检测到以下持仓币种的止盈止损信号：")
-            
+            dingtalk_content += self.format_stop_signals(stop_signals)
             for signal in stop_signals:
                 position_text = "多单" if signal['position_type'] == 'long' else "空单"
-                dingtalk_content += f"- **{signal['symbol']}** ({position_text}) - {signal['signal_type']} - {signal['trigger_condition']}\n"
                 print(f"   • {signal['symbol']} ({position_text}) - {signal['signal_type']} - {signal['trigger_condition']}")
         
         # 添加持仓和盈亏率信息
-        holdings = self.load_holdings()
         if holdings:
             dingtalk_content += "\n\n#### 📊 持仓概览：\n"
             print("\n📊 当前持仓概览：")
+            self.price_snapshot.refresh(force=True)
             
             for symbol, position_info in holdings.items():
                 try:
@@ -1575,7 +2231,8 @@ class CryptoAnalyzer:
                     print(f"计算{symbol}盈亏时出错: {e}")
         
         # 发送通知 - 只有在有信号时才发送
-        has_signals = buy_signal_symbols or sell_signal_symbols or stop_signals
+        # 止盈止损提醒已经单独推送过时，不再因为它重复发送
+        has_signals = len(buy_signals) or len(sell_signals) or (stop_signals and not stop_alert_sent)
         
         if has_signals:
             # 启用钉钉通知
@@ -1594,6 +2251,21 @@ class CryptoAnalyzer:
         else:
             print("没有交易信号，不发送通知")
         
+        # 输出连接池复用情况
+        pool_stats = self.http.pool_stats()
+        print(f"连接池统计: 请求{pool_stats['requests']}次, 复用{pool_stats['hits']}次, 新建连接{pool_stats['misses']}次, 复用率{pool_stats['hit_rate']:.1f}%")
+        self.print_rate_limit_status()
+        if self.kline_store is not None:
+            store_stats = self.kline_store.stats()
+            print(f"K线存储统计: 尾部增量{store_stats['tail_refreshes']}次, 全量{store_stats['full_refreshes']}次, 下载K线{store_stats['rows_fetched']}根, 使用K线{store_stats['rows_served']}根, 节省{store_stats['saved_pct']:.1f}%")
+        flight_stats = self.kline_flight.stats()
+        print(f"K线请求合并: 调用{flight_stats['calls']}次, 实际请求{flight_stats['executions']}次, 去重{flight_stats['deduplicated']}次")
+        indicator_stats = self.indicator_cache.stats()
+        print(f"指标缓存: {indicator_stats['graphs']}组K线, 计算指标{indicator_stats['computed']}个, 复用{indicator_stats['hits']}次")
+        buffer_count, buffer_bytes = self.kline_buffer_stats()
+        if buffer_count:
+            print(f"K线缓冲区: {buffer_count}个, 占用内存{buffer_bytes / 1024 / 1024:.1f}MB")
+        
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 筛选分析结束")
     
     def show_detailed_chart(self, symbol):
@@ -1631,7 +2303,7 @@ class CryptoAnalyzer:
             
             # 在同一子图添加MACD
             ax2 = ax1.twinx()
-            four_hour_macd, four_hour_signal, four_hour_hist = self.calculate_macd(four_hour_data)
+            four_hour_macd, four_hour_signal, four_hour_hist = self.indicator_graph(four_hour_data, symbol, '4h').macd()
             ax2.plot(four_hour_data['open_time'], four_hour_macd, label='MACD', color='green')
             ax2.plot(four_hour_data['open_time'], four_hour_signal, label='信号线', color='red')
             ax2.bar(four_hour_data['open_time'], four_hour_hist, label='柱状图', alpha=0.3, color='purple')
@@ -1650,7 +2322,8 @@ class CryptoAnalyzer:
             
             # 在同一子图添加MACD
             ax4 = ax3.twinx()
-            one_hour_macd_line, one_hour_signal_line, one_hour_histogram = self.calculate_macd(one_hour_data)
+            one_hour_indicators = self.indicator_graph(one_hour_data, symbol, '1h')
+            one_hour_macd_line, one_hour_signal_line, one_hour_histogram = one_hour_indicators.macd()
             ax4.plot(one_hour_data['open_time'], one_hour_macd_line, label='MACD', color='green')
             ax4.plot(one_hour_data['open_time'], one_hour_signal_line, label='信号线', color='red')
             ax4.bar(one_hour_data['open_time'], one_hour_histogram, label='柱状图', alpha=0.3, color='purple')
@@ -1670,14 +2343,13 @@ class CryptoAnalyzer:
             plt.xticks(rotation=45)
             
             # 添加分析摘要
-            macd_bullish = four_hour_macd.iloc[-1] > 0
-            # 计算1小时MACD交叉
-            one_hour_macd, one_hour_signal, _ = self.calculate_macd(one_hour_data)
-            macd_cross = self.detect_macd_cross(one_hour_macd, one_hour_signal)
+            macd_bullish = four_hour_macd[-1] > 0
+            # 1小时MACD交叉（复用上面已算好的1小时MACD）
+            macd_cross = one_hour_indicators.get('macd_cross')
             is_golden_cross = macd_cross == 'golden_cross'
             
             text_str = f"分析摘要:\n"
-            text_str += f"4小时MACD值: {four_hour_macd.iloc[-1]:.4f} ({'多头' if macd_bullish else '空头'})\n"
+            text_str += f"4小时MACD值: {four_hour_macd[-1]:.4f} ({'多头' if macd_bullish else '空头'})\n"
             text_str += f"1小时MACD交叉: {'金叉' if is_golden_cross else '死叉' if macd_cross == 'death_cross' else '无交叉'}\n"
             text_str += f"信号确认: {'满足4小时多头+1小时金叉' if macd_bullish and is_golden_cross else '不满足信号条件'}"
             
@@ -1688,30 +2360,6 @@ class CryptoAnalyzer:
             
         except Exception as e:
             print(f"生成图表时出错: {e}")
-    
-    def print_analysis_table(self, analysis_results):
-        """打印分析结果表格"""
-        print("\n" + "="*100)
-        print(f"{'币种':<10} {'周期':<10} {'大周期MACD方向':<15} {'MACD交叉状态':<15} {'交易信号':<40}")
-        print("="*100)
-        
-        for symbol, result in analysis_results.items():
-            # 检查是否有kdj_status，如果有则转换为MACD交叉状态，否则使用macd_cross或默认值
-            if 'kdj_status' in result:
-                macd_status = "金叉" if "金叉" in result['kdj_status'] else "死叉" if "死叉" in result['kdj_status'] else "无交叉"
-            else:
-                macd_status = result.get('macd_cross', "无交叉")
-                # 转换macd_cross的格式
-                if macd_status == 'golden_cross':
-                    macd_status = "金叉"
-                elif macd_status == 'death_cross':
-                    macd_status = "死叉"
-            
-            if result['signal']:
-                print(f"{symbol:<10} {result['interval']:<10} {result['direction']:<15} {macd_status:<15} {result['signal']:<40}")
-            else:
-                print(f"{symbol:<10} {result['interval']:<10} {result['direction']:<15} {macd_status:<15} {'暂无':<40}")
-        print("="*100)
 
 def send_urgent_notification(symbol="BTCUSDT", message="紧急提醒"):
     """发送紧急推送通知"""
@@ -1809,29 +2457,26 @@ def test_signal_generation():
     for symbol in test_symbols:
         print(f"\n正在测试 {symbol} 的信号生成...")
         result = analyzer.analyze_single_currency(symbol)
-        if result:
-            # 根据实际返回值数量解包
-            if len(result) >= 8:
-                symbol, macd_status, is_golden_cross, four_hour_macd_value, macd_cross, four_hour_macd_bullish, is_buy_signal, is_sell_signal = result[:8]
-                
-                print(f"\n{symbol} 分析结果:")
-                print(f"MACD状态: {macd_status}")
-                print(f"4小时MACD值: {four_hour_macd_value}")
-                print(f"MACD交叉状态: {macd_cross}")
-                print(f"买入信号: {is_buy_signal}")
-                print(f"卖出信号: {is_sell_signal}")
-                
-                if is_buy_signal:
-                    print(f"✅ {symbol} 生成了买入信号！")
-                elif is_sell_signal:
-                    print(f"⚠️ {symbol} 生成了卖出信号！")
-                else:
-                    print(f"❌ {symbol} 未生成交易信号")
+        if result.analyzed:
+            print(f"\n{symbol} 分析结果:")
+            print(f"MACD状态: {result.macd_status}")
+            print(f"4小时MACD值: {result.four_hour_macd_value}")
+            print(f"MACD交叉状态: {result.macd_cross}")
+            print(f"买入信号: {result.is_buy_signal}")
+            print(f"卖出信号: {result.is_sell_signal}")
+            
+            if result.is_buy_signal:
+                print(f"✅ {symbol} 生成了买入信号！")
+            elif result.is_sell_signal:
+                print(f"⚠️ {symbol} 生成了卖出信号！")
+            else:
+                print(f"❌ {symbol} 未生成交易信号")
     
     print("\n===== 信号生成测试完成 =====\n")
 
 if __name__ == "__main__":
     import sys
+    from shard_workers import LocalShardPool, parse_address, serve_shard_worker, shard_authkey
     
     # 配置参数
     DINGTALK_WEBHOOK = "https://oapi.dingtalk.com/robot/send?access_token=02fcc926215099c4d0315e453e86aa6d9af934ad538de89b13f67bc3d131ee07"  # 请在此处填入您的钉钉webhook地址
@@ -1862,6 +2507,101 @@ if __name__ == "__main__":
         elif sys.argv[1] == "--test-signals":
             # 测试信号生成逻辑
             test_signal_generation()
+        elif sys.argv[1] == "--check-resample":
+            # 检查本地合成的4小时K线与交易所是否一致
+            symbols = sys.argv[2:] or ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+            analyzer = CryptoAnalyzer()
+            for symbol in symbols:
+                analyzer.check_resample_consistency(symbol)
+        elif sys.argv[1] == "--stream":
+            # WebSocket推送模式运行
+            top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+            analyzer = CryptoAnalyzer(
+                dingtalk_webhook=DINGTALK_WEBHOOK,
+                telegram_bot_token=TELEGRAM_BOT_TOKEN,
+                telegram_chat_id=TELEGRAM_CHAT_ID
+            )
+            analyzer.run_stream(top_n=top_n)
+        elif sys.argv[1] == "--async":
+            # 使用asyncio并发抓取K线的模式运行
+            concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+            analyzer = CryptoAnalyzer(
+                dingtalk_webhook=DINGTALK_WEBHOOK,
+                telegram_bot_token=TELEGRAM_BOT_TOKEN,
+                telegram_chat_id=TELEGRAM_CHAT_ID
+            )
+            analyzer.fetch_mode = 'async'
+            analyzer.async_concurrency = concurrency
+            analyzer.run()
+        elif sys.argv[1] == "--every":
+            # 指定筛选分析的K线周期（15m、1h、4h），在该周期每根K线收盘时运行
+            analyzer = CryptoAnalyzer(
+                dingtalk_webhook=DINGTALK_WEBHOOK,
+                telegram_bot_token=TELEGRAM_BOT_TOKEN,
+                telegram_chat_id=TELEGRAM_CHAT_ID
+            )
+            analyzer.filter_interval = sys.argv[2] if len(sys.argv) > 2 else '15m'
+            analyzer.run()
+        elif sys.argv[1] == "--batch":
+            # K线全部获取后矩阵化批量计算MACD的模式运行
+            analyzer = CryptoAnalyzer(
+                dingtalk_webhook=DINGTALK_WEBHOOK,
+                telegram_bot_token=TELEGRAM_BOT_TOKEN,
+                telegram_chat_id=TELEGRAM_CHAT_ID
+            )
+            analyzer.analysis_mode = 'batch'
+            analyzer.run()
+        elif sys.argv[1] == "--query-runs":
+            # 查询归档：某币种最近N天出现买入/卖出信号的运行
+            symbol = sys.argv[2] if len(sys.argv) > 2 else "BTCUSDT"
+            days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+            signal = sys.argv[4] if len(sys.argv) > 4 else 'buy'
+            CryptoAnalyzer().print_signal_runs(symbol, days=days, signal=signal)
+        elif sys.argv[1] == "--backtest":
+            # 用本地存储的历史K线回测信号
+            days = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            side = sys.argv[3] if len(sys.argv) > 3 else 'long'
+            CryptoAnalyzer().run_backtest(days=days, side=side)
+        elif sys.argv[1] == "--import-archives":
+            # 导入Binance公开数据的K线压缩包（data.binance.vision下载的月度/日度ZIP）
+            directory = sys.argv[2] if len(sys.argv) > 2 else 'binance_data'
+            workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            CryptoAnalyzer().import_kline_archives(directory, workers=workers)
+        elif sys.argv[1] == "--sweep":
+            # 用本地存储的历史K线扫描MACD参数，可中断后继续
+            days = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != 'all' else None
+            workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            metric = sys.argv[4] if len(sys.argv) > 4 else 'total_pct'
+            CryptoAnalyzer().run_parameter_sweep(days=days, workers=workers, metric=metric)
+        elif sys.argv[1] == "--concurrency-log":
+            # 查看最近几轮K线并发的调整过程
+            runs = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+            CryptoAnalyzer().print_concurrency_log(runs)
+        elif sys.argv[1] == "--shard-worker":
+            # 作为分片工作进程运行，监听地址为'host:port'或Unix socket路径
+            # 监听非本机地址时必须先设置SHARD_AUTHKEY环境变量（协调进程使用同一个密钥）
+            address = parse_address(sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1:7310')
+            try:
+                serve_shard_worker(address, CryptoAnalyzer, shard_authkey())
+            except ValueError as e:
+                print(f"分片工作进程未启动: {e}")
+        elif sys.argv[1] == "--shards":
+            # 分片模式运行：参数为本机工作进程数，或逗号分隔的工作进程地址（其他主机上用--shard-worker启动，
+            # 两边需设置相同的SHARD_AUTHKEY）
+            target = sys.argv[2] if len(sys.argv) > 2 else str(os.cpu_count() or 1)
+            analyzer = CryptoAnalyzer(
+                dingtalk_webhook=DINGTALK_WEBHOOK,
+                telegram_bot_token=TELEGRAM_BOT_TOKEN,
+                telegram_chat_id=TELEGRAM_CHAT_ID
+            )
+            if target.isdigit():
+                with LocalShardPool(int(target), CryptoAnalyzer) as pool:
+                    analyzer.shard_workers = pool.addresses
+                    analyzer.shard_authkey = pool.authkey
+                    analyzer.run()
+            else:
+                analyzer.shard_workers = target.split(',')
+                analyzer.run()
     else:
         # 正常运行
         analyzer = CryptoAnalyzer(
@@ -0,0 +1,141 @@
+import threading
+
+import numpy as np
+
+from indicators import MacdCrossIndex, ema
+
+# 已登记的指标 {名称: (依赖的名称, 计算函数)}，K线的列（close等）是图的输入，不需要登记
+INDICATORS = {}
+
+
+def register_indicator(name, inputs):
+    """装饰器：登记一个指标，计算函数按inputs的顺序接收各依赖的值"""
+    def decorator(func):
+        INDICATORS[name] = (tuple(inputs), func)
+        return func
+    return decorator
+
+
+@register_indicator('ema_fast', ['close'])
+def _ema_fast(close):
+    return ema(close, 12)
+
+
+@register_indicator('ema_slow', ['close'])
+def _ema_slow(close):
+    return ema(close, 26)
+
+
+@register_indicator('macd_line', ['ema_fast', 'ema_slow'])
+def _macd_line(ema_fast, ema_slow):
+    return ema_fast - ema_slow
+
+
+@register_indicator('signal_line', ['macd_line'])
+def _signal_line(macd_line):
+    return ema(macd_line, 9)
+
+
+@register_indicator('histogram', ['macd_line', 'signal_line'])
+def _histogram(macd_line, signal_line):
+    return macd_line - signal_line
+
+
+@register_indicator('cross_index', ['macd_line', 'signal_line'])
+def _cross_index(macd_line, signal_line):
+    return MacdCrossIndex(macd_line, signal_line)
+
+
+@register_indicator('macd_cross', ['cross_index', 'macd_line'])
+def _macd_cross(cross_index, macd_line):
+    """最近两根K线的交叉，与detect_macd_cross的结果相同：'golden_cross'、'death_cross'或None"""
+    last = len(macd_line) - 1
+    if cross_index.previous(last + 1, 'golden') == last:
+        return 'golden_cross'
+    if cross_index.previous(last + 1, 'death') == last:
+        return 'death_cross'
+    return None
+
+
+class IndicatorGraph:
+    """一组K线上的指标依赖图：按需计算，每个指标（及其依赖）只算一次"""
+
+    __slots__ = ('klines', 'values', 'computed')
+
+    def __init__(self, klines):
+        self.klines = klines
+        self.values = {}
+        # 实际计算过的指标个数（不含K线列）
+        self.computed = 0
+
+    def get(self, name):
+        """取一个指标的值，依赖未计算时先递归计算"""
+        if name in self.values:
+            return self.values[name]
+        if name in INDICATORS:
+            inputs, func = INDICATORS[name]
+            value = func(*(self.get(dependency) for dependency in inputs))
+            self.computed += 1
+        else:
+            value = np.asarray(self.klines[name], dtype=np.float64)
+        self.values[name] = value
+        return value
+
+    def macd(self):
+        """(macd_line, signal_line, histogram)，与calculate_macd的返回值顺序相同"""
+        return self.get('macd_line'), self.get('signal_line'), self.get('histogram')
+
+
+class IndicatorCache:
+    """每轮共享的指标图：同一(币种, 周期, K线范围)的所有使用者共用一张IndicatorGraph
+
+    K线范围由第一根和最后一根K线的开盘时间、根数以及最新收盘价确定，
+    数据有任何更新（新K线、未收盘K线价格变化）都会得到新的图。每轮开始时调用reset()。
+    """
+
+    def __init__(self):
+        self._graphs = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(symbol, interval, klines):
+        open_time = klines['open_time']
+        close = klines['close']
+        if len(open_time) == 0:
+            return symbol, interval, 0
+        # 按位置取值，兼容KlineArrays和DataFrame
+        open_time = getattr(open_time, 'iloc', open_time)
+        close = getattr(close, 'iloc', close)
+        return symbol, interval, len(klines), open_time[0], open_time[-1], float(close[-1])
+
+    def graph(self, symbol, interval, klines):
+        """取(或新建)这组K线的指标图"""
+        key = self._key(symbol, interval, klines)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is None:
+                graph = self._graphs[key] = IndicatorGraph(klines)
+                self.misses += 1
+            else:
+                self.hits += 1
+        return graph
+
+    def reset(self):
+        """清空所有指标图和统计"""
+        with self._lock:
+            self._graphs = {}
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """返回指标图数量、复用次数和实际计算的指标个数"""
+        with self._lock:
+            graphs = list(self._graphs.values())
+            return {
+                'graphs': len(graphs),
+                'hits': self.hits,
+                'misses': self.misses,
+                'computed': sum(graph.computed for graph in graphs)
+            }
@@ -0,0 +1,333 @@
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # 可选依赖，未安装时使用pandas/numpy实现
+    numba = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+# ---- 计算内核 ----
+# 每个后端提供三个内核：
+#   ema(values, alpha) -> 数组
+#   ema_matrix(columns, alpha) -> 数组，columns为(时间, 行)的连续数组，行首可以是NaN
+#   cross_events(macd_line, signal_line) -> (交叉位置, 是否金叉, 是否在0轴以下)
+
+# pandas后端：序列长度达到该值时用pandas的ewm（Cython实现），较短时Python循环的固定开销更小
+PANDAS_EMA_MIN_LENGTH = 1000
+
+
+def _numpy_ema(values, alpha):
+    beta = 1 - alpha
+    # 递推在Python浮点上进行，比逐个读写numpy元素快
+    result = values.tolist()
+    if not result:
+        return np.array(result)
+    prev = result[0]
+    for i in range(1, len(result)):
+        prev = alpha * result[i] + beta * prev
+        result[i] = prev
+    return np.array(result)
+
+
+def _pandas_ema(values, alpha):
+    if len(values) < PANDAS_EMA_MIN_LENGTH:
+        return _numpy_ema(values, alpha)
+    # 与_numpy_ema的递推逐位一致
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _numpy_ema_matrix(columns, alpha):
+    beta = 1 - alpha
+    result = np.empty_like(columns)
+    if columns.size == 0:
+        return result
+    prev = columns[0].copy()
+    result[0] = prev
+    for t in range(1, len(columns)):
+        current = columns[t]
+        prev = np.where(np.isnan(prev), current, alpha * current + beta * prev)
+        result[t] = prev
+    return result
+
+
+def _numpy_cross_events(macd_line, signal_line):
+    diff = macd_line - signal_line
+    prev_diff, curr_diff = diff[:-1], diff[1:]
+    golden = (prev_diff < 0) & (curr_diff > 0)
+    death = (prev_diff > 0) & (curr_diff < 0)
+    positions = np.flatnonzero(golden | death) + 1
+    return positions, golden[positions - 1], macd_line[positions] <= 0
+
+
+def _ema_loop(values, alpha, out):
+    beta = 1 - alpha
+    prev = values[0]
+    out[0] = prev
+    for i in range(1, len(values)):
+        prev = alpha * values[i] + beta * prev
+        out[i] = prev
+
+
+def _ema_matrix_loop(columns, alpha, out):
+    beta = 1 - alpha
+    steps, rows = columns.shape
+    for j in range(rows):
+        out[0, j] = columns[0, j]
+    for t in range(1, steps):
+        for j in range(rows):
+            prev = out[t - 1, j]
+            if np.isnan(prev):
+                out[t, j] = columns[t, j]
+            else:
+                out[t, j] = alpha * columns[t, j] + beta * prev
+
+
+def _cross_events_loop(macd_line, signal_line, positions, golden, below_zero):
+    count = 0
+    for i in range(1, len(macd_line)):
+        prev_diff = macd_line[i - 1] - signal_line[i - 1]
+        curr_diff = macd_line[i] - signal_line[i]
+        is_golden = prev_diff < 0 and curr_diff > 0
+        if is_golden or (prev_diff > 0 and curr_diff < 0):
+            positions[count] = i
+            golden[count] = is_golden
+            below_zero[count] = macd_line[i] <= 0
+            count += 1
+    return count
+
+
+def _compiled_kernels(jit):
+    """用jit编译上面的循环内核，包装成与numpy后端相同的接口"""
+    ema_loop = jit(_ema_loop)
+    ema_matrix_loop = jit(_ema_matrix_loop)
+    cross_events_loop = jit(_cross_events_loop)
+
+    def compiled_ema(values, alpha):
+        out = np.empty_like(values)
+        if len(values):
+            ema_loop(values, alpha, out)
+        return out
+
+    def compiled_ema_matrix(columns, alpha):
+        out = np.empty_like(columns)
+        if columns.size:
+            ema_matrix_loop(columns, alpha, out)
+        return out
+
+    def compiled_cross_events(macd_line, signal_line):
+        size = max(len(macd_line) - 1, 0)
+        positions = np.empty(size, dtype=np.int64)
+        golden = np.empty(size, dtype=np.bool_)
+        below_zero = np.empty(size, dtype=np.bool_)
+        count = cross_events_loop(macd_line, signal_line, positions, golden, below_zero)
+        return positions[:count], golden[:count], below_zero[:count]
+
+    return {'ema': compiled_ema, 'ema_matrix': compiled_ema_matrix, 'cross_events': compiled_cross_events}
+
+
+_NUMPY_KERNELS = {'ema': _numpy_ema, 'ema_matrix': _numpy_ema_matrix, 'cross_events': _numpy_cross_events}
+# pandas后端只替换单序列EMA，矩阵EMA和交叉检测与numpy后端相同
+_PANDAS_KERNELS = dict(_NUMPY_KERNELS, ema=_pandas_ema)
+_backend_kernels = {'numpy': _NUMPY_KERNELS, 'pandas': _PANDAS_KERNELS}
+_kernels = _NUMPY_KERNELS
+_backend = 'numpy'
+
+
+def available_backends():
+    """当前环境可用的指标计算后端"""
+    return ['numpy'] + (['pandas'] if pd is not None else []) + (['numba'] if numba is not None else [])
+
+
+def get_backend():
+    """当前使用的指标计算后端名称"""
+    return _backend
+
+
+def set_backend(name='auto'):
+    """选择指标计算后端：'numba'（需安装numba）、'pandas'（长序列EMA用ewm）、'numpy'（纯numpy/Python），
+    'auto'按numba、pandas、numpy的顺序选第一个可用的
+
+    返回实际使用的后端名称。首次使用numba后端时按调用的参数类型编译（约1秒），之后直接调用编译结果。
+    """
+    global _kernels, _backend
+    if name == 'auto':
+        name = available_backends()[-1]
+    if name not in available_backends():
+        raise ValueError(f"指标计算后端不可用: {name}（可用: {', '.join(available_backends())}）")
+    if name not in _backend_kernels:
+        _backend_kernels[name] = _compiled_kernels(numba.njit(cache=True))
+    _kernels = _backend_kernels[name]
+    _backend = name
+    return name
+
+
+def ema(values, span):
+    """指数移动平均，与pandas的ewm(span=span, adjust=False).mean()结果一致"""
+    return _kernels['ema'](np.asarray(values, dtype=np.float64), 2 / (span + 1))
+
+
+def macd(close, fast_period=12, slow_period=26, signal_period=9):
+    """基于numpy数组计算MACD
+
+    Returns:
+        (macd_line, signal_line, histogram)，均为numpy数组
+    """
+    macd_line = ema(close, fast_period) - ema(close, slow_period)
+    signal_line = ema(macd_line, signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+class MacdState:
+    """增量MACD：保存快线EMA、慢线EMA和信号线EMA的状态
+
+    每根收盘K线调用一次update()，O(1)推进；未收盘K线用peek()得到临时值，不改变状态。
+    从同一根K线开始推进时，结果与calculate_macd（ewm adjust=False）在浮点误差内一致。
+    history为保留的最近已收盘MACD/信号线值个数，供交叉检测使用。
+    """
+
+    __slots__ = ('fast_alpha', 'slow_alpha', 'signal_alpha', 'ema_fast', 'ema_slow', 'ema_signal',
+                 'count', 'last_open_time', '_macd_history', '_signal_history', '_history')
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9, history=50):
+        self.fast_alpha = 2 / (fast_period + 1)
+        self.slow_alpha = 2 / (slow_period + 1)
+        self.signal_alpha = 2 / (signal_period + 1)
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_signal = None
+        self.count = 0
+        self.last_open_time = None
+        self._history = history
+        self._macd_history = []
+        self._signal_history = []
+
+    def _advance(self, close):
+        """计算加入close后的(快线, 慢线, MACD, 信号线)，不修改状态"""
+        if self.ema_fast is None:
+            # 与ewm(adjust=False)一致：第一个值即为初始EMA
+            return close, close, 0.0, 0.0
+        ema_fast = self.ema_fast + self.fast_alpha * (close - self.ema_fast)
+        ema_slow = self.ema_slow + self.slow_alpha * (close - self.ema_slow)
+        macd_value = ema_fast - ema_slow
+        signal_value = self.ema_signal + self.signal_alpha * (macd_value - self.ema_signal)
+        return ema_fast, ema_slow, macd_value, signal_value
+
+    def update(self, close, open_time=None):
+        """用一根已收盘K线推进状态，返回(MACD, 信号线)"""
+        close = float(close)
+        self.ema_fast, self.ema_slow, macd_value, self.ema_signal = self._advance(close)
+        self.count += 1
+        if open_time is not None:
+            self.last_open_time = open_time
+        self._macd_history.append(macd_value)
+        self._signal_history.append(self.ema_signal)
+        if len(self._macd_history) > 2 * self._history:
+            # 攒够一批再裁剪，均摊O(1)
+            del self._macd_history[:-self._history]
+            del self._signal_history[:-self._history]
+        return macd_value, self.ema_signal
+
+    def peek(self, close):
+        """未收盘K线的临时(MACD, 信号线)，不改变状态"""
+        _, _, macd_value, signal_value = self._advance(float(close))
+        return macd_value, signal_value
+
+    def seed(self, closes, open_times=None):
+        """用一段已收盘K线的收盘价依次推进状态"""
+        for i, close in enumerate(np.asarray(closes, dtype=np.float64).tolist()):
+            self.update(close, None if open_times is None else int(open_times[i]))
+
+    def lines(self, provisional_close=None):
+        """最近的MACD线和信号线（numpy数组），传入provisional_close时末尾追加未收盘K线的临时值"""
+        macd_values = self._macd_history[-self._history:]
+        signal_values = self._signal_history[-self._history:]
+        if provisional_close is not None:
+            macd_value, signal_value = self.peek(provisional_close)
+            macd_values = macd_values + [macd_value]
+            signal_values = signal_values + [signal_value]
+        return np.array(macd_values), np.array(signal_values)
+
+
+def ema_matrix(values, span):
+    """按行计算指数移动平均，每行一个序列（如一个币种的收盘价）
+
+    递推沿时间轴进行，每一步对所有行做一次向量运算。序列长度不同时在左侧用NaN补齐，
+    每行从第一个非NaN值开始，结果与对该行单独调用ema()一致。
+    """
+    # 转为(时间, 行)的连续数组，每一步读写的是连续内存
+    columns = np.ascontiguousarray(np.asarray(values, dtype=np.float64).T)
+    return _kernels['ema_matrix'](columns, 2 / (span + 1)).T
+
+
+def macd_matrix(close, fast_period=12, slow_period=26, signal_period=9):
+    """macd()的矩阵版本，close每行一个币种
+
+    Returns:
+        (macd_line, signal_line, histogram)，形状与close相同
+    """
+    macd_line = ema_matrix(close, fast_period) - ema_matrix(close, slow_period)
+    signal_line = ema_matrix(macd_line, signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+class MacdCrossIndex:
+    """MACD线与信号线交叉事件的索引，每个序列构建一次（检测差值变号）
+
+    位置i的金叉/死叉与detect_macd_cross的判断一致：i-1处MACD线在信号线下方/上方，i处严格反转。
+    每个事件按类型（金叉/死叉）和i处MACD值是否在0轴以下（<= 0）分类，查询前一个事件为O(log n)。
+    同一起点的更长序列构建的索引也可用于它的前缀（查询时before不超过前缀长度即可）。
+    """
+
+    __slots__ = ('positions', 'golden', 'below_zero', '_events')
+
+    def __init__(self, macd_line, signal_line):
+        # 交叉发生的位置（按升序），以及每个事件的分类
+        self.positions, self.golden, self.below_zero = _kernels['cross_events'](
+            np.ascontiguousarray(macd_line, dtype=np.float64), np.ascontiguousarray(signal_line, dtype=np.float64))
+        self._events = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def events(self, kind=None, below_zero=None):
+        """某一类交叉事件的位置数组（升序）
+
+        Args:
+            kind: 'golden'、'death'，None表示不区分
+            below_zero: True/False只取0轴以下/以上的事件，None表示不区分
+        """
+        key = (kind, below_zero)
+        positions = self._events.get(key)
+        if positions is None:
+            mask = np.ones(len(self.positions), dtype=bool)
+            if kind == 'golden':
+                mask &= self.golden
+            elif kind == 'death':
+                mask &= ~self.golden
+            elif kind is not None:
+                raise ValueError(f"不支持的交叉类型: {kind}")
+            if below_zero is not None:
+                mask &= self.below_zero if below_zero else ~self.below_zero
+            positions = self.positions[mask]
+            self._events[key] = positions
+        return positions
+
+    def previous(self, before, kind=None, below_zero=None):
+        """位置小于before的最后一个交叉事件的位置，没有返回None"""
+        positions = self.events(kind, below_zero)
+        i = int(np.searchsorted(positions, before)) - 1
+        return int(positions[i]) if i >= 0 else None
+
+
+# 环境变量INDICATOR_BACKEND可指定后端（numba/pandas/numpy），默认按auto选择
+try:
+    set_backend(os.environ.get('INDICATOR_BACKEND', 'auto'))
+except ValueError as e:
+    print(f"{e}，改用{set_backend('auto')}后端")
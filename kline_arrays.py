@@ -0,0 +1,65 @@
+import numpy as np
+
+# Binance K线行中各字段的位置
+KLINE_FIELD_INDEX = {
+    'open_time': 0, 'open': 1, 'high': 2, 'low': 3, 'close': 4, 'volume': 5,
+    'close_time': 6, 'quote_volume': 7, 'trades': 8, 'taker_base_vol': 9, 'taker_quote_vol': 10
+}
+# 毫秒时间戳和成交笔数按int64解码，其余按float64解码
+INT_FIELDS = ('open_time', 'close_time', 'trades')
+# 分析路径用到的字段（MACD只用收盘价，开高低和成交量用于合成4小时K线和低点判断）
+ANALYSIS_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+
+class KlineArrays:
+    """按列存放的K线数据，每列是一个连续的numpy数组
+
+    分析路径上替代DataFrame：支持len()、data['close']和tail(n)，
+    可以直接传给calculate_macd、resample_kline_arrays等函数。
+    open_time为毫秒时间戳（int64），需要画图时用to_dataframe()转换。
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['open_time'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def tail(self, n):
+        """最后n根K线（数组切片，不复制数据）"""
+        if n <= 0:
+            return KlineArrays({name: values[:0] for name, values in self.columns.items()})
+        return KlineArrays({name: values[-n:] for name, values in self.columns.items()})
+
+    def head(self, n):
+        """最前n根K线（数组切片，不复制数据）"""
+        return KlineArrays({name: values[:max(n, 0)] for name, values in self.columns.items()})
+
+    def to_dataframe(self):
+        """转换为与get_futures_klines相同格式的DataFrame（只包含已解码的列）"""
+        import pandas as pd
+
+        df = pd.DataFrame(self.columns)
+        for name in ('open_time', 'close_time'):
+            if name in df:
+                df[name] = pd.to_datetime(df[name], unit='ms')
+        return df
+
+
+def decode_klines(rows, columns=ANALYSIS_COLUMNS):
+    """把klines接口返回的列表的列表直接解码为KlineArrays
+
+    只解码需要的列，数值字符串由numpy一次性转换，不经过DataFrame和逐列astype。
+    """
+    decoded = {}
+    for name in columns:
+        index = KLINE_FIELD_INDEX[name]
+        dtype = np.int64 if name in INT_FIELDS else np.float64
+        decoded[name] = np.array([row[index] for row in rows], dtype=dtype)
+    return KlineArrays(decoded)
@@ -0,0 +1,133 @@
+import numpy as np
+
+from kline_arrays import ANALYSIS_COLUMNS, INT_FIELDS, KLINE_FIELD_INDEX, KlineArrays, decode_klines
+
+
+class KlineBuffer:
+    """单个(币种, 周期)的定长K线环形缓冲区
+
+    每列是长度为2倍容量的numpy数组，每个值同时写在i和i+capacity两个位置（镜像），
+    因此任意时刻最近size根K线在数组中都是连续的一段，view()不需要复制即可得到，
+    追加一根K线是O(1)，内存占用固定为 2 * capacity * 列数 * 8 字节。
+    """
+
+    __slots__ = ('capacity', 'columns', '_arrays', '_start', '_size')
+
+    def __init__(self, capacity, columns=ANALYSIS_COLUMNS):
+        if capacity <= 0:
+            raise ValueError("capacity必须大于0")
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._arrays = {
+            name: np.zeros(2 * capacity, dtype=np.int64 if name in INT_FIELDS else np.float64)
+            for name in self.columns
+        }
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """缓冲区占用的内存（字节）"""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def last_open_time(self):
+        """最后一根K线的开盘时间（毫秒），为空返回None"""
+        if self._size == 0:
+            return None
+        return int(self._arrays['open_time'][self._start + self._size - 1])
+
+    def first_open_time(self):
+        """最早一根K线的开盘时间（毫秒），为空返回None"""
+        if self._size == 0:
+            return None
+        return int(self._arrays['open_time'][self._start])
+
+    def _write(self, position, row):
+        for name in self.columns:
+            array = self._arrays[name]
+            value = row[KLINE_FIELD_INDEX[name]]
+            array[position] = value
+            array[position + self.capacity] = value
+
+    def append(self, row):
+        """追加一根新K线（Binance原始格式的一行），缓冲区满时覆盖最早的一根"""
+        if self._size < self.capacity:
+            self._write((self._start + self._size) % self.capacity, row)
+            self._size += 1
+        else:
+            self._write(self._start, row)
+            self._start = (self._start + 1) % self.capacity
+
+    def update_last(self, row):
+        """原地更新最后一根（未收盘）K线"""
+        if self._size == 0:
+            raise IndexError("缓冲区为空")
+        self._write((self._start + self._size - 1) % self.capacity, row)
+
+    def push(self, row):
+        """按开盘时间合并一根K线：与最后一根相同则原地更新，更新则追加，更旧的忽略
+
+        Returns:
+            bool: 是否写入了缓冲区
+        """
+        last = self.last_open_time()
+        open_time = int(row[0])
+        if last is not None and open_time == last:
+            self.update_last(row)
+        elif last is None or open_time > last:
+            self.append(row)
+        else:
+            return False
+        return True
+
+    def extend(self, rows):
+        """批量合并K线（按开盘时间升序），比逐行push快，用于预热和尾部增量"""
+        if not rows:
+            return
+        last = self.last_open_time()
+        if last is not None:
+            # 跳过已有的旧K线，与最后一根相同的K线原地更新
+            skip = 0
+            while skip < len(rows) and int(rows[skip][0]) < last:
+                skip += 1
+            if skip < len(rows) and int(rows[skip][0]) == last:
+                self.update_last(rows[skip])
+                skip += 1
+            rows = rows[skip:]
+            if not rows:
+                return
+
+        rows = rows[-self.capacity:]
+        count = len(rows)
+        decoded = decode_klines(rows, self.columns)
+        positions = (self._start + self._size + np.arange(count)) % self.capacity
+        for name in self.columns:
+            array = self._arrays[name]
+            array[positions] = decoded[name]
+            array[positions + self.capacity] = decoded[name]
+        self._size += count
+        if self._size > self.capacity:
+            self._start = (self._start + self._size - self.capacity) % self.capacity
+            self._size = self.capacity
+
+    def view(self):
+        """最近的K线（KlineArrays），各列为缓冲区的只读视图，不复制数据
+
+        视图会随之后的写入变化，跨线程使用时请用snapshot()。
+        """
+        columns = {}
+        for name in self.columns:
+            column = self._arrays[name][self._start:self._start + self._size]
+            column.flags.writeable = False
+            columns[name] = column
+        return KlineArrays(columns)
+
+    def snapshot(self):
+        """最近K线的独立副本（KlineArrays）"""
+        return KlineArrays({
+            name: self._arrays[name][self._start:self._start + self._size].copy()
+            for name in self.columns
+        })
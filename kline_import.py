@@ -0,0 +1,171 @@
+import csv
+import hashlib
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from kline_store import INTERVAL_MS, KlineStore
+
+# Binance公开数据（data.binance.vision）的K线文件名：
+#   月度 BTCUSDT-15m-2024-01.zip，日度 BTCUSDT-15m-2024-01-05.zip（压缩包内是同名csv）
+ARCHIVE_NAME = re.compile(r'^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[mhd])-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$')
+
+# 每次写入数据库的行数：按块流式解码，内存中最多保留这么多行
+IMPORT_CHUNK_ROWS = 5000
+
+# 毫秒时间戳不会超过这个值，更大的是微秒时间戳（2025年起的现货数据）
+MAX_MS_TIMESTAMP = 10 ** 14
+
+
+def find_archives(directory, symbols=None, intervals=None):
+    """查找目录（含子目录）中的K线压缩包/CSV
+
+    Returns:
+        list: [(路径, 币种, 周期), ...]，按币种、周期排序，同一币种周期下月度文件在日度文件之前
+    """
+    symbols = set(symbols) if symbols else None
+    intervals = set(intervals) if intervals else None
+    found = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            match = ARCHIVE_NAME.match(name)
+            if match is None:
+                continue
+            symbol, interval = match.group('symbol'), match.group('interval')
+            if interval not in INTERVAL_MS:
+                continue
+            if (symbols and symbol not in symbols) or (intervals and interval not in intervals):
+                continue
+            # 月度文件的日期短，排在同月日度文件之前
+            found.append((symbol, interval, len(match.group('date')), match.group('date'), os.path.join(root, name)))
+    found.sort()
+    return [(path, symbol, interval) for symbol, interval, _, _, path in found]
+
+
+def verify_checksum(path, chunk_size=1 << 20):
+    """有同名.CHECKSUM文件时校验SHA256，没有校验文件返回None"""
+    checksum_path = path + '.CHECKSUM'
+    if not os.path.exists(checksum_path):
+        return None
+    with open(checksum_path, 'r', encoding='utf-8') as f:
+        expected = f.read().split()[0].lower()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest() == expected
+
+
+def _normalize_row(row):
+    """CSV的一行转为KlineStore.upsert接受的格式，微秒时间戳转为毫秒"""
+    open_time, close_time = int(row[0]), int(row[6])
+    if open_time >= MAX_MS_TIMESTAMP:
+        open_time //= 1000
+        close_time //= 1000
+    return (open_time, row[1], row[2], row[3], row[4], row[5], close_time, row[7], row[8], row[9], row[10])
+
+
+def iter_archive_chunks(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    """逐块读取压缩包（或CSV）中的K线，每块最多chunk_rows行
+
+    边解压边解析，不把整个文件读入内存；有表头的新格式和无表头的旧格式都支持。
+    """
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if not member.endswith('.csv'):
+                    continue
+                with archive.open(member) as raw:
+                    yield from _iter_csv_chunks(io.TextIOWrapper(raw, encoding='utf-8', newline=''), chunk_rows)
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from _iter_csv_chunks(f, chunk_rows)
+
+
+def _iter_csv_chunks(stream, chunk_rows):
+    chunk = []
+    for row in csv.reader(stream):
+        # 跳过表头和空行
+        if len(row) < 11 or not row[0].isdigit():
+            continue
+        chunk.append(_normalize_row(row))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_archive(db_path, path, symbol, interval, chunk_rows=IMPORT_CHUNK_ROWS, force=False):
+    """导入一个压缩包到本地K线存储（在工作进程中执行，每个进程使用自己的数据库连接）
+
+    相同开盘时间的K线直接覆盖（去重），并统计其中有多少根原来已经存在。
+
+    Returns:
+        dict: file、symbol、interval、rows（文件中的K线数）、new（新增）、duplicates（已存在）、
+              skipped（之前已导入过）、checksum（True/False/None）、error
+    """
+    name = os.path.basename(path)
+    result = {'file': name, 'symbol': symbol, 'interval': interval, 'rows': 0, 'new': 0,
+              'duplicates': 0, 'skipped': False, 'checksum': None, 'error': None}
+    store = KlineStore(db_path)
+    try:
+        size = os.path.getsize(path)
+        if not force and store.archive_imported(name, size):
+            result['skipped'] = True
+            return result
+        result['checksum'] = verify_checksum(path)
+        if result['checksum'] is False:
+            result['error'] = "SHA256校验失败"
+            return result
+        for chunk in iter_archive_chunks(path, chunk_rows):
+            added = store.import_rows(symbol, interval, chunk)
+            result['rows'] += len(chunk)
+            result['new'] += added
+            result['duplicates'] += len(chunk) - added
+        store.record_archive_import(name, size, result['rows'])
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        store.close()
+    return result
+
+
+def import_directory(directory, db_path='klines.db', symbols=None, intervals=None, workers=None,
+                     force=False, progress=None):
+    """用进程池导入目录中所有K线压缩包，完成后检查缺口
+
+    Args:
+        directory: 存放压缩包的目录（可以是data.binance.vision的原始目录结构）
+        db_path: 本地K线存储文件
+        symbols / intervals: 只导入这些币种/周期，默认全部
+        workers: 进程数，默认为CPU核数
+        force: 重新导入已导入过的文件
+        progress: 可选，每完成一个文件调用progress(已完成数, 总数, 结果)
+
+    Returns:
+        dict: files（各文件的导入结果）、gaps（{(symbol, interval): KlineStore.gaps()的结果}）
+    """
+    archives = find_archives(directory, symbols, intervals)
+    # 先在主进程建表，避免多个工作进程同时建表
+    KlineStore(db_path).close()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(import_archive, db_path, path, symbol, interval, IMPORT_CHUNK_ROWS, force)
+                   for path, symbol, interval in archives]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress is not None:
+                progress(len(results), len(archives), results[-1])
+
+    store = KlineStore(db_path)
+    try:
+        gaps = {}
+        for symbol, interval in sorted({(symbol, interval) for _, symbol, interval in archives}):
+            gaps[(symbol, interval)] = store.gaps(symbol, interval)
+    finally:
+        store.close()
+    return {'files': results, 'gaps': gaps}
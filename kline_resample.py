@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from kline_arrays import KlineArrays
+from kline_store import INTERVAL_MS
+
+# 可以累加的成交量类字段
+SUM_COLUMNS = ['volume', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol']
+
+
+def _resample_groups(open_ms, source_interval, target_interval):
+    """按大周期开盘时间分组
+
+    Returns:
+        (first, starts, ends, group_open_ms)：first为第一组在原数据中的位置，
+        starts/ends为各组首尾相对first的位置；没有完整分组时返回None
+    """
+    source_ms = INTERVAL_MS[source_interval]
+    target_ms = INTERVAL_MS[target_interval]
+    if target_ms % source_ms != 0:
+        raise ValueError(f"{target_interval}不是{source_interval}的整数倍，无法合成")
+    bars_per_group = target_ms // source_ms
+    if len(open_ms) == 0:
+        return None
+
+    group_ids = open_ms // target_ms
+    # 每组第一根K线的位置
+    starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(open_ms)])
+
+    # 第一组如果不是从大周期开盘时间开始，说明数据不完整，丢弃
+    first_partial = open_ms[0] != group_ids[0] * target_ms
+    if first_partial or (counts[0] < bars_per_group and len(starts) > 1):
+        starts = starts[1:]
+        counts = counts[1:]
+    if len(starts) == 0:
+        return None
+    first = starts[0]
+    starts = starts - first
+    ends = starts + counts - 1
+    return first, starts, ends, group_ids[first:][starts] * target_ms
+
+
+def resample_klines(df, source_interval, target_interval):
+    """把小周期K线合成为大周期K线（例如16根15m合成1根4h）
+
+    按大周期的开盘时间对齐分组（与交易所一致，以UTC整点为界）：
+    开盘价取第一根，最高/最低取极值，收盘价取最后一根，成交量类字段求和。
+    开头不完整的一组会被丢弃；最后一组可以不完整，对应交易所尚未收盘的K线。
+
+    Args:
+        df: get_futures_klines返回的小周期DataFrame（按开盘时间升序）
+        source_interval: 小周期，如'15m'
+        target_interval: 大周期，如'4h'
+
+    Returns:
+        DataFrame: 与get_futures_klines相同列的大周期K线
+    """
+    open_ms = df['open_time'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    groups = _resample_groups(open_ms, source_interval, target_interval)
+    if groups is None:
+        return df.iloc[0:0].copy()
+    first, starts, ends, group_open_ms = groups
+    target_ms = INTERVAL_MS[target_interval]
+
+    open_prices = df['open'].to_numpy()[first:]
+    high_prices = df['high'].to_numpy()[first:]
+    low_prices = df['low'].to_numpy()[first:]
+    close_prices = df['close'].to_numpy()[first:]
+
+    def group_sum(column):
+        return np.add.reduceat(df[column].to_numpy()[first:], starts)
+
+    # 列顺序与get_futures_klines保持一致
+    result = pd.DataFrame({
+        'open_time': pd.to_datetime(group_open_ms, unit='ms'),
+        'open': open_prices[starts],
+        'high': np.maximum.reduceat(high_prices, starts),
+        'low': np.minimum.reduceat(low_prices, starts),
+        'close': close_prices[ends],
+        'volume': group_sum('volume'),
+        'close_time': pd.to_datetime(group_open_ms + target_ms - 1, unit='ms'),
+        'quote_volume': group_sum('quote_volume'),
+        'trades': group_sum('trades'),
+        'taker_base_vol': group_sum('taker_base_vol'),
+        'taker_quote_vol': group_sum('taker_quote_vol'),
+    })
+    result['ignore'] = '0'
+    return result
+
+
+def resample_kline_arrays(klines, source_interval, target_interval):
+    """resample_klines的KlineArrays版本，只合成输入中已有的列"""
+    groups = _resample_groups(klines['open_time'], source_interval, target_interval)
+    if groups is None:
+        return klines.tail(0)
+    first, starts, ends, group_open_ms = groups
+    target_ms = INTERVAL_MS[target_interval]
+
+    result = {}
+    for name, values in klines.columns.items():
+        values = values[first:]
+        if name == 'open_time':
+            result[name] = group_open_ms
+        elif name == 'close_time':
+            result[name] = group_open_ms + target_ms - 1
+        elif name == 'open':
+            result[name] = values[starts]
+        elif name == 'high':
+            result[name] = np.maximum.reduceat(values, starts)
+        elif name == 'low':
+            result[name] = np.minimum.reduceat(values, starts)
+        elif name == 'close':
+            result[name] = values[ends]
+        else:
+            result[name] = np.add.reduceat(values, starts)
+    return KlineArrays(result)
+
+
+def compare_klines(derived, exchange, columns=None, rtol=1e-6):
+    """按开盘时间对齐比较两组K线，返回不一致的记录列表
+
+    Returns:
+        (compared, mismatches): 参与比较的K线数量，以及[(开盘时间, 字段, 合成值, 交易所值), ...]
+    """
+    if columns is None:
+        columns = ['open', 'high', 'low', 'close'] + SUM_COLUMNS
+    merged = derived.merge(exchange, on='open_time', suffixes=('_derived', '_exchange'))
+    mismatches = []
+    for column in columns:
+        derived_values = merged[f'{column}_derived'].to_numpy()
+        exchange_values = merged[f'{column}_exchange'].to_numpy()
+        bad = ~np.isclose(derived_values, exchange_values, rtol=rtol, atol=0)
+        for i in np.flatnonzero(bad):
+            mismatches.append((merged['open_time'].iloc[i], column, derived_values[i], exchange_values[i]))
+    return len(merged), mismatches
@@ -0,0 +1,269 @@
+import sqlite3
+import threading
+import time
+
+# 各周期对应的毫秒数
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '6h': 21_600_000,
+    '8h': 28_800_000,
+    '12h': 43_200_000,
+    '1d': 86_400_000
+}
+
+# 存储的K线字段（与Binance接口返回的前11列一致）
+KLINE_COLUMNS = (
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_base_vol', 'taker_quote_vol'
+)
+
+
+class KlineStore:
+    """本地K线存储（SQLite），按(币种, 周期, 开盘时间)去重
+
+    每次只向交易所请求最后一根已存K线之后的数据（包括最后一根，因为它可能尚未收盘），
+    合并后从本地读出所需数量的K线。历史数据会一直保留，可直接用于回测。
+    """
+
+    def __init__(self, db_path='klines.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                close_time INTEGER,
+                quote_volume REAL, trades INTEGER,
+                taker_base_vol REAL, taker_quote_vol REAL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+        """)
+        # 已导入的历史数据压缩包（按文件名和大小判断），重复导入时跳过
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_imports (
+                name TEXT PRIMARY KEY,
+                size INTEGER,
+                rows INTEGER,
+                imported_at INTEGER
+            )
+        """)
+        self._conn.commit()
+        # 统计：实际从交易所拉取的K线根数 vs 返回给调用方的K线根数
+        self.rows_fetched = 0
+        self.rows_served = 0
+        self.tail_refreshes = 0
+        self.full_refreshes = 0
+
+    def last_open_time(self, symbol, interval):
+        """最后一根已存K线的开盘时间（毫秒），没有数据返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(open_time) FROM klines WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+        return row[0]
+
+    def symbols(self, interval):
+        """存有该周期K线的所有币种"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT symbol FROM klines WHERE interval = ? ORDER BY symbol", (interval,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count_since(self, symbol, interval, start_ms):
+        """开盘时间不早于start_ms的已存K线数量"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM klines WHERE symbol = ? AND interval = ? AND open_time >= ?",
+                (symbol, interval, start_ms)
+            ).fetchone()
+        return row[0]
+
+    def gaps(self, symbol, interval):
+        """已存K线中的缺口
+
+        Returns:
+            list: [(缺口前最后一根的开盘时间, 缺口后第一根的开盘时间, 缺少的根数), ...]
+        """
+        interval_ms = INTERVAL_MS[interval]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT previous, open_time FROM ("
+                "  SELECT open_time, LAG(open_time) OVER (ORDER BY open_time) AS previous"
+                "  FROM klines WHERE symbol = ? AND interval = ?"
+                ") WHERE open_time - previous > ?",
+                (symbol, interval, interval_ms)
+            ).fetchall()
+        return [(previous, current, (current - previous) // interval_ms - 1) for previous, current in rows]
+
+    def archive_imported(self, name, size):
+        """该压缩包（同名且大小相同）是否已经导入过"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM archive_imports WHERE name = ? AND size = ?", (name, size)
+            ).fetchone()
+        return row is not None
+
+    def record_archive_import(self, name, size, rows):
+        """记录一个已导入的压缩包"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archive_imports VALUES (?, ?, ?, ?)",
+                (name, size, rows, int(time.time() * 1000))
+            )
+            self._conn.commit()
+
+    def refresh_params(self, symbol, interval, limit, now_ms=None):
+        """计算本次需要向klines接口请求的参数
+
+        本地已有最近limit根连续K线时只请求尾部，否则退回全量请求。
+        """
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            return params
+
+        last_open = self.last_open_time(symbol, interval)
+        if last_open is None:
+            return params
+
+        # 最近limit个K线位置必须全部已存，否则尾部合并后会出现缺口
+        if self.count_since(symbol, interval, last_open - (limit - 1) * interval_ms) < limit:
+            return params
+
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        # 需要重新获取的K线数：最后一根已存K线（可能未收盘）+ 之后新出现的K线
+        missing = max(now_ms - last_open, 0) // interval_ms + 1
+        if missing >= limit:
+            return params
+
+        params['startTime'] = last_open
+        params['limit'] = missing + 1  # 多请求一根，防止本地时钟略慢
+        return params
+
+    def upsert(self, symbol, interval, rows):
+        """写入Binance格式的K线数据，相同开盘时间的K线会被覆盖（用于更新未收盘K线）"""
+        records = [
+            (symbol, interval, int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]),
+             float(r[5]), int(r[6]), float(r[7]), int(r[8]), float(r[9]), float(r[10]))
+            for r in rows
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            self._conn.commit()
+            self.rows_fetched += len(records)
+
+    def import_rows(self, symbol, interval, rows):
+        """写入一批历史K线（与upsert相同，相同开盘时间覆盖），返回其中新增的根数
+
+        统计和写入在同一个写事务中完成，多个进程同时导入同一币种时计数也准确。
+        """
+        records = [
+            (symbol, interval, int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]),
+             float(r[5]), int(r[6]), float(r[7]), int(r[8]), float(r[9]), float(r[10]))
+            for r in rows
+        ]
+        if not records:
+            return 0
+        first = min(record[2] for record in records)
+        last = max(record[2] for record in records)
+        count_query = "SELECT COUNT(*) FROM klines WHERE symbol = ? AND interval = ? AND open_time BETWEEN ? AND ?"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.execute(count_query, (symbol, interval, first, last)).fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO klines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    records
+                )
+                after = self._conn.execute(count_query, (symbol, interval, first, last)).fetchone()[0]
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return after - before
+
+    def load(self, symbol, interval, limit):
+        """读取最近limit根K线，按开盘时间升序，格式与Binance接口一致"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(KLINE_COLUMNS)}, '0' FROM klines "
+                "WHERE symbol = ? AND interval = ? ORDER BY open_time DESC LIMIT ?",
+                (symbol, interval, limit)
+            ).fetchall()
+            self.rows_served += len(rows)
+        rows.reverse()
+        return rows
+
+    def load_range(self, symbol, interval, start_ms=None, end_ms=None):
+        """读取指定开盘时间范围内的全部历史K线（升序），用于回测等离线分析"""
+        query = f"SELECT {', '.join(KLINE_COLUMNS)}, '0' FROM klines WHERE symbol = ? AND interval = ?"
+        args = [symbol, interval]
+        if start_ms is not None:
+            query += " AND open_time >= ?"
+            args.append(start_ms)
+        if end_ms is not None:
+            query += " AND open_time <= ?"
+            args.append(end_ms)
+        query += " ORDER BY open_time"
+        with self._lock:
+            return self._conn.execute(query, args).fetchall()
+
+    def record_served(self, count):
+        """记录由内存缓冲区直接提供（未经load读取）的K线数量"""
+        with self._lock:
+            self.rows_served += count
+
+    def record_refresh(self, params):
+        """记录一次刷新是尾部增量还是全量"""
+        with self._lock:
+            if 'startTime' in params:
+                self.tail_refreshes += 1
+            else:
+                self.full_refreshes += 1
+
+    def stats(self):
+        """返回本地存储节省的请求量统计"""
+        with self._lock:
+            fetched = self.rows_fetched
+            served = self.rows_served
+            tail = self.tail_refreshes
+            full = self.full_refreshes
+        saved = (1 - fetched / served) * 100 if served else 0.0
+        return {
+            'rows_fetched': fetched,
+            'rows_served': served,
+            'tail_refreshes': tail,
+            'full_refreshes': full,
+            'saved_pct': saved
+        }
+
+    def reset_stats(self):
+        """清空统计计数（每轮筛选开始时调用）"""
+        with self._lock:
+            self.rows_fetched = 0
+            self.rows_served = 0
+            self.tail_refreshes = 0
+            self.full_refreshes = 0
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+try:
+    import websockets
+except ImportError:  # 可选依赖，未安装时无法使用推送模式
+    websockets = None
+
+FUTURES_STREAM_URL = 'wss://fstream.binance.com/stream'
+# Binance单个连接最多订阅200个流
+MAX_STREAMS_PER_CONNECTION = 200
+
+
+def kline_event_to_row(kline):
+    """把推送的K线事件（data['k']）转换为与REST接口一致的K线行"""
+    return [
+        kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'],
+        kline['T'], kline['q'], kline['n'], kline['V'], kline['Q'], '0'
+    ]
+
+
+class BinanceStreamClient:
+    """合约组合流订阅客户端（K线 + 标记价格）
+
+    订阅<symbol>@kline_<interval>和<symbol>@markPrice@1s，收到消息后回调：
+    - on_kline(symbol, interval, row, is_closed)：row为REST格式的K线行
+    - on_mark_price(symbol, price, event_time_ms)
+    流数量超过单连接上限时自动拆分成多个连接，断线后自动重连。
+    """
+
+    def __init__(self, symbols, intervals=('15m',), on_kline=None, on_mark_price=None,
+                 base_url=FUTURES_STREAM_URL, reconnect_delay=5):
+        if websockets is None:
+            raise RuntimeError("推送模式需要安装websockets: pip install websockets")
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.on_kline = on_kline
+        self.on_mark_price = on_mark_price
+        self.base_url = base_url
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = None
+        self._loop = None
+        self.message_count = 0
+
+    def stream_names(self):
+        """需要订阅的所有流名称"""
+        names = []
+        for symbol in self.symbols:
+            lower = symbol.lower()
+            for interval in self.intervals:
+                names.append(f"{lower}@kline_{interval}")
+            if self.on_mark_price is not None:
+                names.append(f"{lower}@markPrice@1s")
+        return names
+
+    def connection_urls(self):
+        """按单连接流数量上限拆分后的组合流地址"""
+        names = self.stream_names()
+        return [
+            f"{self.base_url}?streams={'/'.join(names[i:i + MAX_STREAMS_PER_CONNECTION])}"
+            for i in range(0, len(names), MAX_STREAMS_PER_CONNECTION)
+        ]
+
+    async def run(self):
+        """运行直到stop()被调用"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        tasks = [asyncio.create_task(self._run_connection(url)) for url in self.connection_urls()]
+        await self._stop_event.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        """停止订阅（可从其他线程调用）"""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _run_connection(self, url):
+        while not self._stop_event.is_set():
+            try:
+                async with websockets.connect(url, ping_interval=20, max_size=None) as ws:
+                    print(f"已连接推送流: {url[:80]}...")
+                    async for message in ws:
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"推送流连接断开: {e}，{self.reconnect_delay}秒后重连")
+            if not self._stop_event.is_set():
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _dispatch(self, message):
+        self.message_count += 1
+        try:
+            payload = json.loads(message)
+            data = payload.get('data', payload)
+            event_type = data.get('e')
+            if event_type == 'kline' and self.on_kline is not None:
+                kline = data['k']
+                self.on_kline(data['s'], kline['i'], kline_event_to_row(kline), kline['x'])
+            elif event_type == 'markPriceUpdate' and self.on_mark_price is not None:
+                self.on_mark_price(data['s'], float(data['p']), data['E'])
+        except Exception as e:
+            print(f"处理推送消息出错: {e}")
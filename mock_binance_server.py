@@ -0,0 +1,419 @@
+import asyncio
+import functools
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from kline_store import INTERVAL_MS
+from rate_limiter import USED_WEIGHT_HEADER, request_weight
+
+try:
+    import websockets
+except ImportError:  # 只有推送流模拟服务需要
+    websockets = None
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认backlog只有5，高并发建连时会丢SYN导致1秒重传
+    request_queue_size = 256
+
+
+class MockBinanceServer:
+    """本地模拟的Binance合约REST服务，用于离线测试和性能对比
+
+    支持的接口：
+    - /fapi/v1/klines        合成K线（由币种、周期和开盘时间决定，结果可复现；
+                             15m以上的周期由15m合成，与交易所一致）
+    - /fapi/v1/ticker/24hr   所有币种的24小时行情
+    - /fapi/v1/ticker/price  最新价格（支持单个或全部币种）
+    - /api/v3/ticker/price   现货最新价格（与合约相同）
+    - /fapi/v1/time          服务器时间
+
+    latency参数为每个请求的模拟网络延迟（秒）。设置capacity后模拟服务端拥塞：
+    同时处理的请求超过capacity个时，延迟按超出的倍数增加（总吞吐量不再提高）。
+    每个响应带X-MBX-USED-WEIGHT-1m头（按自然分钟累计）；设置weight_limit后，
+    超过额度的请求返回429和Retry-After，用于验证限速。
+    clock为返回当前时间（秒）的函数，决定K线的最新开盘时间和服务器时间；传入固定时间时多次运行得到完全相同的K线
+    （权重仍按实际的自然分钟累计）。
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, symbol_count=100, latency=0.0, weight_limit=None, capacity=None,
+                 clock=None):
+        self.symbols = [f"MOCK{i:03d}USDT" for i in range(symbol_count)]
+        self.clock = clock or time.time
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.weight_limit = weight_limit
+        self.request_count = 0
+        self.throttled_count = 0
+        self._used_weight = 0
+        self._weight_minute = None
+        self._count_lock = threading.Lock()
+        self._server = _MockHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def point_analyzer(self, analyzer):
+        """把CryptoAnalyzer的所有Binance地址指向本地模拟服务"""
+        analyzer.binance_futures_url = f"{self.base_url}/fapi/v1/klines"
+        analyzer.binance_ticker_url = f"{self.base_url}/fapi/v1/ticker/24hr"
+        analyzer.price_snapshot.futures_url = f"{self.base_url}/fapi/v1/ticker/price"
+        analyzer.price_snapshot.spot_url = f"{self.base_url}/api/v3/ticker/price"
+        analyzer.server_clock.url = f"{self.base_url}/fapi/v1/time"
+        return analyzer
+
+    def _count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def _charge_weight(self, weight):
+        """累计当前自然分钟的已用权重，返回(是否放行, 已用权重)"""
+        with self._count_lock:
+            minute = int(time.time() // 60)
+            if minute != self._weight_minute:
+                self._weight_minute = minute
+                self._used_weight = 0
+            if self.weight_limit is not None and self._used_weight + weight > self.weight_limit:
+                self.throttled_count += 1
+                return False, self._used_weight
+            self._used_weight += weight
+            return True, self._used_weight
+
+    def base_price(self, symbol):
+        """每个币种的固定基准价格"""
+        return 1 + zlib.crc32(symbol.encode()) % 50000 / 10
+
+    def klines(self, symbol, interval, limit=500, start_time=None, end_time=None):
+        """生成与Binance格式一致的K线数据（列表的列表，数值为字符串）"""
+        interval_ms = INTERVAL_MS[interval]
+        now_ms = int(self.clock() * 1000)
+        last_open = now_ms - now_ms % interval_ms
+        if start_time is not None:
+            first_open = start_time - start_time % interval_ms
+            if first_open < start_time:
+                first_open += interval_ms
+            open_times = range(first_open, min(last_open, end_time or last_open) + 1, interval_ms)
+            open_times = list(open_times)[:limit]
+        else:
+            end_open = last_open if end_time is None else min(last_open, end_time - end_time % interval_ms)
+            open_times = [end_open - i * interval_ms for i in range(limit - 1, -1, -1)]
+
+        if interval_ms > INTERVAL_MS['15m'] and interval_ms % INTERVAL_MS['15m'] == 0:
+            # 大周期由15m合成，与交易所的K线保持一致
+            return [self._aggregate_row(symbol, interval, open_time, now_ms) for open_time in open_times]
+        return [self._kline_row(symbol, interval, open_time) for open_time in open_times]
+
+    def _aggregate_row(self, symbol, interval, open_time, now_ms):
+        """用15m K线合成大周期K线，未收盘的K线只包含已开始的15m K线"""
+        step = INTERVAL_MS['15m']
+        sub_rows = [
+            self._kline_row(symbol, '15m', t)
+            for t in range(open_time, min(open_time + INTERVAL_MS[interval], now_ms + 1), step)
+        ]
+        volume = sum(float(r[5]) for r in sub_rows)
+        quote_volume = sum(float(r[7]) for r in sub_rows)
+        taker_base = sum(float(r[9]) for r in sub_rows)
+        taker_quote = sum(float(r[10]) for r in sub_rows)
+        return [
+            open_time,
+            sub_rows[0][1],
+            f"{max(float(r[2]) for r in sub_rows):.8f}",
+            f"{min(float(r[3]) for r in sub_rows):.8f}",
+            sub_rows[-1][4],
+            f"{volume:.4f}",
+            open_time + INTERVAL_MS[interval] - 1,
+            f"{quote_volume:.4f}",
+            sum(r[8] for r in sub_rows),
+            f"{taker_base:.4f}",
+            f"{taker_quote:.4f}",
+            "0"
+        ]
+
+    @functools.lru_cache(maxsize=200_000)
+    def _kline_row(self, symbol, interval, open_time):
+        """单根K线，只由(币种, 周期, 开盘时间)决定，保证增量请求与全量请求结果一致"""
+        interval_ms = INTERVAL_MS[interval]
+        base = self.base_price(symbol)
+        rng = random.Random(f"{symbol}:{interval}:{open_time}")
+        drift = rng.uniform(-0.02, 0.02)
+        open_price = base * (1 + 0.1 * ((open_time // interval_ms) % 97 - 48) / 48)
+        close_price = open_price * (1 + drift)
+        high_price = max(open_price, close_price) * (1 + rng.uniform(0, 0.01))
+        low_price = min(open_price, close_price) * (1 - rng.uniform(0, 0.01))
+        volume = rng.uniform(100, 10000)
+        taker_base = volume * rng.uniform(0.3, 0.7)
+        return [
+            open_time,
+            f"{open_price:.8f}",
+            f"{high_price:.8f}",
+            f"{low_price:.8f}",
+            f"{close_price:.8f}",
+            f"{volume:.4f}",
+            open_time + interval_ms - 1,
+            f"{volume * close_price:.4f}",
+            rng.randint(100, 5000),
+            f"{taker_base:.4f}",
+            f"{taker_base * close_price:.4f}",
+            "0"
+        ]
+
+    def tickers(self):
+        """生成24小时行情，成交额按币种序号递减"""
+        result = []
+        for i, symbol in enumerate(self.symbols):
+            price = self.base_price(symbol)
+            result.append({
+                'symbol': symbol,
+                'lastPrice': f"{price:.8f}",
+                'quoteVolume': f"{(len(self.symbols) - i) * 1_000_000:.2f}"
+            })
+        return result
+
+    def prices(self):
+        """所有币种的最新价格"""
+        return [{'symbol': symbol, 'price': f"{self.base_price(symbol):.8f}"} for symbol in self.symbols]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # 支持keep-alive
+
+            def do_GET(self):
+                server._count_request()
+                with server._count_lock:
+                    server.in_flight += 1
+                    in_flight = server.in_flight
+                try:
+                    if server.latency:
+                        overload = in_flight / server.capacity if server.capacity else 1.0
+                        time.sleep(server.latency * max(overload, 1.0))
+                finally:
+                    with server._count_lock:
+                        server.in_flight -= 1
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                allowed, used_weight = server._charge_weight(request_weight(parsed.path, query))
+                headers = {USED_WEIGHT_HEADER: str(used_weight)}
+                if not allowed:
+                    headers['Retry-After'] = str(max(int(60 - time.time() % 60), 1))
+                    self._send(429, {'code': -1003, 'msg': 'Too many requests'}, headers)
+                    return
+                try:
+                    body = self._route(parsed.path, query)
+                except KeyError as e:
+                    self._send(400, {'code': -1100, 'msg': f"bad parameter: {e}"}, headers)
+                    return
+                if body is None:
+                    self._send(404, {'code': -1, 'msg': 'not found'}, headers)
+                    return
+                self._send(200, body, headers)
+
+            def _route(self, path, query):
+                if path == '/fapi/v1/klines':
+                    limit = int(query.get('limit', 500))
+                    start_time = int(query['startTime']) if 'startTime' in query else None
+                    end_time = int(query['endTime']) if 'endTime' in query else None
+                    return server.klines(query['symbol'], query['interval'], limit, start_time, end_time)
+                if path == '/fapi/v1/ticker/24hr':
+                    return server.tickers()
+                if path in ('/fapi/v1/ticker/price', '/api/v3/ticker/price'):
+                    if 'symbol' in query:
+                        symbol = query['symbol']
+                        return {'symbol': symbol, 'price': f"{server.base_price(symbol):.8f}"}
+                    return server.prices()
+                if path == '/fapi/v1/time':
+                    return {'serverTime': int(server.clock() * 1000)}
+                return None
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # 不输出访问日志
+                pass
+
+        return Handler
+
+
+class MockBinanceStreamServer:
+    """本地模拟的Binance合约组合推送流（WebSocket），用于离线测试推送模式
+
+    连接地址形如 ws://host:port/stream?streams=btcusdt@kline_15m/btcusdt@markPrice@1s。
+    时间被加速：每candle_seconds秒收盘一根K线，期间每tick_seconds秒推送一次未收盘K线和标记价格。
+    K线数据与MockBinanceServer的REST数据一致，可先用REST预热再接推送流。
+    设置price_multipliers[symbol]可以模拟价格异动。
+    """
+
+    def __init__(self, rest_server, host='127.0.0.1', port=0, candle_seconds=2.0, tick_seconds=0.5):
+        if websockets is None:
+            raise RuntimeError("推送流模拟服务需要安装websockets: pip install websockets")
+        self.rest_server = rest_server
+        self.host = host
+        self.port = port
+        self.candle_seconds = candle_seconds
+        self.tick_seconds = tick_seconds
+        self.price_multipliers = {}
+        self.sent_count = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_time = None
+
+    @property
+    def base_url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._loop is not None and self._server is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(self._serve())
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._start_time = time.time()
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _serve(self):
+        # 新版websockets要求在运行中的事件循环内创建服务
+        return await websockets.serve(self._handle, self.host, self.port)
+
+    async def _shutdown(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._loop.stop()
+
+    def _simulated_open_time(self, interval):
+        """加速后的当前K线开盘时间，以服务启动时的真实K线为起点"""
+        interval_ms = INTERVAL_MS[interval]
+        start_ms = int(self._start_time * 1000)
+        index = int((time.time() - self._start_time) / self.candle_seconds)
+        return start_ms - start_ms % interval_ms + index * interval_ms
+
+    def _kline_event(self, symbol, interval, open_time, is_closed):
+        row = self.rest_server._kline_row(symbol, interval, open_time)
+        return {
+            'stream': f"{symbol.lower()}@kline_{interval}",
+            'data': {
+                'e': 'kline', 'E': int(time.time() * 1000), 's': symbol,
+                'k': {
+                    't': row[0], 'T': row[6], 's': symbol, 'i': interval,
+                    'o': row[1], 'h': row[2], 'l': row[3], 'c': row[4], 'v': row[5],
+                    'n': row[8], 'x': is_closed, 'q': row[7], 'V': row[9], 'Q': row[10]
+                }
+            }
+        }
+
+    def _mark_price_event(self, symbol):
+        open_time = self._simulated_open_time('15m')
+        close_price = float(self.rest_server._kline_row(symbol, '15m', open_time)[4])
+        price = close_price * self.price_multipliers.get(symbol, 1.0)
+        return {
+            'stream': f"{symbol.lower()}@markPrice@1s",
+            'data': {'e': 'markPriceUpdate', 'E': int(time.time() * 1000), 's': symbol, 'p': f"{price:.8f}"}
+        }
+
+    async def _handle(self, websocket, path=None):
+        # 新版websockets通过request.path获取路径，旧版作为参数传入
+        request = getattr(websocket, 'request', None)
+        path = getattr(request, 'path', None) or path or getattr(websocket, 'path', '')
+        query = parse_qs(urlparse(path).query)
+        streams = query.get('streams', [''])[0].split('/')
+        kline_streams = []
+        mark_price_symbols = []
+        for stream in filter(None, streams):
+            name, _, kind = stream.partition('@')
+            symbol = name.upper()
+            if kind.startswith('kline_'):
+                kline_streams.append((symbol, kind[len('kline_'):]))
+            elif kind.startswith('markPrice'):
+                mark_price_symbols.append(symbol)
+
+        last_open_times = {}
+        try:
+            while True:
+                for symbol, interval in kline_streams:
+                    open_time = self._simulated_open_time(interval)
+                    previous = last_open_times.get((symbol, interval))
+                    if previous is not None and previous != open_time:
+                        # 上一根K线收盘
+                        await websocket.send(json.dumps(self._kline_event(symbol, interval, previous, True)))
+                        self.sent_count += 1
+                    last_open_times[(symbol, interval)] = open_time
+                    await websocket.send(json.dumps(self._kline_event(symbol, interval, open_time, False)))
+                    self.sent_count += 1
+                for symbol in mark_price_symbols:
+                    await websocket.send(json.dumps(self._mark_price_event(symbol)))
+                    self.sent_count += 1
+                await asyncio.sleep(self.tick_seconds)
+        except websockets.ConnectionClosed:
+            pass
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    mock = MockBinanceServer(port=port, latency=0.05).start()
+    print(f"模拟Binance服务已启动: {mock.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
+        print("模拟服务已停止")
@@ -0,0 +1,227 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import DEFAULT_FEE_RATE, DEFAULT_STRATEGY_PARAMS, run_backtest, summarize_trades
+from kline_arrays import KlineArrays
+
+# 默认扫描的参数网格（MACD快线/慢线/信号线周期，潜在信号阈值%）
+DEFAULT_SWEEP_GRID = {
+    'fast_period': [8, 12, 16],
+    'slow_period': [21, 26, 34],
+    'signal_period': [7, 9, 12],
+    'close_to_signal_pct': [0.3, 0.5, 0.8]
+}
+
+# 放入共享内存的K线列：价格按float64，开盘时间按int64
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+# 排名可用的指标，值为True表示越大越好
+RANK_METRICS = {
+    'total_pct': True,
+    'mean_pct': True,
+    'median_pct': True,
+    'hit_rate': True,
+    'max_drawdown_pct': False
+}
+
+
+def parameter_grid(grid=None):
+    """展开参数网格为参数字典列表，跳过快线周期不小于慢线周期的组合"""
+    grid = grid or DEFAULT_SWEEP_GRID
+    names = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(DEFAULT_STRATEGY_PARAMS, **dict(zip(names, values)))
+        if params['fast_period'] < params['slow_period']:
+            combos.append(params)
+    return combos
+
+
+def params_key(params):
+    """参数组合的唯一标识，用于断点续跑时判断是否已完成"""
+    return json.dumps(params, sort_keys=True)
+
+
+class SharedHistory:
+    """把多个币种的15分钟K线拼接后放入共享内存，工作进程按名字映射，不经过pickle复制数据
+
+    布局：prices为(4, 总根数)的float64矩阵（open/high/low/close），open_time为int64数组，
+    offsets[i]:offsets[i + 1]是第i个币种的K线。
+    """
+
+    def __init__(self, history):
+        self.symbols = list(history)
+        lengths = [len(history[symbol]) for symbol in self.symbols]
+        self.offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+        total = int(self.offsets[-1])
+
+        self._prices = shared_memory.SharedMemory(create=True, size=max(total * len(PRICE_COLUMNS) * 8, 1))
+        self._open_time = shared_memory.SharedMemory(create=True, size=max(total * 8, 1))
+        prices = np.ndarray((len(PRICE_COLUMNS), total), dtype=np.float64, buffer=self._prices.buf)
+        open_time = np.ndarray(total, dtype=np.int64, buffer=self._open_time.buf)
+        for symbol, start, end in zip(self.symbols, self.offsets[:-1], self.offsets[1:]):
+            klines = history[symbol]
+            open_time[start:end] = klines['open_time']
+            for row, column in enumerate(PRICE_COLUMNS):
+                prices[row, start:end] = klines[column]
+        del prices, open_time
+
+    def handle(self):
+        """传给工作进程的描述信息（共享内存名字和各币种的位置），只有几KB"""
+        return {
+            'prices': self._prices.name,
+            'open_time': self._open_time.name,
+            'symbols': self.symbols,
+            'offsets': self.offsets.tolist()
+        }
+
+    def fingerprint(self):
+        """历史数据的摘要（币种、根数和首尾时间），数据变化后不沿用之前的扫描结果"""
+        open_time = np.ndarray(int(self.offsets[-1]), dtype=np.int64, buffer=self._open_time.buf)
+        digest = hashlib.sha1()
+        for symbol, start, end in zip(self.symbols, self.offsets[:-1], self.offsets[1:]):
+            if end > start:
+                digest.update(f"{symbol}:{end - start}:{open_time[start]}:{open_time[end - 1]};".encode())
+        return digest.hexdigest()[:16]
+
+    def close(self):
+        """释放共享内存（所有工作进程结束后调用）"""
+        for block in (self._prices, self._open_time):
+            block.close()
+            block.unlink()
+
+
+def attach_history(handle):
+    """在工作进程中按handle映射共享内存，返回({symbol: KlineArrays}, 共享内存对象列表)
+
+    KlineArrays中的各列直接是共享内存上的视图，共享内存对象需要保持引用。
+    """
+    prices_block = shared_memory.SharedMemory(name=handle['prices'])
+    open_time_block = shared_memory.SharedMemory(name=handle['open_time'])
+    total = handle['offsets'][-1]
+    prices = np.ndarray((len(PRICE_COLUMNS), total), dtype=np.float64, buffer=prices_block.buf)
+    open_time = np.ndarray(total, dtype=np.int64, buffer=open_time_block.buf)
+    history = {}
+    for symbol, start, end in zip(handle['symbols'], handle['offsets'][:-1], handle['offsets'][1:]):
+        columns = {'open_time': open_time[start:end]}
+        for row, column in enumerate(PRICE_COLUMNS):
+            columns[column] = prices[row, start:end]
+        history[symbol] = KlineArrays(columns)
+    return history, [prices_block, open_time_block]
+
+
+# 工作进程中映射好的历史数据（由_init_worker设置）
+_worker_history = None
+_worker_blocks = None
+
+
+def _init_worker(handle):
+    global _worker_history, _worker_blocks
+    _worker_history, _worker_blocks = attach_history(handle)
+
+
+def _evaluate(params, side, fee_rate):
+    """工作进程中回测一组参数，返回统计结果"""
+    return summarize_trades(run_backtest(_worker_history, side=side, fee_rate=fee_rate, params=params))
+
+
+def load_sweep_results(results_file, fingerprint=None, side=None, fee_rate=None):
+    """读取已完成的扫描结果 {params_key: 记录}，只保留同一份历史数据、方向和手续费率的记录"""
+    done = {}
+    if not results_file or not os.path.exists(results_file):
+        return done
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时写了一半的行
+                continue
+            if fingerprint is not None and record.get('history') != fingerprint:
+                continue
+            if side is not None and record.get('side') != side:
+                continue
+            if fee_rate is not None and record.get('fee_rate') != fee_rate:
+                continue
+            done[params_key(record['params'])] = record
+    return done
+
+
+def _ends_without_newline(path):
+    if os.path.getsize(path) == 0:
+        return False
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def run_sweep(history, grid=None, results_file='sweep_results.jsonl', workers=None, side='long',
+              fee_rate=DEFAULT_FEE_RATE, progress=None):
+    """用进程池对参数网格逐组回测，可断点续跑
+
+    每完成一组参数立即追加一行到results_file（JSON Lines），再次运行时跳过同一份历史数据上已完成的组合。
+
+    Args:
+        history: {symbol: 15分钟KlineArrays}
+        grid: {参数名: 取值列表}，默认DEFAULT_SWEEP_GRID
+        results_file: 结果文件，None则不保存（也不能续跑）
+        workers: 进程数，默认为CPU核数
+        side: 'long'或'short'
+        fee_rate: 单边手续费率
+        progress: 可选，每完成一组调用progress(已完成数, 总数, 记录)
+
+    Returns:
+        list: 所有组合（包括之前已完成的）的记录 {'params', 'summary', 'history', 'side', 'fee_rate'}
+    """
+    combos = parameter_grid(grid)
+    shared = SharedHistory(history)
+    try:
+        fingerprint = shared.fingerprint()
+        done = load_sweep_results(results_file, fingerprint, side, fee_rate)
+        records = [done[params_key(params)] for params in combos if params_key(params) in done]
+        pending = [params for params in combos if params_key(params) not in done]
+        if not pending:
+            return records
+
+        out = None
+        if results_file:
+            out = open(results_file, 'a', encoding='utf-8')
+            # 上次中断时最后一行可能只写了一半，换行后再追加
+            if _ends_without_newline(results_file):
+                out.write("\n")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.handle(),)) as executor:
+                futures = {executor.submit(_evaluate, params, side, fee_rate): params for params in pending}
+                for future in as_completed(futures):
+                    line = json.dumps({'params': futures[future], 'summary': future.result(),
+                                       'history': fingerprint, 'side': side, 'fee_rate': fee_rate}, ensure_ascii=False)
+                    # 与续跑时从文件读出的记录格式一致（如分位数的键为字符串）
+                    record = json.loads(line)
+                    records.append(record)
+                    if out is not None:
+                        out.write(line + "\n")
+                        out.flush()
+                    if progress is not None:
+                        progress(len(records), len(combos), record)
+        finally:
+            if out is not None:
+                out.close()
+        return records
+    finally:
+        shared.close()
+
+
+def rank_results(records, metric='total_pct', min_trades=1):
+    """按指标排序（最好的在前），交易笔数少于min_trades的组合排除"""
+    if metric not in RANK_METRICS:
+        raise ValueError(f"不支持的排序指标: {metric}")
+    higher_is_better = RANK_METRICS[metric]
+    eligible = [record for record in records if record['summary'].get('trades', 0) >= min_trades]
+    return sorted(eligible, key=lambda record: record['summary'][metric], reverse=higher_is_better)
@@ -0,0 +1,101 @@
+import threading
+import time
+
+FUTURES_PRICE_URL = 'https://fapi.binance.com/fapi/v1/ticker/price'
+SPOT_PRICE_URL = 'https://api.binance.com/api/v3/ticker/price'
+
+
+class PriceSnapshot:
+    """全市场价格快照
+
+    不带symbol参数请求ticker/price接口，一次拿到所有币种的最新价格，
+    在ttl秒内的单币种查询都直接从内存返回。合约价格优先，
+    合约没有的币种再按需拉取一次现货全量价格。
+    """
+
+    def __init__(self, http_get, ttl=3, futures_url=FUTURES_PRICE_URL, spot_url=SPOT_PRICE_URL):
+        """
+        Args:
+            http_get: 发送GET请求的函数，签名为http_get(url)，返回requests风格的响应
+            ttl: 快照有效期（秒）
+        """
+        self.http_get = http_get
+        self.ttl = ttl
+        self.futures_url = futures_url
+        self.spot_url = spot_url
+        # {symbol: (价格, 更新时间)}
+        self._prices = {}
+        self._spot_prices = {}
+        self._fetched_at = 0.0
+        self._spot_fetched_at = 0.0
+        self._lock = threading.Lock()
+        # 同一时间只允许一个线程去刷新，其他线程等待结果，避免并发重复请求
+        self._refresh_lock = threading.Lock()
+        self.fetch_count = 0
+
+    def _fetch_all(self, url):
+        response = self.http_get(url)
+        response.raise_for_status()
+        self.fetch_count += 1
+        return {item['symbol']: float(item['price']) for item in response.json()}
+
+    def refresh(self, force=False):
+        """刷新合约价格快照（未过期且非强制时不发请求），返回是否成功"""
+        with self._refresh_lock:
+            if not force and time.time() - self._fetched_at < self.ttl:
+                return True
+            try:
+                prices = self._fetch_all(self.futures_url)
+            except Exception as e:
+                print(f"获取全市场价格失败: {e}")
+                return False
+            now = time.time()
+            with self._lock:
+                self._prices.update((symbol, (price, now)) for symbol, price in prices.items())
+                self._fetched_at = now
+            return True
+
+    def _refresh_spot(self):
+        with self._refresh_lock:
+            if time.time() - self._spot_fetched_at < self.ttl:
+                return
+            try:
+                prices = self._fetch_all(self.spot_url)
+            except Exception as e:
+                print(f"获取现货全市场价格失败: {e}")
+                return
+            with self._lock:
+                self._spot_prices = prices
+                self._spot_fetched_at = time.time()
+
+    def _fresh_price(self, symbol):
+        with self._lock:
+            entry = self._prices.get(symbol)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def get(self, symbol):
+        """获取单个币种价格，快照过期时自动刷新；找不到返回None
+
+        只返回ttl秒内的价格：快照过期且刷新失败时返回None（由调用方改用单币种接口等），不返回过期的旧价格。
+        """
+        price = self._fresh_price(symbol)
+        if price is not None:
+            return price
+
+        self.refresh()
+        price = self._fresh_price(symbol)
+        if price is not None:
+            return price
+
+        self._refresh_spot()
+        with self._lock:
+            if time.time() - self._spot_fetched_at >= self.ttl:
+                return None
+            return self._spot_prices.get(symbol)
+
+    def update(self, symbol, price):
+        """用外部数据（如推送的标记价格）更新单个币种价格"""
+        with self._lock:
+            self._prices[symbol] = (float(price), time.time())
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+# 各接口前缀每分钟的请求权重上限（合约fapi与现货api分别计算）
+WEIGHT_LIMITS = {
+    '/fapi/': 2400,
+    '/api/': 6000
+}
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1m'
+
+
+def klines_weight(limit):
+    """klines接口的权重随limit变化"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def request_weight(path, params=None):
+    """估算一次请求消耗的权重（未知接口按1计算）"""
+    params = params or {}
+    has_symbol = 'symbol' in params
+    if path.endswith('/klines'):
+        return klines_weight(int(params.get('limit', 500)))
+    if path == '/fapi/v1/ticker/24hr':
+        return 1 if has_symbol else 40
+    if path == '/api/v3/ticker/24hr':
+        return 2 if has_symbol else 80
+    if path == '/fapi/v1/ticker/price':
+        return 1 if has_symbol else 2
+    if path == '/api/v3/ticker/price':
+        return 2 if has_symbol else 4
+    return 1
+
+
+class WeightBucket:
+    """单个权重额度的令牌桶
+
+    容量为每分钟上限乘以安全系数，按容量/60的速度匀速补充，避免瞬间打满额度。
+    交易所按自然分钟统计权重，所以同时记录每个自然分钟已预占的权重，
+    本分钟额度用完的请求推迟到下一分钟开始。发请求前预占权重并返回需要等待的时间；
+    收到响应后用交易所返回的已用权重校正本分钟用量，遇到429/418则整体暂停。
+    """
+
+    def __init__(self, limit_per_minute, safety_ratio=0.9):
+        self.limit = limit_per_minute
+        self.capacity = limit_per_minute * safety_ratio
+        self.refill_rate = self.capacity / 60
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        # {自然分钟序号: 已预占权重}
+        self._window_used = {}
+        self._lock = threading.Lock()
+        # 交易所最近一次返回的已用权重
+        self.reported_used = None
+        self.requests = 0
+        self.weight_total = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    def reserve(self, weight):
+        """预占权重，返回发请求前需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wall_now = time.time()
+            self._refill(now)
+            self.tokens -= weight
+            send_at = wall_now + max(-self.tokens / self.refill_rate, self._paused_until - now, 0.0)
+
+            # 按发送时刻所在的自然分钟检查额度，不够就顺延到下一分钟
+            minute = int(send_at // 60)
+            while self._window_used.get(minute, 0) + weight > self.capacity:
+                minute += 1
+                send_at = minute * 60
+            self._window_used[minute] = self._window_used.get(minute, 0) + weight
+            current_minute = int(wall_now // 60)
+            for old in [m for m in self._window_used if m < current_minute]:
+                del self._window_used[old]
+
+            wait = send_at - wall_now
+            self.requests += 1
+            self.weight_total += weight
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+        return wait
+
+    def observe(self, status, used_weight=None, retry_after=None):
+        """根据响应校正用量（used_weight为响应头中本分钟已用权重）"""
+        with self._lock:
+            now = time.monotonic()
+            if used_weight is not None:
+                self.reported_used = used_weight
+                minute = int(time.time() // 60)
+                self._window_used[minute] = max(self._window_used.get(minute, 0), used_weight)
+            if status in (418, 429):
+                self.throttled += 1
+                if retry_after is None:
+                    # 没有Retry-After时等到下一个自然分钟权重清零
+                    retry_after = 60 - time.time() % 60
+                self._paused_until = max(self._paused_until, now + retry_after)
+                self._refill(now)
+                self.tokens = min(self.tokens, 0.0)
+
+    def utilization(self):
+        """当前自然分钟的权重使用情况"""
+        with self._lock:
+            used = self._window_used.get(int(time.time() // 60), 0)
+            return {
+                'used_weight': used,
+                'limit': self.limit,
+                'utilization_pct': used / self.limit * 100,
+                'requests': self.requests,
+                'weight_total': self.weight_total,
+                'waits': self.waits,
+                'wait_seconds': self.wait_seconds,
+                'throttled': self.throttled,
+                'paused_seconds': max(self._paused_until - time.monotonic(), 0.0)
+            }
+
+
+class BinanceRateLimiter:
+    """Binance请求权重限速器，进程内所有请求共用
+
+    按URL路径前缀找到对应的权重桶（合约/现货各一个），非Binance接口
+    （钉钉、Telegram等）不受限制。线程中用acquire()，协程中用acquire_async()。
+    """
+
+    def __init__(self, limits=None, safety_ratio=0.9):
+        limits = WEIGHT_LIMITS if limits is None else limits
+        self.buckets = {prefix: WeightBucket(limit, safety_ratio) for prefix, limit in limits.items()}
+
+    def _bucket_for(self, path):
+        for prefix, bucket in self.buckets.items():
+            if path.startswith(prefix):
+                return bucket
+        return None
+
+    def _reserve(self, url, params):
+        path = urlparse(url).path
+        bucket = self._bucket_for(path)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve(request_weight(path, params))
+
+    def acquire(self, url, params=None):
+        """发请求前调用，权重不足时阻塞等待"""
+        wait = self._reserve(url, params)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, url, params=None):
+        """acquire的协程版本"""
+        wait = self._reserve(url, params)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, url, status, headers):
+        """收到响应后调用，读取已用权重和Retry-After"""
+        bucket = self._bucket_for(urlparse(url).path)
+        if bucket is None:
+            return
+        used_weight = headers.get(USED_WEIGHT_HEADER)
+        retry_after = headers.get('Retry-After')
+        bucket.observe(
+            status,
+            int(used_weight) if used_weight is not None else None,
+            float(retry_after) if retry_after is not None else None
+        )
+
+    def weight_ratio(self, url):
+        """url所属权重桶本分钟已用权重占上限的比例，非Binance接口返回None"""
+        bucket = self._bucket_for(urlparse(url).path)
+        if bucket is None:
+            return None
+        return bucket.utilization()['utilization_pct'] / 100
+
+    def utilization(self):
+        """各权重桶的使用情况，{前缀: {...}}"""
+        return {prefix: bucket.utilization() for prefix, bucket in self.buckets.items()}
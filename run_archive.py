@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# 每次筛选运行的逐币种结果，每列一个文件（numpy原始二进制，追加写入）
+# direction: 1为4小时MACD多头，-1为空头，0为未完成分析；cross: 1为15分钟金叉，-1为死叉，0为无交叉
+RUN_ARCHIVE_COLUMNS = {
+    'run_time': np.dtype(np.int64),
+    'symbol': np.dtype('S32'),
+    'analyzed': np.dtype(np.bool_),
+    'macd_value': np.dtype(np.float64),
+    'direction': np.dtype(np.int8),
+    'cross': np.dtype(np.int8),
+    'buy': np.dtype(np.bool_),
+    'sell': np.dtype(np.bool_),
+    'growth_7d': np.dtype(np.float64)
+}
+
+DAY_MS = 86_400_000
+
+
+class RunArchive:
+    """筛选结果的列式归档，按运行日期（UTC）分区
+
+    目录结构为 <root>/date=YYYY-MM-DD/<列名>.bin，每次运行把所有币种的结果追加到当天分区的各列文件末尾。
+    查询只读取需要的列和时间范围内的分区，不需要解析整行数据。
+    run_time列最后写入，作为分区的有效行数：写入中途退出时多出的部分会在读取时忽略、下次写入前截掉。
+    """
+
+    def __init__(self, root='run_archive'):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _partition_name(run_time_ms):
+        return 'date=' + datetime.fromtimestamp(run_time_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def _column_path(self, partition, column):
+        return os.path.join(self.root, partition, f'{column}.bin')
+
+    def _row_count(self, partition):
+        path = self._column_path(partition, 'run_time')
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // RUN_ARCHIVE_COLUMNS['run_time'].itemsize
+
+    def append_run(self, results, run_time=None, growth_7d=None):
+        """追加一次运行的结果
+
+        Args:
+            results: AnalysisResults（或AnalysisResult的列表）
+            run_time: 运行时间（毫秒），默认为当前时间
+            growth_7d: 可选，{symbol: 7天涨幅(%)}
+
+        Returns:
+            int: 写入的行数
+        """
+        results = list(results)
+        if not results:
+            return 0
+        if run_time is None:
+            run_time = int(time.time() * 1000)
+        growth_7d = growth_7d or {}
+        count = len(results)
+        columns = {
+            'symbol': np.array([result.symbol.encode() for result in results], dtype=RUN_ARCHIVE_COLUMNS['symbol']),
+            'analyzed': np.array([result.analyzed for result in results]),
+            'macd_value': np.array([np.nan if result.four_hour_macd_value is None else float(result.four_hour_macd_value)
+                                    for result in results]),
+            'direction': np.array([0 if result.four_hour_macd_bullish is None else 1 if result.four_hour_macd_bullish else -1
+                                   for result in results]),
+            'cross': np.array([1 if result.macd_cross == 'golden_cross' else -1 if result.macd_cross == 'death_cross' else 0
+                               for result in results]),
+            'buy': np.array([bool(result.is_buy_signal) for result in results]),
+            'sell': np.array([bool(result.is_sell_signal) for result in results]),
+            'growth_7d': np.array([growth_7d.get(result.symbol, np.nan) for result in results], dtype=np.float64),
+            # run_time最后写入
+            'run_time': np.full(count, run_time)
+        }
+
+        partition = self._partition_name(run_time)
+        with self._lock:
+            os.makedirs(os.path.join(self.root, partition), exist_ok=True)
+            rows = self._row_count(partition)
+            for column, values in columns.items():
+                dtype = RUN_ARCHIVE_COLUMNS[column]
+                with open(self._column_path(partition, column), 'ab') as f:
+                    # 截掉上次写入中途退出留下的多余数据
+                    if f.tell() != rows * dtype.itemsize:
+                        f.truncate(rows * dtype.itemsize)
+                        f.seek(0, os.SEEK_END)
+                    f.write(values.astype(dtype).tobytes())
+        return count
+
+    def partitions(self, since=None, until=None):
+        """时间范围内（毫秒，含两端所在的日期）的分区名，按日期升序"""
+        names = sorted(name for name in os.listdir(self.root) if name.startswith('date='))
+        if since is not None:
+            names = [name for name in names if name >= self._partition_name(since)]
+        if until is not None:
+            names = [name for name in names if name <= self._partition_name(until)]
+        return names
+
+    def _read_column(self, partition, column, rows):
+        dtype = RUN_ARCHIVE_COLUMNS[column]
+        path = self._column_path(partition, column)
+        if not os.path.exists(path):
+            # 旧分区中没有的列按缺失值补齐
+            if dtype.kind == 'f':
+                return np.full(rows, np.nan)
+            return np.zeros(rows, dtype=dtype)
+        return np.fromfile(path, dtype=dtype, count=rows)
+
+    def scan(self, columns, symbol=None, since=None, until=None):
+        """读取时间范围内（毫秒）的若干列，可按币种过滤
+
+        Returns:
+            dict: {列名: numpy数组}，各列按写入顺序对齐；symbol列解码为str
+        """
+        needed = set(columns) | {'run_time'}
+        if symbol is not None:
+            needed.add('symbol')
+        parts = {column: [] for column in needed}
+        for partition in self.partitions(since, until):
+            rows = self._row_count(partition)
+            if rows == 0:
+                continue
+            data = {column: self._read_column(partition, column, rows) for column in needed}
+            mask = np.ones(rows, dtype=bool)
+            if symbol is not None:
+                mask &= data['symbol'] == symbol.encode()
+            if since is not None:
+                mask &= data['run_time'] >= since
+            if until is not None:
+                mask &= data['run_time'] <= until
+            for column in needed:
+                parts[column].append(data[column][mask])
+
+        result = {}
+        for column in columns:
+            if parts[column]:
+                result[column] = np.concatenate(parts[column])
+            else:
+                result[column] = np.empty(0, dtype=RUN_ARCHIVE_COLUMNS[column])
+            if column == 'symbol':
+                result[column] = result[column].astype(str)
+        return result
+
+    def signal_runs(self, symbol, signal='buy', days=30, now=None):
+        """最近days天内该币种出现signal（'buy'或'sell'）的所有运行时间（毫秒，升序）"""
+        if signal not in ('buy', 'sell'):
+            raise ValueError(f"不支持的信号类型: {signal}")
+        if now is None:
+            now = int(time.time() * 1000)
+        data = self.scan(['run_time', signal], symbol=symbol, since=now - days * DAY_MS, until=now)
+        return np.sort(data['run_time'][data[signal]])
+
+    def symbol_history(self, symbol, days=30, now=None, columns=('run_time', 'direction', 'cross', 'buy', 'sell', 'macd_value', 'growth_7d')):
+        """最近days天内该币种每次运行的结果"""
+        if now is None:
+            now = int(time.time() * 1000)
+        return self.scan(list(columns), symbol=symbol, since=now - days * DAY_MS, until=now)
+
+    def stats(self):
+        """分区数、总行数和占用的磁盘空间（字节）"""
+        partitions = self.partitions()
+        size = 0
+        for partition in partitions:
+            directory = os.path.join(self.root, partition)
+            size += sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        return {
+            'partitions': len(partitions),
+            'rows': sum(self._row_count(partition) for partition in partitions),
+            'bytes': size
+        }
+
+
+def format_run_time(run_time_ms):
+    """运行时间（毫秒）转为本地时间字符串"""
+    return datetime.fromtimestamp(int(run_time_ms) / 1000).strftime('%Y-%m-%d %H:%M')
@@ -0,0 +1,289 @@
+import ipaddress
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from multiprocessing.connection import Client, Listener
+
+# 工作进程的默认连接认证密钥，只允许用于本机（回环地址或Unix socket）
+# 连接上收发的是pickle数据，知道密钥并能连上工作进程的人就能在其中执行任意代码。
+# 工作进程监听或协调进程连接非回环地址时，必须用SHARD_AUTHKEY环境变量设置自己的密钥，否则拒绝启动/连接。
+DEFAULT_AUTHKEY = b'dogwatcher-shard'
+
+# 协调进程传给工作进程的分析器设置（工作进程的其他设置保持自己的默认值）
+SHARD_SETTINGS = ('binance_futures_url', 'analysis_mode', 'fetch_mode', 'async_concurrency', 'max_workers',
+                  'kline_store_file', 'swing_screen_enabled', 'swing_interval', 'swing_window')
+
+
+def shard_for(symbol, shards):
+    """币种所属的分片序号（CRC32取模，不受Python字符串哈希随机化影响，各进程、各主机结果一致）"""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def partition_symbols(symbols, shards):
+    """按币种哈希把币种列表分成shards份，每份内保持原来的顺序"""
+    parts = [[] for _ in range(shards)]
+    for symbol in symbols:
+        parts[shard_for(symbol, shards)].append(symbol)
+    return parts
+
+
+def parse_address(text):
+    """'host:port'转为TCP地址元组，其他字符串视为Unix socket路径"""
+    if isinstance(text, str) and ':' in text and not text.startswith('/'):
+        host, port = text.rsplit(':', 1)
+        return host, int(port)
+    return text
+
+
+def is_local_address(address):
+    """是否只能从本机访问：Unix socket路径，或localhost/回环IP"""
+    if not isinstance(address, tuple):
+        return True
+    host = address[0]
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # 其他主机名按可被远程访问处理
+        return False
+
+
+def shard_authkey():
+    """工作进程的认证密钥：SHARD_AUTHKEY环境变量，未设置时为默认密钥（仅限本机）"""
+    return os.environ.get('SHARD_AUTHKEY', '').encode() or DEFAULT_AUTHKEY
+
+
+def check_authkey(address, authkey):
+    """非回环地址不允许使用公开的默认密钥"""
+    if authkey == DEFAULT_AUTHKEY and not is_local_address(address):
+        raise ValueError(f"分片地址{format_address(address)}不是本机地址，请先用SHARD_AUTHKEY环境变量设置自己的认证密钥"
+                         "（默认密钥是公开的，能连上的人可以在工作进程中执行任意代码）")
+
+
+def format_address(address):
+    if isinstance(address, tuple):
+        return f"{address[0]}:{address[1]}"
+    return str(address)
+
+
+def _handle_analyze(analyzer, conn, request):
+    """在工作进程中分析一个分片，每完成一个币种立即发回(symbol, 结果, symbol_extras)
+
+    symbol_extras（7天涨幅、波段分析、4小时DIF/DEA）用工作进程已获取的K线计算，
+    协调进程生成报告时不必再请求K线；分析失败的币种为None。
+    """
+    for name, value in request.get('settings', {}).items():
+        setattr(analyzer, name, value)
+    # 每一轮都是新的筛选，上一轮的K线请求结果和指标不再复用
+    analyzer.kline_flight.reset()
+    analyzer.indicator_cache.reset()
+    analyzer.start_fetch_round()
+    symbols = request['symbols']
+    start = time.perf_counter()
+    prefetched = analyzer.prefetch_klines_async(symbols) if analyzer.fetch_mode == 'async' else {}
+    for symbol, result in analyzer.iter_analysis_results(symbols, prefetched):
+        extras = analyzer.symbol_extras(symbol) if result.analyzed else None
+        conn.send(('result', symbol, result, extras))
+    conn.send(('done', {'symbols': len(symbols), 'seconds': time.perf_counter() - start,
+                        'concurrency': analyzer.fetch_concurrency.summary()}))
+
+
+def serve_shard_worker(address, analyzer_factory, authkey=DEFAULT_AUTHKEY, listener=None):
+    """运行分片工作进程：接受协调进程的连接，按请求分析币种，直到收到shutdown
+
+    同一时间只服务一个连接；同一个分析器在各轮之间复用（HTTP连接池、本地K线存储）。
+    监听非回环地址时必须设置SHARD_AUTHKEY（或传入authkey），使用默认密钥会抛出ValueError。
+
+    Args:
+        address: 监听地址，('host', port)或Unix socket路径
+        analyzer_factory: 创建分析器的函数（如CryptoAnalyzer）
+        listener: 可选，已创建好的Listener（本地工作进程由启动方先拿到实际地址）
+    """
+    check_authkey(listener.address if listener is not None else address, authkey)
+    listener = listener or Listener(address, authkey=authkey)
+    analyzer = analyzer_factory()
+    print(f"分片工作进程已启动，监听{format_address(listener.address)}")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # 认证失败等，继续等待下一个连接
+                print(f"接受连接失败: {e}")
+                continue
+            with conn:
+                while True:
+                    try:
+                        request = conn.recv()
+                    except EOFError:
+                        break
+                    if request[0] == 'shutdown':
+                        return
+                    if request[0] == 'analyze':
+                        try:
+                            _handle_analyze(analyzer, conn, request[1])
+                        except (EOFError, OSError):
+                            break
+                        except Exception as e:
+                            print(f"分析分片时出错: {e}")
+                            conn.send(('error', str(e)))
+    finally:
+        listener.close()
+        if getattr(analyzer, 'http', None) is not None:
+            analyzer.http.close()
+
+
+def _run_local_worker(ready, family, analyzer_factory, authkey):
+    listener = Listener(family=family, authkey=authkey)
+    ready.send(listener.address)
+    ready.close()
+    serve_shard_worker(listener.address, analyzer_factory, authkey, listener=listener)
+
+
+class LocalShardPool:
+    """在本机启动若干个分片工作进程（监听本地TCP端口或Unix socket），用于单机多核运行和测试
+
+    不指定authkey时每次生成随机密钥，本机其他用户也无法连接。用法：
+        with LocalShardPool(4, CryptoAnalyzer) as pool:
+            analyzer.shard_workers = pool.addresses
+            analyzer.shard_authkey = pool.authkey
+    """
+
+    def __init__(self, count, analyzer_factory, authkey=None, family='AF_INET'):
+        """
+        Args:
+            count: 工作进程数
+            analyzer_factory: 创建分析器的函数，需要能被pickle（模块级的类或函数）
+            authkey: 认证密钥，默认随机生成
+            family: 'AF_INET'（本地TCP）或'AF_UNIX'（Unix socket）
+        """
+        self.count = count
+        self.analyzer_factory = analyzer_factory
+        self.authkey = authkey or os.urandom(32)
+        self.family = family
+        self.processes = []
+        self.addresses = []
+
+    def start(self):
+        for _ in range(self.count):
+            parent_end, child_end = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_run_local_worker, daemon=True,
+                                              args=(child_end, self.family, self.analyzer_factory, self.authkey))
+            process.start()
+            child_end.close()
+            self.processes.append(process)
+            self.addresses.append(parent_end.recv())
+            parent_end.close()
+        return self
+
+    def stop(self, timeout=5):
+        for address in self.addresses:
+            try:
+                with Client(address, authkey=self.authkey) as conn:
+                    conn.send(('shutdown',))
+            except (OSError, EOFError):
+                pass
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.addresses = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class ShardCoordinator:
+    """把币种按哈希分给多个工作进程（本机或其他主机）分析，并把结果合并成一个流
+
+    每个分片一个线程负责收发，结果到达一个产出一个；某个工作进程连接失败或中途断开时，
+    该分片中还没有收到结果的币种由fallback在本进程分析，不会丢失。
+    有非回环地址而密钥仍是默认密钥时抛出ValueError，不连接任何工作进程。
+    """
+
+    def __init__(self, addresses, authkey=DEFAULT_AUTHKEY):
+        self.addresses = [parse_address(address) for address in addresses]
+        self.authkey = authkey
+        for address in self.addresses:
+            check_authkey(address, authkey)
+        # 最近一轮各分片的情况：address、symbols、received、seconds、fallback、error、concurrency（工作进程的并发调整摘要）
+        self.last_stats = []
+        # 最近一轮工作进程随结果发回的 {symbol: symbol_extras}（在产出该币种的结果之前写入；本地回退分析的币种不在其中）
+        self.extras = {}
+
+    def _run_shard(self, index, symbols, settings, fallback, out):
+        address = self.addresses[index]
+        stats = {'address': format_address(address), 'symbols': len(symbols), 'received': 0,
+                 'seconds': None, 'fallback': 0, 'error': None, 'concurrency': None}
+        self.last_stats[index] = stats
+        start = time.perf_counter()
+        received = set()
+        try:
+            with Client(address, authkey=self.authkey) as conn:
+                conn.send(('analyze', {'symbols': symbols, 'settings': settings}))
+                while True:
+                    message = conn.recv()
+                    if message[0] == 'result':
+                        received.add(message[1])
+                        self.extras[message[1]] = message[3]
+                        out.put((message[1], message[2]))
+                    elif message[0] == 'done':
+                        stats['concurrency'] = message[1].get('concurrency')
+                        break
+                    elif message[0] == 'error':
+                        raise RuntimeError(message[1])
+        except Exception as e:
+            stats['error'] = str(e) or type(e).__name__
+        stats['received'] = len(received)
+        missing = [symbol for symbol in symbols if symbol not in received]
+        if missing and fallback is not None:
+            stats['fallback'] = len(missing)
+            try:
+                for symbol, result in fallback(missing):
+                    out.put((symbol, result))
+            except Exception as e:
+                print(f"分片{format_address(address)}的币种在本地分析时出错: {e}")
+        stats['seconds'] = time.perf_counter() - start
+        out.put(None)
+
+    def iter_results(self, symbols, settings=None, fallback=None):
+        """分片分析所有币种，按完成顺序逐个产出(symbol, 分析结果)
+
+        Args:
+            symbols: 币种列表（各分片内保持这个顺序，优先的币种在每个分片中仍然最先分析）
+            settings: 传给工作进程的分析器设置 {属性名: 值}
+            fallback: 可选，工作进程不可用时在本地分析的函数 fallback(symbols) -> 可迭代的(symbol, 结果)
+        """
+        parts = partition_symbols(symbols, len(self.addresses))
+        self.last_stats = [None] * len(parts)
+        self.extras.clear()
+        out = queue.Queue()
+        threads = []
+        for index, part in enumerate(parts):
+            if not part:
+                self.last_stats[index] = {'address': format_address(self.addresses[index]), 'symbols': 0,
+                                          'received': 0, 'seconds': 0.0, 'fallback': 0, 'error': None,
+                                          'concurrency': None}
+                continue
+            thread = threading.Thread(target=self._run_shard, args=(index, part, settings or {}, fallback, out),
+                                      daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        finished = 0
+        while finished < len(threads):
+            item = out.get()
+            if item is None:
+                finished += 1
+                continue
+            yield item
+        for thread in threads:
+            thread.join()
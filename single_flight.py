@@ -0,0 +1,99 @@
+import threading
+import time
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """请求合并：相同key的并发或重复调用只真正执行一次
+
+    正在执行时，其他线程的同key调用等待并共享同一个结果；执行完成后结果在ttl秒内
+    （或直到reset()）继续复用。结果为None（获取失败）或抛出异常时不缓存，下次调用会重新执行。
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.shared_inflight = 0
+        self.cache_hits = 0
+
+    def do(self, key, func):
+        """执行func()或复用相同key的结果"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set() and time.time() - call.finished_at > self.ttl:
+                call = None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                owner = True
+                self.executions += 1
+            else:
+                owner = False
+                if call.done.is_set():
+                    self.cache_hits += 1
+                else:
+                    self.shared_inflight += 1
+
+        if not owner:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.time()
+            if call.error is not None or call.result is None:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def prime(self, key, result):
+        """直接登记一个已获取的结果（例如批量预取的数据），之后的同key调用直接复用"""
+        if result is None:
+            return
+        call = _Call()
+        call.result = result
+        call.finished_at = time.time()
+        call.done.set()
+        with self._lock:
+            self._calls[key] = call
+
+    def reset(self):
+        """清空已完成的结果和统计（每轮开始时调用），正在执行的调用不受影响"""
+        with self._lock:
+            self._calls = {key: call for key, call in self._calls.items() if not call.done.is_set()}
+            self.calls = 0
+            self.executions = 0
+            self.shared_inflight = 0
+            self.cache_hits = 0
+
+    def stats(self):
+        """返回调用次数、实际执行次数和被合并掉的重复调用次数"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'shared_inflight': self.shared_inflight,
+                'cache_hits': self.cache_hits,
+                'deduplicated': self.calls - self.executions
+            }
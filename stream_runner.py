@@ -0,0 +1,275 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from indicators import MacdState
+from kline_buffer import KlineBuffer
+from kline_resample import resample_kline_arrays
+from kline_store import INTERVAL_MS
+from kline_stream import FUTURES_STREAM_URL, BinanceStreamClient
+
+# 持仓价格异动检测窗口（秒）和阈值（%）
+MOVE_WINDOW_SECONDS = 300
+MOVE_THRESHOLD_PCT = 3
+# 持仓文件重新读取间隔（秒）
+HOLDINGS_RELOAD_SECONDS = 60
+
+
+class StreamRunner:
+    """推送模式：用WebSocket实时更新K线，每根15分钟K线收盘立即做MACD分析
+
+    启动时用REST（经本地K线存储）预热每个币种的K线缓冲区和增量MACD状态，之后只靠推送维护：
+    - K线事件：更新内存缓冲区；15分钟K线收盘时O(1)推进15分钟和4小时MACD状态
+      （4小时K线未收盘时用临时值），再提交一次信号判断
+    - 标记价格事件：写入价格快照，持仓币种5分钟内波动超过3%立即启动疯狂推送
+    MACD状态从预热数据的第一根K线开始一直推进，相当于对预热以来的全部K线做calculate_macd。
+    """
+
+    def __init__(self, analyzer, stream_url=FUTURES_STREAM_URL):
+        self.analyzer = analyzer
+        self.stream_url = stream_url
+        self.signal_interval = '15m'
+        self.kline_requests = analyzer.analysis_kline_requests()
+        # 4小时K线没有单独订阅时由15分钟K线合成
+        self.derive_4h = '4h' not in self.kline_requests
+        self.buffers = {}
+        # {(symbol, '15m'/'4h'): MacdState}，以及未收盘4小时K线的最新收盘价
+        self.macd_states = {}
+        self._forming_close = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=analyzer.max_workers)
+        self._client = None
+        self._holdings = {}
+        self._holdings_loaded_at = 0.0
+        self._price_history = {}
+        self.stats = {
+            'closed_candles': 0,
+            'evaluations': 0,
+            'signals': 0,
+            'price_alerts': 0,
+            'eval_latency_total': 0.0
+        }
+
+    def holdings(self):
+        """持仓数据，定期从文件重新加载"""
+        if time.time() - self._holdings_loaded_at > HOLDINGS_RELOAD_SECONDS:
+            self._holdings = self.analyzer.load_holdings()
+            self._holdings_loaded_at = time.time()
+        return self._holdings
+
+    def warm_up(self, symbols):
+        """用REST接口预热K线缓冲区，返回预热成功的币种"""
+        def load(symbol):
+            rows_by_interval = {}
+            for interval, limit in self.kline_requests.items():
+                rows = self.analyzer.get_futures_klines_raw(symbol, interval, limit)
+                if rows is None:
+                    return symbol, None
+                rows_by_interval[interval] = rows
+            return symbol, rows_by_interval
+
+        ready = []
+        for symbol, rows_by_interval in self._executor.map(load, symbols):
+            if rows_by_interval is None:
+                print(f"{symbol}预热失败，不订阅该币种")
+                continue
+            with self._lock:
+                for interval, rows in rows_by_interval.items():
+                    buffer = KlineBuffer(self.kline_requests[interval])
+                    buffer.extend(rows)
+                    self.buffers[(symbol, interval)] = buffer
+                self.seed_macd(symbol, time.time() * 1000)
+            ready.append(symbol)
+        return ready
+
+    @staticmethod
+    def _closed_part(klines, interval, now_ms):
+        """去掉末尾尚未收盘的K线（now_ms为None时认为全部已收盘）"""
+        if now_ms is not None and len(klines) and klines['open_time'][-1] + INTERVAL_MS[interval] > now_ms:
+            return klines.head(len(klines) - 1)
+        return klines
+
+    def seed_macd(self, symbol, now_ms=None):
+        """用缓冲区中已收盘的K线重建该币种的MACD状态（需持有self._lock）"""
+        quarter_hour = self._closed_part(self.buffers[(symbol, '15m')].view(), '15m', now_ms)
+        quarter_state = MacdState()
+        quarter_state.seed(quarter_hour['close'], quarter_hour['open_time'])
+
+        if self.derive_4h:
+            four_hour = resample_kline_arrays(quarter_hour, '15m', '4h')
+            forming_close = None
+            # 最后一组不满16根说明该4小时K线还未收盘
+            if len(four_hour) and (quarter_hour['open_time'][-1] + INTERVAL_MS['15m']) % INTERVAL_MS['4h'] != 0:
+                forming_close = float(four_hour['close'][-1])
+                four_hour = four_hour.head(len(four_hour) - 1)
+        else:
+            raw_four_hour = self.buffers[(symbol, '4h')].view()
+            four_hour = self._closed_part(raw_four_hour, '4h', now_ms)
+            forming_close = float(raw_four_hour['close'][-1]) if len(four_hour) < len(raw_four_hour) else None
+        four_hour_state = MacdState()
+        four_hour_state.seed(four_hour['close'], four_hour['open_time'])
+
+        self.macd_states[(symbol, '15m')] = quarter_state
+        self.macd_states[(symbol, '4h')] = four_hour_state
+        self._forming_close[symbol] = forming_close
+
+    def _advance_macd(self, symbol, interval, row, is_closed):
+        """用一条K线推送推进MACD状态（需持有self._lock），返回是否需要做信号判断"""
+        open_time = int(row[0])
+        close = float(row[4])
+        if interval == '4h':
+            # 单独订阅的4小时K线
+            state = self.macd_states[(symbol, '4h')]
+            if is_closed and (state.last_open_time is None or open_time > state.last_open_time):
+                state.update(close, open_time)
+                self._forming_close[symbol] = None
+            elif not is_closed:
+                self._forming_close[symbol] = close
+            return False
+
+        if not is_closed:
+            return False
+        state = self.macd_states[(symbol, '15m')]
+        expected = None if state.last_open_time is None else state.last_open_time + INTERVAL_MS['15m']
+        if expected is not None and open_time < expected:
+            # 重复的收盘消息
+            return False
+        if expected is not None and open_time > expected:
+            print(f"{symbol} 15分钟K线不连续（可能断线重连过），用缓冲区重建MACD状态")
+            self.seed_macd(symbol)
+            return True
+
+        state.update(close, open_time)
+        if self.derive_4h:
+            if (open_time + INTERVAL_MS['15m']) % INTERVAL_MS['4h'] == 0:
+                # 这根15分钟K线收盘意味着所在的4小时K线也收盘了
+                self.macd_states[(symbol, '4h')].update(close, open_time - open_time % INTERVAL_MS['4h'])
+                self._forming_close[symbol] = None
+            else:
+                self._forming_close[symbol] = close
+        return True
+
+    def on_kline(self, symbol, interval, row, is_closed):
+        """K线推送回调（在事件循环线程中执行，只做轻量的缓冲区更新）"""
+        with self._lock:
+            buffer = self.buffers.get((symbol, interval))
+            # 同一根K线原地更新，新K线追加，过期的消息忽略
+            if buffer is None or not buffer.push(row):
+                return
+            if is_closed:
+                self.stats['closed_candles'] += 1
+            if not self._advance_macd(symbol, interval, row, is_closed):
+                return
+            quarter_state = self.macd_states[(symbol, '15m')]
+            four_hour_state = self.macd_states[(symbol, '4h')]
+            forming_close = self._forming_close[symbol]
+            # 分析在线程池中进行，这里取出最近的MACD值（独立的数组），之后状态可以继续推进
+            lines = {
+                '15m': quarter_state.lines(),
+                '4h': four_hour_state.lines(provisional_close=forming_close)
+            }
+            counts = {'15m': quarter_state.count, '4h': four_hour_state.count + (forming_close is not None)}
+        self._executor.submit(self.evaluate, symbol, lines, counts, row, time.time())
+
+    def on_mark_price(self, symbol, price, event_time_ms):
+        """标记价格推送回调"""
+        self.analyzer.price_snapshot.update(symbol, price)
+        position_info = self.holdings().get(symbol)
+        if position_info is None:
+            return
+
+        now = event_time_ms / 1000
+        history = self._price_history.setdefault(symbol, deque())
+        history.append((now, price))
+        while history and now - history[0][0] > MOVE_WINDOW_SECONDS:
+            history.popleft()
+        base_price = history[0][1]
+        growth = (price - base_price) / base_price * 100
+        if abs(growth) < MOVE_THRESHOLD_PCT or symbol in self.analyzer.active_mad_pushes:
+            return
+
+        direction = "上涨" if growth > 0 else "下跌"
+        print(f"⚠️  推送检测到{symbol} 5分钟内{direction}超过{MOVE_THRESHOLD_PCT}%: {growth:.2f}%")
+        self.stats['price_alerts'] += 1
+        history.clear()
+        # 先登记，避免线程启动前的下一条推送重复触发
+        self.analyzer.active_mad_pushes.add(symbol)
+        threading.Thread(target=self.analyzer.mad_push_to_dingtalk,
+                         args=(symbol, price, growth, position_info.get('position_type', 'long')),
+                         daemon=True).start()
+
+    def evaluate(self, symbol, lines, counts, closed_row, received_at):
+        """根据增量MACD判断收盘K线的信号，有信号时推送通知"""
+        try:
+            # 收盘K线写入本地存储，保留历史
+            if self.analyzer.kline_store is not None:
+                self.analyzer.kline_store.upsert(symbol, self.signal_interval, [closed_row])
+
+            # 与analyze_single_currency相同的数据量要求
+            if counts['4h'] < 20 or counts['15m'] < 50:
+                print(f"{symbol}数据量不足，跳过")
+                return
+            four_hour_macd_line, four_hour_macd_signal = lines['4h']
+            quarter_hour_macd_line, quarter_hour_macd_signal = lines['15m']
+            result = self.analyzer.evaluate_macd_signals(symbol, four_hour_macd_line, four_hour_macd_signal,
+                                                         quarter_hour_macd_line, quarter_hour_macd_signal)
+
+            content = ""
+            if result.is_buy_signal:
+                content += f"#### 🟢 15分钟MACD多头信号：\n- {symbol} ({result.macd_status}) - MACD: MACD金叉\n"
+            elif result.is_sell_signal:
+                content += f"#### 🔴 15分钟MACD空头信号：\n- {symbol} ({result.macd_status}) - MACD: MACD死叉\n"
+
+            if result.analyzed and symbol in self.holdings():
+                four_hour_macd = (four_hour_macd_line[-1], four_hour_macd_signal[-1])
+                for signal in self.analyzer.check_holdings_signals({symbol: result}, {symbol: four_hour_macd}):
+                    position_text = "多单" if signal['position_type'] == 'long' else "空单"
+                    content += f"\n#### ⚠️  持仓止盈止损提醒：\n- **{signal['symbol']}** ({position_text}) - {signal['signal_type']} - {signal['trigger_condition']}\n"
+
+            with self._lock:
+                self.stats['evaluations'] += 1
+                self.stats['eval_latency_total'] += time.time() - received_at
+                if content:
+                    self.stats['signals'] += 1
+
+            if content:
+                message = f"### 加密货币信号提醒（实时） - {datetime.now().strftime('%Y-%m-%d %H:%M')}\n" + content
+                self.analyzer.send_dingtalk_notification(message, "加密货币交易信号提醒")
+                self.analyzer.send_telegram_notification(message, "加密货币交易信号提醒")
+        except Exception as e:
+            print(f"推送模式分析{symbol}时出错: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def run(self, symbols, duration=None):
+        """预热并订阅推送流，阻塞运行直到duration秒后或手动停止"""
+        symbols = self.warm_up(symbols)
+        print(f"推送模式预热完成，订阅{len(symbols)}个币种")
+        self._client = BinanceStreamClient(
+            symbols,
+            intervals=list(self.kline_requests),
+            on_kline=self.on_kline,
+            on_mark_price=self.on_mark_price,
+            base_url=self.stream_url
+        )
+
+        async def main():
+            if duration is not None:
+                asyncio.get_running_loop().call_later(duration, self._client.stop)
+            await self._client.run()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            print("\n推送模式已手动停止")
+        finally:
+            self._executor.shutdown(wait=True)
+        return self.stats
+
+    def stop(self):
+        """停止推送模式（可从其他线程调用）"""
+        if self._client is not None:
+            self._client.stop()
@@ -0,0 +1,85 @@
+from collections import deque
+
+import numpy as np
+
+# 波段点判定窗口：最低价是前后各16根K线中的最低即为波段低点（最高价同理为波段高点）
+DEFAULT_SWING_WINDOW = 16
+
+
+def sliding_extreme_index(values, window, find_max=False):
+    """滑动窗口极值位置（单调队列，O(n)）
+
+    窗口为[i - window, i + window]，共2 * window + 1根。
+    返回数组result，result[i]为以i为中心的窗口中极值最早出现的位置；两侧不足window根的位置为-1。
+    """
+    values = np.asarray(values, dtype=np.float64).tolist()
+    size = 2 * window + 1
+    result = np.full(len(values), -1, dtype=np.int64)
+    candidates = deque()
+    for j, value in enumerate(values):
+        # 队列中保持候选值单调（求最小时递增），相等的值保留更早的位置
+        if find_max:
+            while candidates and values[candidates[-1]] < value:
+                candidates.pop()
+        else:
+            while candidates and values[candidates[-1]] > value:
+                candidates.pop()
+        candidates.append(j)
+        if candidates[0] <= j - size:
+            candidates.popleft()
+        if j >= size - 1:
+            result[j - window] = candidates[0]
+    return result
+
+
+def find_swing_points(low, high, window=DEFAULT_SWING_WINDOW):
+    """找出所有波段低点和高点
+
+    Returns:
+        (low_indices, high_indices)：波段低点/高点在序列中的位置（升序）。
+        连续相同的极值只记最早的一根。
+    """
+    positions = np.arange(len(low))
+    low_indices = np.flatnonzero(sliding_extreme_index(low, window) == positions)
+    high_indices = np.flatnonzero(sliding_extreme_index(high, window, find_max=True) == positions)
+    return low_indices, high_indices
+
+
+def _last_two(indices, prices, open_time):
+    """最近两个波段点的价格、时间、涨幅(%)和间隔(小时)，不足两个返回None"""
+    if len(indices) < 2:
+        return None
+    previous, last = int(indices[-2]), int(indices[-1])
+    previous_price, last_price = float(prices[previous]), float(prices[last])
+    return {
+        'previous_price': previous_price,
+        'previous_time': int(open_time[previous]),
+        'last_price': last_price,
+        'last_time': int(open_time[last]),
+        'change_pct': (last_price - previous_price) / previous_price * 100,
+        'gap_hours': (int(open_time[last]) - int(open_time[previous])) / 3_600_000
+    }
+
+
+def swing_summary(open_time, low, high, window=DEFAULT_SWING_WINDOW):
+    """波段摘要：最近两个波段低点和高点
+
+    Args:
+        open_time: 开盘时间（毫秒）
+        low / high: 最低价、最高价
+        window: 判定窗口（前后各window根）
+
+    Returns:
+        dict: lows/highs为_last_two的结果（不足两个时为None），
+              higher_low表示最近两个波段低点是否抬高
+    """
+    low = np.asarray(low, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low_indices, high_indices = find_swing_points(low, high, window)
+    lows = _last_two(low_indices, low, open_time)
+    highs = _last_two(high_indices, high, open_time)
+    return {
+        'lows': lows,
+        'highs': highs,
+        'higher_low': lows is not None and lows['last_price'] > lows['previous_price']
+    }
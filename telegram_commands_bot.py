@@ -9,6 +9,8 @@ from datetime import datetime
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from price_snapshot import PriceSnapshot
+
 # 禁用安全警告（可选）
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -30,6 +32,8 @@ class TelegramCommandsBot:
         # 重启时间记录文件
         self.reboot_time_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.reboot_time_record')
         self.session = self.create_session()  # 先创建会话
+        # 全市场价格快照，showcc一次请求即可计算所有持仓盈亏
+        self.price_snapshot = PriceSnapshot(lambda url: self.session.get(url, timeout=10, verify=False))
         self.load_holdings()
         
         # 重启冷却时间（秒）
@@ -303,6 +307,8 @@ class TelegramCommandsBot:
                 short_positions.append((symbol, info))
         
         message = "📊 **当前持仓列表**\n\n"
+        # 一次请求获取所有币种价格
+        self.price_snapshot.refresh(force=True)
         
         # 显示多单
         if long_positions:
@@ -314,7 +320,7 @@ class TelegramCommandsBot:
                 
                 # 计算盈亏
                 if entry_price != "未知" and entry_price is not None:
-                    current_price = self.get_crypto_price(symbol)
+                    current_price = self.price_snapshot.get(symbol) or self.get_crypto_price(symbol)
                     if current_price:
                         profit_percent = ((current_price - entry_price) / entry_price) * 100
                         profit_loss_text = f" 盈亏: {'+' if profit_percent > 0 else ''}{profit_percent:.2f}%"
@@ -341,7 +347,7 @@ class TelegramCommandsBot:
                 
                 # 计算盈亏
                 if entry_price != "未知" and entry_price is not None:
-                    current_price = self.get_crypto_price(symbol)
+                    current_price = self.price_snapshot.get(symbol) or self.get_crypto_price(symbol)
                     if current_price:
                         profit_percent = ((entry_price - current_price) / entry_price) * 100
                         profit_loss_text = f" 盈亏: {'+' if profit_percent > 0 else ''}{profit_percent:.2f}%"